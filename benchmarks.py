@@ -0,0 +1,577 @@
+"""Benchmarks for the simulation hot paths
+
+Run from the command line -> `python benchmarks.py shortest_paths`
+"""
+import argparse
+import gc
+import glob
+import heapq
+import math
+import os
+import random
+import time
+import tracemalloc
+
+from contraction_hierarchy import ContractionHierarchy
+from cars import Car, plan_initial_routes
+from collision import (
+    EdgeCollisionSystem, GridCollisionSystem, QuadTreeCollisionSystem, SpatialHashCollisionSystem,
+    VectorizedCollisionSystem,
+)
+from csr_graph import CSRGraph
+from gps import GPS
+from graphs import Edge, Graph, ShortestPaths, Vertex
+from headless import HeadlessWindow, load_graph
+from mesoscopic import LinkQueueModel
+from shared_sim import SimulationProcess
+from simulation import Simulation
+from vehicle_arrays import VehicleArrays
+
+
+MAP_DATA_DIR = "map_data"
+
+
+class ListScanShortestPaths(ShortestPaths):
+    """Previous Dijkstra implementation (list scan + re-heapify on every decrease-key),
+    kept only as a baseline for comparison"""
+    def __init__(self, graph, source_vertex):
+        self.path_of_edges = {}
+        self.path_lengths = {}
+        self.pq = []
+
+        for vertex_id in graph.vertices.keys():
+            self.path_lengths[vertex_id] = math.inf
+        self.path_lengths[source_vertex.id] = 0
+
+        heapq.heappush(self.pq, (0.0, source_vertex.id))
+        while len(self.pq) != 0:
+            distance, vertex_id = heapq.heappop(self.pq)
+            vertex = graph.vertices[vertex_id]
+            self.relax_edges(graph, vertex)
+
+    def relax_edges(self, graph, source_vertex):
+        for edge in graph.adj_edges(source_vertex):
+            dest_vertex = graph.vertices[edge.dest]
+
+            dest_length = self.path_lengths[dest_vertex.id]
+            source_length = self.path_lengths[source_vertex.id]
+            if dest_length > source_length + edge.weight:
+                self.path_lengths[dest_vertex.id] = source_length + edge.weight
+                self.path_of_edges[dest_vertex.id] = edge
+
+                if (dest_length, dest_vertex.id) in self.pq:
+                    index = self.pq.index((dest_length, dest_vertex.id))
+                    self.pq[index] = (self.path_lengths[dest_vertex.id], dest_vertex.id)
+                    heapq.heapify(self.pq)
+                else:
+                    heapq.heappush(self.pq, (self.path_lengths[dest_vertex.id], dest_vertex.id))
+
+
+def grid_graph(size, spacing=50.0):
+    """Synthetic two way street grid with size * size intersections"""
+    graph = Graph()
+    for row in range(size):
+        for col in range(size):
+            vertex_id = row * size + col + 1  # vertex id 0 is rejected by Graph.add_edges
+            graph.vertices[vertex_id] = Vertex(vertex_id, col * spacing, row * spacing, {})
+            graph.vertex_cnt += 1
+    for row in range(size):
+        for col in range(size):
+            vertex_id = row * size + col + 1
+            if col + 1 < size:
+                graph.add_edges(vertex_id, vertex_id + 1, {})
+            if row + 1 < size:
+                graph.add_edges(vertex_id, vertex_id + size, {})
+    return graph
+
+
+def straight_road(lanes, length=1000.0):
+    """Synthetic one way road 1 -> 2 -> 3 with lanes lanes, two edges of length each"""
+    graph = Graph()
+    for vertex_id in [1, 2, 3]:
+        graph.vertices[vertex_id] = Vertex(vertex_id, (vertex_id - 1) * length, 0.0, {})
+        graph.vertex_cnt += 1
+    for source, dest in [(1, 2), (2, 3)]:
+        graph.add_edge(Edge(source, dest, length, {"oneway": "yes", "lanes": lanes}))
+    return graph
+
+
+def map_filenames():
+    return sorted(glob.glob(os.path.join(MAP_DATA_DIR, "*.txt")))
+
+
+def time_it(func, repeat):
+    """Return the best wall time of func() over repeat runs"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_shortest_paths(args):
+    """Shortest path trees, old list scan decrease-key vs lazy deletion heap"""
+    graphs = [(os.path.basename(filename), load_graph(filename)) for filename in map_filenames()]
+    graphs += [("synthetic grid {0}x{0}".format(size), grid_graph(size)) for size in args.grid_sizes]
+
+    print("{0:<50} {1:>8} {2:>12} {3:>12} {4:>8}".format(
+        "graph", "vertices", "list scan", "lazy heap", "speedup"))
+    for name, graph in graphs:
+        sources = list(graph.vertices.values())
+        sources = sources[::max(1, len(sources) // args.sources)]
+
+        def run(shortest_paths_cls):
+            for source in sources:
+                shortest_paths_cls(graph, source)
+
+        old = time_it(lambda: run(ListScanShortestPaths), args.repeat)
+        new = time_it(lambda: run(ShortestPaths), args.repeat)
+        print("{0:<50} {1:>8} {2:>11.4f}s {3:>11.4f}s {4:>7.2f}x".format(
+            name, len(graph.vertices), old, new, old / new))
+
+
+def bench_routes(args):
+    """Point to point routes, full Dijkstra tree vs A* vs contraction hierarchy query"""
+    graphs = [(os.path.basename(filename), load_graph(filename)) for filename in map_filenames()]
+    graphs += [("synthetic grid {0}x{0}".format(size), grid_graph(size)) for size in args.grid_sizes]
+
+    print("{0:<42} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10}".format(
+        "graph", "vertices", "dijkstra", "a*", "ch query", "ch build"))
+    for name, graph in graphs:
+        gps = GPS(graph, None)
+        start = time.perf_counter()
+        contraction_hierarchy = ContractionHierarchy.build(graph)
+        build_time = time.perf_counter() - start
+
+        rng = random.Random(args.seed)
+        vertex_ids = list(graph.vertices.keys())
+        pairs = [(rng.choice(vertex_ids), rng.choice(vertex_ids)) for _ in range(args.routes)]
+
+        def run_dijkstra():
+            for source_id, dest_id in pairs:
+                shortest_paths = gps.shortest_paths(source_id)
+                gps.get_route(shortest_paths.path_of_edges, source_id, dest_id)
+
+        def run_a_star():
+            for source_id, dest_id in pairs:
+                gps.shortest_route(source_id, dest_id)
+
+        def run_contraction_hierarchy():
+            for source_id, dest_id in pairs:
+                contraction_hierarchy.shortest_route(source_id, dest_id)
+
+        # per route times in microseconds
+        times = [
+            time_it(run, args.repeat) / len(pairs) * 1e6
+            for run in (run_dijkstra, run_a_star, run_contraction_hierarchy)
+        ]
+        print("{0:<42} {1:>8} {2:>8.1f}us {3:>8.1f}us {4:>8.1f}us {5:>9.3f}s".format(
+            name, len(graph.vertices), *times, build_time))
+
+
+def bench_plan_routes(args):
+    """Batch route planning, serial vs process pool"""
+    graphs = [(os.path.basename(filename), load_graph(filename)) for filename in map_filenames()]
+    graphs += [("synthetic grid {0}x{0}".format(size), grid_graph(size)) for size in args.grid_sizes]
+
+    print("cpu count: {0}, workers: {1}".format(os.cpu_count(), args.workers or os.cpu_count()))
+    print("{0:<42} {1:>8} {2:>8} {3:>10} {4:>10} {5:>8}".format(
+        "graph", "vertices", "routes", "serial", "parallel", "speedup"))
+    for name, graph in graphs:
+        gps = GPS(graph, None)
+        rng = random.Random(args.seed)
+        vertex_ids = list(graph.vertices.keys())
+        pairs = [(rng.choice(vertex_ids), rng.choice(vertex_ids)) for _ in range(args.routes)]
+
+        serial = time_it(lambda: gps.plan_routes(pairs, max_workers=1), args.repeat)
+        parallel = time_it(lambda: gps.plan_routes(pairs, max_workers=args.workers), args.repeat)
+        print("{0:<42} {1:>8} {2:>8} {3:>9.3f}s {4:>9.3f}s {5:>7.2f}x".format(
+            name, len(graph.vertices), len(pairs), serial, parallel, serial / parallel))
+
+
+def create_cars(gps, num_cars, seed=0):
+    random.seed(seed)
+    return [Car(index, gps, gps.random_vertex()) for index in range(num_cars)]
+
+
+def bench_vehicles(args):
+    """Vehicle movement per tick, Car objects vs NumPy vehicle arrays"""
+    gps = GPS(load_graph(args.map), None, tree_cache_size=1024)
+    dt = 1.0 / 30
+
+    print("{0:>8} {1:>14} {2:>14} {3:>18}".format("cars", "objects", "arrays", "arrays + sync"))
+    for num_cars in args.num_cars:
+        cars = create_cars(gps, num_cars)
+
+        def run_objects():
+            for _ in range(args.ticks):
+                for car in cars:
+                    car.throttle_up()
+                    car.move_towards_dest(dt)
+
+        vehicles = VehicleArrays(create_cars(gps, num_cars))
+        no_collisions = [False] * num_cars
+
+        def run_arrays(sync):
+            for _ in range(args.ticks):
+                vehicles.throttle(no_collisions)
+                vehicles.move_towards_dest(dt)
+                if sync:
+                    vehicles.sync_cars()
+
+        # ticks per second
+        results = [
+            args.ticks / time_it(run, args.repeat)
+            for run in (run_objects, lambda: run_arrays(False), lambda: run_arrays(True))
+        ]
+        print("{0:>8} {1:>10.1f} t/s {2:>10.1f} t/s {3:>14.1f} t/s".format(num_cars, *results))
+
+
+def car_on_path(index, gps, path, edge_index, fraction):
+    """Car driving along path (Edges in driving order), fraction of the way along its edge_index'th edge"""
+    edge = path[edge_index]
+    car = Car(index, gps, edge.source, path[edge_index:][::-1])
+    x0, y0 = gps.get_coordinates(edge.source)
+    x1, y1 = gps.get_coordinates(edge.dest)
+    car.x = x0 + (x1 - x0) * fraction
+    car.y = y0 + (y1 - y0) * fraction
+    return car
+
+
+def uniform_layout(gps, num_cars, rng):
+    """Cars spread evenly over the length of every road"""
+    edges = [edge for vertex in gps.graph.vertices.values() for edge in vertex.get_edges() if edge.weight > 0]
+    chosen_edges = rng.choices(edges, weights=[edge.weight for edge in edges], k=num_cars)
+    return [
+        car_on_path(index, gps, [edge], 0, rng.random())
+        for index, edge in enumerate(chosen_edges)
+    ]
+
+
+def clustered_layout(gps, num_cars, rng, num_hotspots=10, queue_length=60.0):
+    """Cars waiting on the roads into a few busy intersections"""
+    incoming_edges = {vertex_id: [] for vertex_id in gps.graph.vertices}
+    for vertex in gps.graph.vertices.values():
+        for edge in vertex.get_edges():
+            if edge.weight > 0:
+                incoming_edges[edge.dest].append(edge)
+    intersections = sorted(incoming_edges, key=lambda vertex_id: len(incoming_edges[vertex_id]), reverse=True)
+    hotspots = intersections[:num_hotspots]
+
+    cars = []
+    for index in range(num_cars):
+        edge = rng.choice(incoming_edges[rng.choice(hotspots)])
+        distance_back = rng.uniform(0, min(queue_length, edge.weight))
+        cars.append(car_on_path(index, gps, [edge], 0, 1 - distance_back / edge.weight))
+    return cars
+
+
+def queue_layout(gps, num_cars, rng, spacing=18.0, max_paths=200):
+    """Cars bumper to bumper along a few long routes"""
+    paths = []
+    for _ in range(max_paths):
+        source_id = gps.random_vertex()
+        dest_id = gps.random_reachable_vertex(source_id)
+        if dest_id is not None:
+            paths.append(gps.shortest_route(source_id, dest_id)[::-1])  # Edges in driving order
+    if not paths:
+        raise ValueError("none of {0} random vertices can reach another one, there is nowhere to queue cars".format(
+            max_paths))
+    paths.sort(key=len, reverse=True)
+
+    cars = []
+    while len(cars) < num_cars:
+        for path in paths:
+            # walk back from the end of the path, one car every spacing
+            for edge_index in range(len(path) - 1, -1, -1):
+                weight = path[edge_index].weight
+                distance_back = 0.0
+                while distance_back < weight and len(cars) < num_cars:
+                    cars.append(car_on_path(len(cars), gps, path, edge_index, 1 - distance_back / weight))
+                    distance_back += spacing
+    return cars
+
+
+TRAFFIC_LAYOUTS = {"uniform": uniform_layout, "clustered": clustered_layout, "queue": queue_layout}
+
+COLLISION_SYSTEMS = [
+    ("grid", GridCollisionSystem),
+    ("quadtree", QuadTreeCollisionSystem),
+    ("spatial_hash", SpatialHashCollisionSystem),
+    ("edge", EdgeCollisionSystem),
+    ("vectorized", VectorizedCollisionSystem),
+]
+
+
+def bench_collisions(args):
+    """update_objects + process_collisions per tick for every collision system over synthetic traffic layouts"""
+    gps = GPS(load_graph(args.map), None, tree_cache_size=1024)
+    window = HeadlessWindow()
+    dt = 1.0 / 30
+    collision_systems = [
+        (name, create_collision_system) for name, create_collision_system in COLLISION_SYSTEMS
+        if not args.systems or name in args.systems
+    ]
+
+    print("ms per tick, mean of {0} ticks".format(args.ticks))
+    print("{0:<10} {1:>6}".format("layout", "cars") + "".join(
+        "{0:>18}".format(name) for name, _ in collision_systems))
+    for layout in args.layouts:
+        for num_cars in args.num_cars:
+            tick_times = []
+            for _, create_collision_system in collision_systems:
+                # same starting positions for every system
+                random.seed(args.seed)
+                cars = TRAFFIC_LAYOUTS[layout](gps, num_cars, random.Random(args.seed))
+                collision_system = create_collision_system(window, cars)
+                elapsed = 0.0
+                for _ in range(args.ticks):
+                    start = time.perf_counter()
+                    collision_system.process_collisions(cars)
+                    collision_system.update_objects(cars)
+                    elapsed += time.perf_counter() - start
+                    for car in cars:
+                        car.move_towards_dest(dt)
+                tick_times.append(elapsed / args.ticks * 1000)
+            print("{0:<10} {1:>6}".format(layout, num_cars) + "".join(
+                "{0:>18.2f}".format(tick_time) for tick_time in tick_times))
+
+
+def bench_driver_models(args):
+    """Ticks/sec and cars run into their leader for each driver model at several tick rates"""
+    gps = GPS(load_graph(args.map), None, tree_cache_size=1024)
+    window = HeadlessWindow()
+
+    print("{0:<10} {1:>6} {2:>6} {3:>12} {4:>16} {5:>12}".format(
+        "model", "cars", "tps", "ticks/sec", "overlaps/tick", "mean speed"))
+    for num_cars in args.num_cars:
+        for driver_model in ["throttle", "idm"]:
+            for ticks_per_second in args.ticks_per_second:
+                cars = create_cars(gps, num_cars, args.seed)
+                # throttle runs on the edge collision system, which idm's lane system extends,
+                # so both count overlaps the same way
+                collision_system = "lane" if driver_model == "idm" else "edge"
+                simulation = Simulation(window, cars, collision_system, driver_model=driver_model)
+                num_ticks = int(args.seconds * ticks_per_second)
+                overlaps = 0
+                elapsed = 0.0
+                for _ in range(num_ticks):
+                    start = time.perf_counter()
+                    simulation.step(1.0 / ticks_per_second)
+                    elapsed += time.perf_counter() - start
+                    overlaps += simulation.collision_system.count_overlaps(cars)
+                print("{0:<10} {1:>6} {2:>6} {3:>12.1f} {4:>16.2f} {5:>12.1f}".format(
+                    driver_model, num_cars, ticks_per_second, num_ticks / elapsed, overlaps / num_ticks,
+                    sum(car.speed for car in cars) / num_cars))
+
+
+def bench_lanes(args):
+    """Cars through a straight road from a standing queue with IDM car following and MOBIL lane changes"""
+    window = HeadlessWindow()
+    dt = 1.0 / args.ticks_per_second
+
+    print("{0:>6} {1:>6} {2:>14} {3:>14} {4:>10}".format("lanes", "cars", "cars through", "lane changes", "overlaps"))
+    for lanes in args.lanes:
+        gps = GPS(straight_road(lanes), None)
+        cars = [Car(index, gps, 1, gps.shortest_route(1, 3)) for index in range(args.num_cars)]
+        for index, car in enumerate(cars):
+            car.x = index * 20.0
+            car.speed = 0.0
+        simulation = Simulation(window, cars, driver_model="idm", lane_changes=True)
+        overlaps = 0
+        for _ in range(int(args.seconds * args.ticks_per_second)):
+            simulation.step(dt)
+            overlaps += simulation.collision_system.count_overlaps(cars)
+        print("{0:>6} {1:>6} {2:>14} {3:>14} {4:>10}".format(
+            lanes, args.num_cars, sum(car.current_edge.source == 2 for car in cars),
+            simulation.lane_change_model.lane_changes, overlaps))
+
+
+def bench_mesoscopic(args):
+    """Ticks/sec of the link queue model compared to per car IDM simulation on synthetic street grids"""
+    window = HeadlessWindow()
+    dt = 1.0 / args.ticks_per_second
+
+    print("{0:>6} {1:>8} {2:>16} {3:>16} {4:>14}".format(
+        "grid", "vehicles", "link queue", "microscopic", "edges in use"))
+    for grid_size in args.grid_sizes:
+        gps = GPS(grid_graph(grid_size), None, tree_cache_size=1024)
+        for num_vehicles in args.num_vehicles:
+            random.seed(args.seed)
+            initial_routes = plan_initial_routes(gps, num_vehicles)
+            model = LinkQueueModel(gps)
+            model.add_vehicles([(source_id, list(route)) for source_id, route in initial_routes])
+            meso_ticks = int(args.seconds * args.ticks_per_second)
+            meso_time = time_it(lambda: [model.step(dt) for _ in range(meso_ticks)], 1)
+
+            cars = [Car(index, gps, source_id, list(route)) for index, (source_id, route) in enumerate(initial_routes)]
+            simulation = Simulation(window, cars, driver_model="idm")
+            micro_time = time_it(lambda: [simulation.step(dt) for _ in range(args.micro_ticks)], 1)
+
+            print("{0:>6} {1:>8} {2:>12.1f} t/s {3:>12.1f} t/s {4:>14}".format(
+                grid_size, num_vehicles, meso_ticks / meso_time, args.micro_ticks / micro_time,
+                sum(1 for queue in model.queues.values() if queue)))
+
+
+def bench_shared_memory(args):
+    """Ticks/sec with rendering in the same loop vs the simulation in a child process
+    publishing to shared memory, rendering is stood in for by a sleep per frame"""
+    window = HeadlessWindow()
+    gps = GPS(load_graph(args.map), None, tree_cache_size=1024)
+    collision_system = "lane" if args.driver_model == "idm" else "edge"
+    config_data = {"collision_system": collision_system, "driver_model": args.driver_model}
+    dt = 1.0 / 30
+
+    def render_cars(cars):
+        for car in cars:
+            car.x, car.y, car.heading()
+        time.sleep(args.render_ms / 1000.0)
+
+    def render_frame(frame):
+        for index in range(len(frame)):
+            frame.item(index, 0), frame.item(index, 1), frame.item(index, 2)
+        time.sleep(args.render_ms / 1000.0)
+
+    print("{0:>6} {1:>22} {2:>22} {3:>20}".format("cars", "one process ticks/sec", "child ticks/sec", "parent frames/sec"))
+    for num_cars in args.num_cars:
+        random.seed(args.seed)
+        initial_routes = plan_initial_routes(gps, num_cars)
+        cars = [Car(index, gps, source_id, list(route)) for index, (source_id, route) in enumerate(initial_routes)]
+        simulation = Simulation(window, cars, collision_system, driver_model=args.driver_model)
+        ticks = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            simulation.step(dt)
+            ticks += 1
+            render_cars(cars)
+        one_process = ticks / (time.perf_counter() - start)
+
+        cars = [Car(index, gps, source_id, list(route)) for index, (source_id, route) in enumerate(initial_routes)]
+        simulation_process = SimulationProcess(
+            gps, cars, config_data, (window.width, window.height), realtime=False)
+        simulation_process.start()
+        while simulation_process.tick_rate()[0] == 0:
+            time.sleep(0.01)  # wait for the child to build its cars
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            simulation_process.render_latest(render_frame)
+        elapsed = time.perf_counter() - start
+        _, child_tick_rate = simulation_process.tick_rate()
+        simulation_process.stop()
+        print("{0:>6} {1:>22.1f} {2:>22.1f} {3:>20.1f}".format(
+            num_cars, one_process, child_tick_rate, simulation_process.frames / elapsed))
+
+
+def traced_memory(func):
+    """Returns (result of func(), bytes still allocated by func once it returns)"""
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = func()
+    gc.collect()  # parsed map data has reference cycles that would otherwise be counted
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, end - start
+
+
+def bench_memory(args):
+    """Memory held by the object Graph vs the compact CSRGraph"""
+    print("{0:<42} {1:>8} {2:>8} {3:>12} {4:>12} {5:>8}".format(
+        "map", "vertices", "edges", "Graph", "CSRGraph", "ratio"))
+    load_graph(map_filenames()[0])  # warm up so lazy imports and caches aren't counted
+    for filename in map_filenames():
+        graph, graph_bytes = traced_memory(lambda: load_graph(filename))
+        csr_graph, csr_graph_bytes = traced_memory(lambda: CSRGraph.from_graph(graph))
+        print("{0:<42} {1:>8} {2:>8} {3:>10.1f}KB {4:>10.1f}KB {5:>7.1f}x".format(
+            os.path.basename(filename), csr_graph.vertex_cnt, csr_graph.edge_cnt,
+            graph_bytes / 1024, csr_graph_bytes / 1024, graph_bytes / csr_graph_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="benchmark")
+    subparsers.required = True
+
+    shortest_paths_parser = subparsers.add_parser(
+        "shortest_paths", help=bench_shortest_paths.__doc__)
+    shortest_paths_parser.add_argument("--repeat", type=int, default=3)
+    shortest_paths_parser.add_argument("--sources", type=int, default=50,
+                                       help="number of source vertices per graph")
+    shortest_paths_parser.add_argument("--grid-sizes", type=int, nargs="*", default=[20, 50, 100])
+    shortest_paths_parser.set_defaults(func=bench_shortest_paths)
+
+    routes_parser = subparsers.add_parser("routes", help=bench_routes.__doc__)
+    routes_parser.add_argument("--repeat", type=int, default=3)
+    routes_parser.add_argument("--routes", type=int, default=100, help="number of random routes per graph")
+    routes_parser.add_argument("--grid-sizes", type=int, nargs="*", default=[20, 50, 100])
+    routes_parser.add_argument("--seed", type=int, default=0)
+    routes_parser.set_defaults(func=bench_routes)
+
+    memory_parser = subparsers.add_parser("memory", help=bench_memory.__doc__)
+    memory_parser.set_defaults(func=bench_memory)
+
+    plan_routes_parser = subparsers.add_parser("plan_routes", help=bench_plan_routes.__doc__)
+    plan_routes_parser.add_argument("--repeat", type=int, default=1)
+    plan_routes_parser.add_argument("--routes", type=int, default=5000)
+    plan_routes_parser.add_argument("--workers", type=int, default=None)
+    plan_routes_parser.add_argument("--grid-sizes", type=int, nargs="*", default=[50])
+    plan_routes_parser.add_argument("--seed", type=int, default=0)
+    plan_routes_parser.set_defaults(func=bench_plan_routes)
+
+    vehicles_parser = subparsers.add_parser("vehicles", help=bench_vehicles.__doc__)
+    vehicles_parser.add_argument("--repeat", type=int, default=1)
+    vehicles_parser.add_argument("--ticks", type=int, default=30)
+    vehicles_parser.add_argument("--num-cars", type=int, nargs="*", default=[100, 1000, 10000])
+    vehicles_parser.add_argument("--map", default=os.path.join(MAP_DATA_DIR, "map_data_default.txt"))
+    vehicles_parser.set_defaults(func=bench_vehicles)
+
+    collisions_parser = subparsers.add_parser("collisions", help=bench_collisions.__doc__)
+    collisions_parser.add_argument("--ticks", type=int, default=5)
+    collisions_parser.add_argument("--num-cars", type=int, nargs="*", default=[100, 1000, 5000])
+    collisions_parser.add_argument("--layouts", nargs="*", choices=list(TRAFFIC_LAYOUTS),
+                                   default=list(TRAFFIC_LAYOUTS))
+    collisions_parser.add_argument("--systems", nargs="*", choices=[name for name, _ in COLLISION_SYSTEMS],
+                                   help="collision systems to time, default all")
+    collisions_parser.add_argument("--map", default=os.path.join(MAP_DATA_DIR, "map_data_default.txt"))
+    collisions_parser.add_argument("--seed", type=int, default=0)
+    collisions_parser.set_defaults(func=bench_collisions)
+
+    driver_models_parser = subparsers.add_parser("driver_models", help=bench_driver_models.__doc__)
+    driver_models_parser.add_argument("--seconds", type=float, default=60.0, help="simulated seconds per run")
+    driver_models_parser.add_argument("--ticks-per-second", type=int, nargs="*", default=[30, 10, 5])
+    driver_models_parser.add_argument("--num-cars", type=int, nargs="*", default=[100, 500])
+    driver_models_parser.add_argument("--map", default=os.path.join(MAP_DATA_DIR, "map_data_default.txt"))
+    driver_models_parser.add_argument("--seed", type=int, default=0)
+    driver_models_parser.set_defaults(func=bench_driver_models)
+
+    lanes_parser = subparsers.add_parser("lanes", help=bench_lanes.__doc__)
+    lanes_parser.add_argument("--lanes", type=int, nargs="*", default=[1, 2, 3])
+    lanes_parser.add_argument("--num-cars", type=int, default=45, help="cars queued along the first edge")
+    lanes_parser.add_argument("--seconds", type=float, default=30.0)
+    lanes_parser.add_argument("--ticks-per-second", type=int, default=10)
+    lanes_parser.set_defaults(func=bench_lanes)
+
+    mesoscopic_parser = subparsers.add_parser("mesoscopic", help=bench_mesoscopic.__doc__)
+    mesoscopic_parser.add_argument("--grid-sizes", type=int, nargs="*", default=[30])
+    mesoscopic_parser.add_argument("--num-vehicles", type=int, nargs="*", default=[1000, 5000])
+    mesoscopic_parser.add_argument("--seconds", type=float, default=30.0, help="simulated seconds of link queue model")
+    mesoscopic_parser.add_argument("--micro-ticks", type=int, default=30, help="ticks of microscopic simulation")
+    mesoscopic_parser.add_argument("--ticks-per-second", type=int, default=10)
+    mesoscopic_parser.add_argument("--seed", type=int, default=0)
+    mesoscopic_parser.set_defaults(func=bench_mesoscopic)
+
+    shared_memory_parser = subparsers.add_parser("shared_memory", help=bench_shared_memory.__doc__)
+    shared_memory_parser.add_argument("--num-cars", type=int, nargs="*", default=[100, 500])
+    shared_memory_parser.add_argument("--seconds", type=float, default=5.0, help="wall seconds per run")
+    shared_memory_parser.add_argument("--render-ms", type=float, default=20.0, help="stand in render time per frame")
+    shared_memory_parser.add_argument("--driver-model", choices=["throttle", "idm"], default="idm")
+    shared_memory_parser.add_argument("--map", default=os.path.join(MAP_DATA_DIR, "map_data_default.txt"))
+    shared_memory_parser.add_argument("--seed", type=int, default=0)
+    shared_memory_parser.set_defaults(func=bench_shared_memory)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import math
+
+from graphics import Point, Polygon
+from cars import Car, plan_initial_routes
+import math_utils
+from shared_sim import HEADING, X, Y
+
+
+class GlyphCache:
+    """Corner offsets of car outlines pre-rotated to a fixed set of headings
+
+    Headings are quantized to buckets (72 is every 5 degrees). The offsets of a width x
+    height car are worked out for every bucket the first time that size is drawn, in
+    world units and again in screen pixels for each zoom level, as flat tuples
+    (dx0, dy0, dx1, dy1, ...). Drawing a car is then adding its centre to a cached tuple
+    with no trig, and since every glyph is rotated from the upright corners there is no
+    rotation error to build up.
+    """
+    def __init__(self, buckets=72):
+        self.buckets = buckets
+        self.world_glyphs = {}   # (width, height): offsets per bucket
+        self.screen_glyphs = {}  # (width, height, xscale, yscale): screen pixel offsets per bucket
+
+    def bucket(self, direction):
+        """Nearest bucket to direction in degrees clockwise from 12 o'clock"""
+        return int(round(direction * self.buckets / 360.0)) % self.buckets
+
+    def heading(self, bucket):
+        return bucket * 360.0 / self.buckets
+
+    def world(self, width, height):
+        glyphs = self.world_glyphs.get((width, height))
+        if glyphs is None:
+            half_width, half_height = width / 2, height / 2
+            corners = [(-half_width, -half_height), (half_width, -half_height), (half_width, half_height),
+                       (-half_width, half_height)]
+            glyphs = [
+                tuple(offset for corner in corners for offset in math_utils.rotate_point(corner, -self.heading(bucket)))
+                for bucket in range(self.buckets)
+            ]
+            self.world_glyphs[(width, height)] = glyphs
+        return glyphs
+
+    def screen(self, width, height, trans):
+        """Glyphs in screen pixels for a canvas transform (GraphWin.trans), None means no scaling"""
+        xscale, yscale = (trans.xscale, trans.yscale) if trans else (1.0, -1.0)
+        key = (width, height, xscale, yscale)
+        glyphs = self.screen_glyphs.get(key)
+        if glyphs is None:
+            glyphs = [
+                tuple(offset / xscale if i % 2 == 0 else -offset / yscale for i, offset in enumerate(glyph))
+                for glyph in self.world(width, height)
+            ]
+            self.screen_glyphs[key] = glyphs
+        return glyphs
+
+
+glyph_cache = GlyphCache()
+
+
+class CarShape():
+    """Defines a shape object to be used for drawing the corresponding
+    Car object with the same index"""
+    tk_calls = 0  # canvas commands issued by every CarShape so far
+
+    def __init__(self, index, window, car):
+        self.index = index
+        self.window = window
+        self.x = car.x
+        self.y = car.y
+        self.color = "white"
+        self.height = car.height
+        self.width = car.width
+        self.bucket = 0     # heading bucket in glyph_cache the shape is drawn with
+        self.direction = 0  # heading of that bucket
+        self.stale = False  # skipped while out of view, see render_in_view
+        self.radius = math_utils.pythag(self.width / 2, self.height / 2)  # how far a corner swings when turning
+
+        # car shape must be a polygon because rectangles are represented as two points
+        # which prevents proper rotations and translations
+        center = Point(self.x, self.y)
+        self.shape = Polygon(center, [])
+        self.shape.points = self.outline()
+        self.shape.setFill(self.color)
+
+    def draw(self):
+        self.shape.draw(self.window)
+
+    def outline(self):
+        """Corners of the shape as drawn, in world coordinates"""
+        center = self.shape.center
+        offsets = glyph_cache.world(self.width, self.height)[self.bucket]
+        return [(center.x + offsets[i], center.y + offsets[i + 1]) for i in range(0, len(offsets), 2)]
+
+    def render(self, direction=None):
+        """Redraw the shape at (x, y), facing direction if given or else the way it moved
+
+        The outline is the glyph for the nearest heading bucket added to the car's screen
+        position, sent to Tk in one coords call. Nothing is sent if neither the move nor
+        the turn since the shape was last drawn shifts it by a screen pixel, small moves
+        add up until they do. Returns the number of Tk calls made.
+        """
+        self.stale = False
+        center = self.shape.center
+        dx = self.x - center.x
+        dy = self.y - center.y
+        if direction is None:
+            direction = math_utils.degrees_clockwise(dx, dy) if dx or dy else self.direction
+        canvas = self.shape.canvas
+        if not canvas or canvas.isClosed():
+            return 0
+        bucket = glyph_cache.bucket(direction)
+        pixels_per_unit = 1.0 / abs(canvas.trans.xscale) if canvas.trans else 1.0
+        turn = abs((glyph_cache.heading(bucket) - self.direction + 180) % 360 - 180)
+        moved = math_utils.pythag(dx, dy) * pixels_per_unit
+        swung = math.radians(turn) * self.radius * pixels_per_unit
+        if moved < 1 and swung < 1:
+            return 0
+
+        self.bucket = bucket
+        self.direction = glyph_cache.heading(bucket)
+        center.x, center.y = self.x, self.y
+        self.shape.points = self.outline()
+        sx, sy = canvas.toScreen(self.x, self.y)
+        o = glyph_cache.screen(self.width, self.height, canvas.trans)[bucket]
+        canvas.coords(self.shape.id, (sx + o[0], sy + o[1], sx + o[2], sy + o[3],
+                                      sx + o[4], sy + o[5], sx + o[6], sy + o[7]))
+        CarShape.tk_calls += 1
+        return 1
+
+    def in_view(self, x0, y0, x1, y1):
+        """Whether the car, or the shape where it was last drawn, is inside the view"""
+        margin = self.height
+        x0 -= margin
+        y0 -= margin
+        x1 += margin
+        y1 += margin
+        center = self.shape.center
+        return (
+            (x0 <= self.x <= x1 and y0 <= self.y <= y1)
+            or (x0 <= center.x <= x1 and y0 <= center.y <= y1)
+        )
+
+    def clicked(self, p):
+        x_points = [point[0] for point in self.shape.points]
+        y_points = [point[1] for point in self.shape.points]
+        xmin = min(x_points)
+        xmax = max(x_points)
+        ymin = min(y_points)
+        ymax = max(y_points)
+        return (xmin <= p.getX() <= xmax and ymin <= p.getY() <= ymax)
+
+
+class CarFactory:
+    """Used to create a Car with an associated CarShape"""
+    def __init__(self, window, gps, cars, car_shapes):
+        self.window = window
+        self.gps = gps
+        self.cars = cars
+        self.car_shapes = car_shapes
+        self.count = 0
+
+    def create(self, source_id=None, route=None):
+        index = self.count
+        if source_id is None:
+            source_id = self.gps.random_vertex()
+        self.cars.append(Car(index, self.gps, source_id, route))
+        self.car_shapes.append(CarShape(index, self.window, self.cars[index]))
+        self.count += 1
+
+    def create_many(self, num_cars, max_workers=None):
+        """Create num_cars cars, planning all of their first routes in one batch"""
+        for source_id, route in plan_initial_routes(self.gps, num_cars, max_workers):
+            self.create(source_id, route)
+
+
+def render_in_view(car_shapes, window, cars=None, frame=None):
+    """Render only the car shapes in window's view (GraphWin.getScreenPoints), returns the
+    number of Tk calls made for the frame
+
+    With cars, every shape is first moved to its car and drawn facing the heading of the
+    car's lane (Car.heading), so no shape needs any trigonometry. frame, a SimulationProcess
+    frame read in place, gives the same for every car by index. With neither, shapes are
+    drawn at the x and y they were given, facing the way they moved.
+
+    Shapes out of view are left where they were last drawn. A shape that comes back into
+    view, because its car drove in or the view was panned, zoomed or moved to follow a
+    car, is caught up in one render however far its car went in the meantime. A shape
+    drawn in view whose car has left is moved out as well.
+    """
+    wx0, wy0, wx1, wy1 = window.getScreenPoints()
+    x0, x1 = min(wx0, wx1), max(wx0, wx1)
+    y0, y1 = min(wy0, wy1), max(wy0, wy1)
+    tk_calls = 0
+    for car_shape in car_shapes:
+        index = car_shape.index
+        if cars is not None:
+            car_shape.x = cars[index].x
+            car_shape.y = cars[index].y
+        elif frame is not None:
+            car_shape.x = frame.item(index, X)
+            car_shape.y = frame.item(index, Y)
+        if not car_shape.in_view(x0, y0, x1, y1):
+            car_shape.stale = True
+            continue
+        direction = None
+        if cars is not None:
+            direction = cars[index].heading()
+        elif frame is not None:
+            direction = frame.item(index, HEADING)
+        tk_calls += car_shape.render(direction)
+    return tk_calls
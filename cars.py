@@ -1,11 +1,12 @@
 import functools
 
-from graphics import Point, Polygon
 import math_utils
 
 
 class Car:
-    def __init__(self, index, gps, source_id):
+    min_speed = 3.0  # throttle_down never slows a car below this
+
+    def __init__(self, index, gps, source_id, route=None):
         self.index = index
         self.id = id(self)
         self.gps = gps
@@ -18,9 +19,16 @@ class Car:
         self.height = 15
         self.direction = 0
         self.lane_index = 0
-        self.source_id, self.dest_id, self.route = self.new_route()
-        self.next_dest_id = self.get_next_dest()
-        self.current_edge = self.gps.get_edge(self.source_id, self.next_dest_id)
+        if route is None:
+            self.source_id, self.dest_id, self.route = self.new_route()
+        elif route:
+            self.dest_id, self.route = route[0].dest, route  # planned ahead of time, see CarFactory
+        else:
+            self.route = route
+        self.current_edge = self.get_next_edge()
+        self.next_dest_id = self.current_edge.dest
+        self.lane_slot = self.gps.lane_geometry.slot(self.current_edge, self.lane_index)
+        self.speed_limit = self.get_speed_limit()
         self.cell = None  # used in collision system
         # print("Car {0} moving from {1} to {2}".format(self.id, self.source_id, self.dest_id))
 
@@ -30,29 +38,44 @@ class Car:
     def __hash__(self):
         return hash(self.id)
 
-    # @functools.lru_cache(maxsize=4)
-    def check_collision(self, other):
-        """Check whether this car is about to smash into another car"""
+    def target(self):
+        """Lane adjusted coordinates of next_dest_id"""
+        if self.lane_slot == -1:
+            return self.gps.get_coordinates(self.next_dest_id)
+        return self.gps.lane_geometry.end(self.lane_slot)
 
-        # Only check for forward collisions by checking movement vector
+    def heading(self):
+        """Direction of travel of the car's lane in degrees clockwise from 12 o'clock"""
+        if self.lane_slot == -1:
+            return self.direction
+        return self.gps.lane_geometry.heading(self.lane_slot)
+
+    def look_ahead(self):
+        """Point a short distance ahead of the car along its movement vector"""
         adjustment_factor = 20.0
-        nx, ny = self.gps.get_lane_adj_coords(self.next_dest_id, self.current_edge, self.lane_index)
+        nx, ny = self.target()
         dx = nx - self.x
         dy = ny - self.y
         dist = math_utils.pythag(dx, dy) or 1.0
-        mv_x = (dx/dist) * adjustment_factor
-        mv_y = (dy/dist) * adjustment_factor
+        return self.x + (dx/dist) * adjustment_factor, self.y + (dy/dist) * adjustment_factor
+
+    # @functools.lru_cache(maxsize=4)
+    def check_collision(self, other, look_ahead=None):
+        """Check whether this car is about to smash into another car, look_ahead is
+        self.look_ahead() when the caller already has it"""
+
+        # Only check for forward collisions by checking movement vector
+        look_x, look_y = look_ahead or self.look_ahead()
 
         # width vs height is dependent on the car's orientation,
         # simplify by always checking longest one
-        x_overlap = (abs(self.x + mv_x - other.x) * 2) < (self.height + other.height)
-        y_overlap = (abs(self.y + mv_y - other.y) * 2) < (self.height + other.height)
+        x_overlap = (abs(look_x - other.x) * 2) < (self.height + other.height)
+        y_overlap = (abs(look_y - other.y) * 2) < (self.height + other.height)
         collision_detected = x_overlap and y_overlap
         return collision_detected
 
     def throttle_down(self):
-        min_speed = 3.0
-        self.speed = max(self.speed * 0.9, min_speed)
+        self.speed = max(self.speed * 0.9, self.min_speed)
 
     def throttle_up(self):
         self.speed *= 1.1
@@ -61,16 +84,13 @@ class Car:
 
     def move_towards_dest(self, dt):
         movement = (dt * self.speed)
-        nx, ny = self.gps.get_lane_adj_coords(self.next_dest_id, self.current_edge, self.lane_index)
+        nx, ny = self.target()
         dx = nx - self.x
         dy = ny - self.y
         dist = math_utils.pythag(dx, dy)
 
         if dist <= movement:
-            new_source = self.next_dest_id
-            self.next_dest_id = self.get_next_dest()
-            self.current_edge = self.gps.get_edge(new_source, self.next_dest_id)
-            self.speed_limit = self.get_speed_limit()
+            self.arrive_at_next_dest()
             return
 
         mv_x = (dx/dist) * movement
@@ -79,34 +99,38 @@ class Car:
         self.x += mv_x
         self.y += mv_y
 
-    def choose_dest(self):
-        return self.gps.random_vertex()
+    def arrive_at_next_dest(self):
+        self.current_edge = self.get_next_edge()
+        self.next_dest_id = self.current_edge.dest
+        self.lane_slot = self.gps.lane_geometry.slot(self.current_edge, self.lane_index)
+        self.speed_limit = self.get_speed_limit()
+
+    def change_lane(self, lane_index):
+        self.lane_index = lane_index
+        self.lane_slot = self.gps.lane_geometry.slot(self.current_edge, lane_index)
+
+    def choose_dest(self, source_id):
+        return self.gps.random_reachable_vertex(source_id)
 
     def new_route(self):
         new_source_id = self.dest_id
-        new_dest_id = self.choose_dest()
-        new_route = self.gps.shortest_route(new_source_id, new_dest_id)
-        new_route_count = 1
-        while new_route is None and new_route_count < 10:
-            new_dest_id = self.choose_dest()
-            new_route = self.gps.shortest_route(new_source_id, new_dest_id)
-            new_route_count += 1
-
-        if new_route is None:
+        new_dest_id = self.choose_dest(new_source_id)
+        if new_dest_id is None:
             # Car reached a dead end. Seriously, why do one way dead ends with no exit even exist?
             # TODO -> systematically remove these from the map data when a car hits one?
             # print("Car {0} reached a dead end at {1}".format(self.id, new_source_id))
             self.reset_current_location()
             return self.new_route()
 
+        new_route = self.gps.shortest_route(new_source_id, new_dest_id)
         # print("Car {0} moving from {1} to {2}".format(self.id, new_source_id, new_dest_id))
         return new_source_id, new_dest_id, new_route
 
-    def get_next_dest(self):
+    def get_next_edge(self):
+        """Route is a list of Edges with the last edge first"""
         if not self.route:
             self.source_id, self.dest_id, self.route = self.new_route()
-        dest_id = self.route.pop()
-        return dest_id
+        return self.route.pop()
 
     def get_speed_limit(self):
         if self.current_edge and self.current_edge.speed_limit is not None:
@@ -148,70 +172,28 @@ class Car:
         return info
 
 
-class CarShape():
-    """Defines a shape object to be used for drawing the corresponding
-    Car object with the same index"""
-    def __init__(self, index, window, car):
-        self.index = index
-        self.window = window
-        self.x = car.x
-        self.y = car.y
-        self.color = "white"
-        self.height = car.height
-        self.width = car.width
-        self.direction = 0
+def plan_initial_routes(gps, num_cars, max_workers=None):
+    """Random starting vertex and route for num_cars cars, with all routes planned in one batch
 
-        # car shape must be a polygon because rectangles are represented as two points
-        # which prevents proper rotations and translations
-        center = Point(self.x, self.y)
-        p1 = (self.x - (self.width / 2), self.y - (self.height / 2))
-        p2 = (self.x + (self.width / 2), self.y - (self.height / 2))
-        p3 = (self.x + (self.width / 2), self.y + (self.height / 2))
-        p4 = (self.x - (self.width / 2), self.y + (self.height / 2))
-        points = [p1, p2, p3, p4]
-        self.shape = Polygon(center, points)
-        self.shape.setFill(self.color)
-
-    def draw(self):
-        self.shape.draw(self.window)
-
-    def render(self):
-        dx = self.x - self.shape.center.x
-        dy = self.y - self.shape.center.y
-        self.rotate(dx, dy)
-        self.shape.move(dx, dy)
-
-    def rotate(self, dx, dy):
-        if dx == 0 and dy == 0:
-            return
-        new_direction = math_utils.degrees_clockwise(dx, dy)
-        degrees = float(self.direction - new_direction)
-        if abs(degrees) > 5:
-            self.shape.rotate(degrees)
-        self.direction = new_direction
-
-    def clicked(self, p):
-        x_points = [point[0] for point in self.shape.points]
-        y_points = [point[1] for point in self.shape.points]
-        xmin = min(x_points)
-        xmax = max(x_points)
-        ymin = min(y_points)
-        ymax = max(y_points)
-        return (xmin <= p.getX() <= xmax and ymin <= p.getY() <= ymax)
-
-
-class CarFactory:
-    """Used to create a Car with an associated CarShape"""
-    def __init__(self, window, gps, cars, car_shapes):
-        self.window = window
-        self.gps = gps
-        self.cars = cars
-        self.car_shapes = car_shapes
-        self.count = 0
-
-    def create(self):
-        index = self.count
-        car = Car(index, self.gps, self.gps.random_vertex())
-        self.cars.append(Car(index, self.gps, self.gps.random_vertex()))
-        self.car_shapes.append(CarShape(index, self.window, self.cars[index]))
-        self.count += 1
+    Returns list of (source_id, route) tuples. Raises ValueError if no vertex can reach
+    another one, once every vertex has been drawn and turned out to be a dead end.
+    """
+    pairs = []
+    dead_ends = set()
+    while len(pairs) < num_cars:
+        source_id = gps.random_vertex()
+        dest_id = gps.random_reachable_vertex(source_id)
+        if dest_id is not None:
+            pairs.append((source_id, dest_id))
+        else:
+            dead_ends.add(source_id)
+            if len(dead_ends) == len(gps.graph.vertices):
+                raise ValueError("no vertex of the graph can reach another one, there is nowhere to route cars")
+
+    routes = gps.plan_routes(pairs, max_workers)
+    return [(source_id, route) for (source_id, _), route in zip(pairs, routes)]
+
+
+def create_cars(gps, num_cars, max_workers=None):
+    initial_routes = plan_initial_routes(gps, num_cars, max_workers)
+    return [Car(index, gps, source_id, route) for index, (source_id, route) in enumerate(initial_routes)]
@@ -1,4 +1,11 @@
 import abc
+import bisect
+import math
+from array import array
+
+import numpy as np
+
+import math_utils
 
 
 class Cell:
@@ -30,7 +37,7 @@ class Grid:
         self.y_max = y_max
         self.cell_width = (x_max - x_min) // num_cols
         self.cell_height = (y_max - y_min) // num_rows
-        self.cells = [Cell()] * num_rows * num_cols
+        self.cells = [Cell() for _ in range(num_rows * num_cols)]
 
     def get_cell_contents(self, x, y):
         cell_num = self.get_cell_num(x, y)
@@ -82,6 +89,103 @@ class Grid:
         self.cells[cell_num].remove_obj(obj_id)
 
 
+class SpatialHash:
+    """Uniform grid of square cells over an unbounded plane, hashed by integer cell coordinates
+
+    Each non-empty cell is a doubly linked list of object ids threaded through flat
+    arrays: heads maps a cell key to the first object in the cell and next_ids/prev_ids
+    link objects in the same cell (-1 ends a list). Object ids are small dense integers
+    (car indices), so moving an object between cells is O(1) with no allocation.
+    """
+    key_stride = 1 << 32  # cell key = col * key_stride + row
+
+    def __init__(self, cell_size, x_min=0.0, y_min=0.0):
+        self.cell_size = cell_size
+        self.x_min = x_min
+        self.y_min = y_min
+        self.heads = {}              # cell key: first object id in the cell
+        self.next_ids = array('l')   # object id: next object id in the same cell
+        self.prev_ids = array('l')   # object id: previous object id in the same cell
+        self.cell_keys = array('q')  # object id: cell key
+        self.inserted = bytearray()  # object id: 1 if the object is in the hash
+
+    def cell_coords(self, x, y):
+        return int((x - self.x_min) // self.cell_size), int((y - self.y_min) // self.cell_size)
+
+    def cell_key(self, x, y):
+        col, row = self.cell_coords(x, y)
+        return col * self.key_stride + row
+
+    def insert(self, obj_id, x, y):
+        while len(self.inserted) <= obj_id:
+            self.next_ids.append(-1)
+            self.prev_ids.append(-1)
+            self.cell_keys.append(0)
+            self.inserted.append(0)
+        if self.inserted[obj_id]:
+            self.move(obj_id, x, y)
+        else:
+            self.link(obj_id, self.cell_key(x, y))
+
+    def move(self, obj_id, x, y):
+        """Returns True if the object changed cell"""
+        key = self.cell_key(x, y)
+        if key == self.cell_keys[obj_id]:
+            return False
+        self.unlink(obj_id)
+        self.link(obj_id, key)
+        return True
+
+    def remove(self, obj_id):
+        if obj_id < len(self.inserted) and self.inserted[obj_id]:
+            self.unlink(obj_id)
+
+    def link(self, obj_id, key):
+        head = self.heads.get(key, -1)
+        self.next_ids[obj_id] = head
+        self.prev_ids[obj_id] = -1
+        if head != -1:
+            self.prev_ids[head] = obj_id
+        self.heads[key] = obj_id
+        self.cell_keys[obj_id] = key
+        self.inserted[obj_id] = 1
+
+    def unlink(self, obj_id):
+        next_id = self.next_ids[obj_id]
+        prev_id = self.prev_ids[obj_id]
+        if next_id != -1:
+            self.prev_ids[next_id] = prev_id
+        if prev_id != -1:
+            self.next_ids[prev_id] = next_id
+        elif next_id != -1:
+            self.heads[self.cell_keys[obj_id]] = next_id
+        else:
+            del self.heads[self.cell_keys[obj_id]]
+        self.inserted[obj_id] = 0
+
+    def cell_contents(self, key, contents):
+        """Append every object id in the cell with key to contents"""
+        obj_id = self.heads.get(key, -1)
+        while obj_id != -1:
+            contents.append(obj_id)
+            obj_id = self.next_ids[obj_id]
+        return contents
+
+    def get_cell_contents(self, x, y):
+        return self.cell_contents(self.cell_key(x, y), [])
+
+    def get_nearby_objects(self, x, y):
+        """Object ids in the 3x3 block of cells around (x, y)"""
+        col, row = self.cell_coords(x, y)
+        contents = []
+        for dc in (-1, 0, 1):
+            key = (col + dc) * self.key_stride + row
+            for cell_key in (key - 1, key, key + 1):
+                if cell_key in self.heads:
+                    self.cell_contents(cell_key, contents)
+        return contents
+
+
 class QuadTree:
     def __init__(self, x_min, x_max, y_min, y_max, parent=None):
         self.min_size = 32
@@ -211,6 +315,8 @@ class QuadTree:
 
 
 class CollisionSystem(metaclass=abc.ABCMeta):
+    reads_car_positions = True  # whether update_objects and find_collisions read car.x and car.y
+
     @abc.abstractmethod
     def get_nearby_objects_xy(self, x, y):
         pass
@@ -222,24 +328,30 @@ class CollisionSystem(metaclass=abc.ABCMeta):
     def get_nearby_objects(self, car):
         return car.cell.contents  # speedup/simplification to ignore cars in adjacent cells
 
-    def process_collisions(self, cars):
-        for car in cars:
-            nearby_cars = self.get_nearby_objects(car)
-            if not nearby_cars:
-                car.throttle_up()
+    def get_nearby_objects_ahead(self, car, look_ahead):
+        """Cars that car, looking ahead to the point look_ahead, could hit"""
+        return self.get_nearby_objects(car)
 
+    def find_collisions(self, cars):
+        """Returns list of bools by car index, True if that car is about to hit another car"""
+        collisions = []
+        for car in cars:
+            look_ahead = car.look_ahead()
             collision_detected = False
-            for car_index in nearby_cars:
+            for car_index in self.get_nearby_objects_ahead(car, look_ahead):
                 other = cars[car_index]
-                if car == other:
-                    continue
-
-                if car.check_collision(other):
+                if other is not car and car.check_collision(other, look_ahead):
                     collision_detected = True
-                    # other.throttle_up()
-                    car.throttle_down()
+                    break
+            collisions.append(collision_detected)
+        return collisions
 
-            if not collision_detected:
+    def process_collisions(self, cars):
+        """Throttle down every car about to hit another car and throttle up the rest"""
+        for car, collision_detected in zip(cars, self.find_collisions(cars)):
+            if collision_detected:
+                car.throttle_down()
+            else:
                 car.throttle_up()
 
 
@@ -260,13 +372,17 @@ class GridCollisionSystem(CollisionSystem):
             self.grid.insert_into_cell(car.cell, car.index)
 
     def get_nearby_objects_xy(self, x, y):
-        return self.grid.get_cell_contents(x, y) or []
+        cell_num = self.grid.get_cell_num(x, y)
+        return self.grid.cells[cell_num].contents if cell_num != -1 else []
+
+    def get_nearby_objects(self, car):
+        return self.grid.cells[car.cell].contents if car.cell != -1 else []
 
     def update_objects(self, cars):
         for car in cars:
             cell_num = self.grid.get_cell_num(car.x, car.y)
             if cell_num != car.cell:
-                self.grid.remove_from_cell(cell_num, car.index)
+                self.grid.remove_from_cell(car.cell, car.index)
                 self.grid.insert_into_cell(cell_num, car.index)
                 car.cell = cell_num
 
@@ -292,13 +408,14 @@ class QuadTreeCollisionSystem(CollisionSystem):
 
     def remove_trees(self):
         """Consolidates subtrees"""
+        self.empty_trees_counter += 1
         if self.empty_trees_counter % 100 != 0:  # no need to do this every frame
-            self.empty_trees_counter += 1
             return
 
         for empty_tree in self.empty_trees:
             parent_tree = empty_tree.parent
             parent_tree.remove_tree(empty_tree)
+        self.empty_trees.clear()
 
     def update_objects(self, cars):
         for car in cars:
@@ -317,3 +434,344 @@ class QuadTreeCollisionSystem(CollisionSystem):
                     self.empty_trees.remove(new_tree)
 
         self.remove_trees()
+
+
+class SpatialHashCollisionSystem(CollisionSystem):
+    """Collision system over a SpatialHash that also checks the 8 neighbouring cells
+
+    A car can only hit cars within one car length of its look-ahead point, so with cells
+    at least one car length wide every car it could hit is in the 3x3 block of cells
+    around that point, even at a cell border. The look-ahead point is computed once per
+    car instead of once per nearby car.
+    """
+    def __init__(self, window, cars, cell_size=16):
+        self.x_min = -window.scrollregion_x / 2.0
+        self.y_min = -window.scrollregion_y / 2.0
+        self.spatial_hash = SpatialHash(cell_size, self.x_min, self.y_min)
+        for car in cars:
+            self.spatial_hash.insert(car.index, car.x, car.y)
+
+    def get_nearby_objects_xy(self, x, y):
+        return self.spatial_hash.get_cell_contents(x, y)
+
+    def get_nearby_objects(self, car):
+        return self.spatial_hash.get_nearby_objects(*car.look_ahead())
+
+    def get_nearby_objects_ahead(self, car, look_ahead):
+        return self.spatial_hash.get_nearby_objects(*look_ahead)
+
+    def update_objects(self, cars):
+        move = self.spatial_hash.move
+        for car in cars:
+            move(car.index, car.x, car.y)
+
+
+class EdgeCollisionSystem(CollisionSystem):
+    """Collision system that only looks along the road, with no spatial index at all
+
+    The cars on each edge are kept in a list sorted back to front by distance left to the
+    end of the edge. A car's leader is the next car in its edge's list, or for the front car
+    the rearmost car on the next edge of its route. A car is about to collide when its
+    leader is closer than the look-ahead distance plus half of both car lengths.
+
+    Lists persist between ticks and cars rarely overtake, so re-sorting them is close to
+    linear and a whole tick is O(n).
+    """
+    look_ahead = 20.0  # same as adjustment_factor in Car.look_ahead
+
+    def __init__(self, window, cars):
+        self.cars = cars                       # every car, cars passed to update_objects may be a subset
+        self.edge_cars = {}                    # edge id: car indices sorted back to front
+        self.remaining = [0.0] * len(cars)     # car index: distance left to the end of its edge
+        self.leaders = [None] * len(cars)      # car index: leader car index or None
+        self.gaps = [math.inf] * len(cars)     # car index: distance to leader
+        for car in cars:
+            car.cell = None
+        self.update_objects(cars)
+
+    @staticmethod
+    def remaining_distance(car):
+        nx, ny = car.target()
+        return math_utils.pythag(nx - car.x, ny - car.y)
+
+    @staticmethod
+    def next_edge(car):
+        return car.route[-1] if car.route else None
+
+    def get_nearby_objects_xy(self, x, y):
+        return []  # cars are indexed by edge, not by position
+
+    def get_nearby_objects(self, car):
+        leader = self.leaders[car.index]
+        return [] if leader is None else [leader]
+
+    def list_key(self, car):
+        """Key of the ordered list car belongs in, None if it isn't on an edge"""
+        return car.current_edge.id if car.current_edge else None
+
+    def next_list_key(self, car, next_edge):
+        """Key of the list car will join when it moves onto next_edge"""
+        return next_edge.id
+
+    def update_objects(self, cars):
+        remaining = self.remaining
+        for car in cars:
+            remaining[car.index] = self.remaining_distance(car)
+            edge_id = self.list_key(car)
+            if edge_id != car.cell:
+                if car.cell is not None:
+                    old_edge_cars = self.edge_cars[car.cell]
+                    old_edge_cars.remove(car.index)
+                    if not old_edge_cars:
+                        del self.edge_cars[car.cell]
+                if edge_id is not None:
+                    self.edge_cars.setdefault(edge_id, []).append(car.index)
+                car.cell = edge_id
+
+        for edge_cars in self.edge_cars.values():
+            edge_cars.sort(key=remaining.__getitem__, reverse=True)
+        self.update_leaders(cars)
+
+    def remove(self, car):
+        """Stop tracking car until it is passed to update_objects again"""
+        if car.cell is not None:
+            edge_cars = self.edge_cars[car.cell]
+            edge_cars.remove(car.index)
+            if not edge_cars:
+                del self.edge_cars[car.cell]
+            car.cell = None
+        self.leaders[car.index] = None
+        self.gaps[car.index] = math.inf
+
+    def update_leaders(self, cars):
+        remaining = self.remaining
+        leaders = self.leaders
+        gaps = self.gaps
+        for edge_cars in self.edge_cars.values():
+            for back, front in zip(edge_cars, edge_cars[1:]):
+                leaders[back] = front
+                gaps[back] = remaining[back] - remaining[front]
+
+            front = edge_cars[-1]
+            leaders[front] = None
+            gaps[front] = math.inf
+            front_car = self.cars[front]
+            next_edge = self.next_edge(front_car)
+            next_key = None if next_edge is None else self.next_list_key(front_car, next_edge)
+            if next_key in self.edge_cars:
+                leader = self.edge_cars[next_key][0]
+                if leader != front:
+                    leaders[front] = leader
+                    gaps[front] = remaining[front] + next_edge.weight - remaining[leader]
+
+        for car in cars:
+            if car.cell is None:
+                leaders[car.index] = None
+                gaps[car.index] = math.inf
+
+    def find_collisions(self, cars):
+        collisions = []
+        for car, leader, gap in zip(cars, self.leaders, self.gaps):
+            collisions.append(
+                leader is not None and gap * 2 < self.look_ahead * 2 + car.height + cars[leader].height
+            )
+        return collisions
+
+    def count_overlaps(self, cars):
+        """Number of cars that have already run into their leader"""
+        return sum(
+            leader is not None and gap * 2 < car.height + cars[leader].height
+            for car, leader, gap in zip(cars, self.leaders, self.gaps)
+        )
+
+
+class LaneCollisionSystem(EdgeCollisionSystem):
+    """Edge collision system with a separate ordered list of cars for every (edge, lane)
+
+    Lists are keyed by the car's lane slot (see LaneGeometry). Next to each list the
+    system keeps the cars' distances along the edge in ascending order, so the leader and
+    follower a car would have in any other lane of its edge is one binary search away.
+    Cars only see leaders in their own lane.
+    """
+    def __init__(self, window, cars):
+        self.positions = {}                  # lane slot: distance along the edge of each car in edge_cars[slot]
+        self.followers = [None] * len(cars)  # car index: follower car index in the same lane or None
+        super().__init__(window, cars)
+
+    def list_key(self, car):
+        return car.lane_slot if car.current_edge else None
+
+    def next_list_key(self, car, next_edge):
+        return car.gps.lane_geometry.slot(next_edge, car.lane_index)
+
+    def update_objects(self, cars):
+        super().update_objects(cars)
+        remaining = self.remaining
+        self.positions = {
+            slot: [-remaining[index] for index in lane_cars] for slot, lane_cars in self.edge_cars.items()
+        }
+
+    def update_leaders(self, cars):
+        super().update_leaders(cars)
+        followers = self.followers
+        for car in cars:
+            followers[car.index] = None
+        for lane_cars in self.edge_cars.values():
+            for back, front in zip(lane_cars, lane_cars[1:]):
+                followers[front] = back
+
+    def lane_neighbours(self, car, slot):
+        """(leader, gap, follower, follower gap) car would have if it were in lane slot of its edge
+
+        Gaps are centre to centre, None and inf where there is no leader or follower.
+        Like update_leaders, a leader past the end of the edge is looked for in the same
+        lane of the next edge, but a follower is only looked for on car's own edge.
+        """
+        index = car.index
+        if slot == car.cell:
+            follower = self.followers[index]
+            follower_gap = math.inf if follower is None else self.gaps[follower]
+            return self.leaders[index], self.gaps[index], follower, follower_gap
+
+        lane_cars = self.edge_cars.get(slot, [])
+        position = self.positions.get(slot, [])
+        i = bisect.bisect_left(position, -self.remaining[index])
+        leader = follower = None
+        gap = follower_gap = math.inf
+        if i < len(lane_cars):
+            leader = lane_cars[i]
+            gap = self.remaining[index] - self.remaining[leader]
+        else:
+            next_edge = self.next_edge(car)
+            if next_edge is not None:
+                geometry = car.gps.lane_geometry
+                lane = slot - geometry.first_slots[car.current_edge.id]
+                next_lane_cars = self.edge_cars.get(geometry.slot(next_edge, lane))
+                if next_lane_cars:
+                    leader = next_lane_cars[0]
+                    gap = self.remaining[index] + next_edge.weight - self.remaining[leader]
+        if i > 0:
+            follower = lane_cars[i - 1]
+            follower_gap = self.remaining[follower] - self.remaining[index]
+        return leader, gap, follower, follower_gap
+
+
+class VectorizedCollisionSystem(CollisionSystem):
+    """Finds every car about to hit another car with NumPy array operations
+
+    Each tick every car's look-ahead point is computed once. Cars are indexed by sorting
+    their cell keys, and the candidate pairs for a car are all indexed cars in the 3x3 block
+    of cells around its look-ahead point, found with binary searches on the sorted keys.
+    The same overlap test as Car.check_collision is then run on all pairs at once.
+
+    Positions and targets come from a VehicleArrays store when one is given, otherwise
+    they are gathered from the Car objects.
+    """
+    look_ahead = 20.0  # same as adjustment_factor in Car.check_collision
+    key_stride = 1 << 32  # cell key = col * key_stride + row
+
+    def __init__(self, window, cars, vehicles=None, cell_size=32):
+        self.x_min = -window.scrollregion_x / 2.0
+        self.y_min = -window.scrollregion_y / 2.0
+        self.cell_size = cell_size
+        self.vehicles = vehicles
+        self.reads_car_positions = vehicles is None
+        self.heights = np.array([car.height for car in cars], dtype=float)
+        self.order = np.empty(0, dtype=int)        # car indices sorted by cell key
+        self.sorted_keys = np.empty(0, dtype=np.int64)
+        self.update_objects(cars)
+
+    def positions(self, cars):
+        if self.vehicles is not None:
+            return self.vehicles.x, self.vehicles.y
+        x = np.array([car.x for car in cars], dtype=float)
+        y = np.array([car.y for car in cars], dtype=float)
+        return x, y
+
+    def targets(self, cars):
+        if self.vehicles is not None:
+            return self.vehicles.target_x, self.vehicles.target_y
+        targets = np.array([car.target() for car in cars], dtype=float).reshape(-1, 2)
+        return targets[:, 0], targets[:, 1]
+
+    def cell_coords(self, x, y):
+        col = np.floor((x - self.x_min) / self.cell_size).astype(np.int64)
+        row = np.floor((y - self.y_min) / self.cell_size).astype(np.int64)
+        return col, row
+
+    def update_objects(self, cars):
+        col, row = self.cell_coords(*self.positions(cars))
+        keys = col * self.key_stride + row
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def get_nearby_objects_xy(self, x, y):
+        col, row = self.cell_coords(np.array([x]), np.array([y]))
+        return self.objects_in_cells(col * self.key_stride + row)[1].tolist()
+
+    def get_nearby_objects(self, car):
+        """Cars indexed in the 3x3 block of cells around car"""
+        col, row = self.cell_coords(np.array([car.x]), np.array([car.y]))
+        keys = [(col + dc) * self.key_stride + (row + dr) for dc in (-1, 0, 1) for dr in (-1, 0, 1)]
+        return self.objects_in_cells(np.concatenate(keys))[1].tolist()
+
+    def objects_in_cells(self, keys):
+        """Returns (query index, car index) arrays for every indexed car in each queried cell"""
+        lo = np.searchsorted(self.sorted_keys, keys, side="left")
+        hi = np.searchsorted(self.sorted_keys, keys, side="right")
+        counts = hi - lo
+        query_indices = np.repeat(np.arange(len(keys)), counts)
+        range_starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        car_indices = self.order[range_starts + np.arange(counts.sum())]
+        return query_indices, car_indices
+
+    def candidate_pairs(self, look_x, look_y):
+        col, row = self.cell_coords(look_x, look_y)
+        cars_pairs = []
+        others_pairs = []
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                car_indices, other_indices = self.objects_in_cells((col + dc) * self.key_stride + (row + dr))
+                cars_pairs.append(car_indices)
+                others_pairs.append(other_indices)
+        return np.concatenate(cars_pairs), np.concatenate(others_pairs)
+
+    def find_collisions(self, cars):
+        """Returns boolean array by car index, True if that car is about to hit another car"""
+        x, y = self.positions(cars)
+        target_x, target_y = self.targets(cars)
+        dx = target_x - x
+        dy = target_y - y
+        dist = np.hypot(dx, dy)
+        dist[dist == 0] = 1.0
+        look_x = x + (dx / dist) * self.look_ahead
+        look_y = y + (dy / dist) * self.look_ahead
+
+        car_indices, other_indices = self.candidate_pairs(look_x, look_y)
+        not_self = car_indices != other_indices
+        car_indices = car_indices[not_self]
+        other_indices = other_indices[not_self]
+
+        # width vs height is dependent on the car's orientation,
+        # simplify by always checking longest one
+        heights = self.heights[car_indices] + self.heights[other_indices]
+        x_overlap = np.abs(look_x[car_indices] - x[other_indices]) * 2 < heights
+        y_overlap = np.abs(look_y[car_indices] - y[other_indices]) * 2 < heights
+
+        collisions = np.zeros(len(x), dtype=bool)
+        collisions[car_indices[x_overlap & y_overlap]] = True
+        return collisions
+
+    def process_collisions(self, cars):
+        """Throttles every car and returns the (throttle up, throttle down) masks"""
+        throttle_down = self.find_collisions(cars)
+        throttle_up = ~throttle_down
+        if self.vehicles is not None:
+            self.vehicles.throttle(throttle_down)
+        else:
+            for car, collision_detected in zip(cars, throttle_down.tolist()):
+                if collision_detected:
+                    car.throttle_down()
+                else:
+                    car.throttle_up()
+        return throttle_up, throttle_down
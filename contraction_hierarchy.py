@@ -0,0 +1,247 @@
+import heapq
+import math
+import os
+
+import file_utils
+
+
+class ContractionHierarchy:
+    """Contraction hierarchy over a Graph for fast point to point shortest routes
+
+    Preprocessing contracts vertices one at a time in order of importance, adding a
+    shortcut edge u->w (through v) whenever contracting v would otherwise break the
+    only shortest path from u to w. A query then runs Dijkstra upward (towards more
+    important vertices) from both the source and the dest and meets in the middle,
+    which only ever touches a small fraction of the graph.
+    """
+    VERSION = 1
+
+    def __init__(self, rank, edges, signature=None):
+        self.rank = rank        # vertex_id: contraction order (higher is more important)
+        self.edges = edges      # (source_id, dest_id): (weight, middle vertex_id or None)
+        self.signature = signature
+        self.upward = {vertex_id: [] for vertex_id in rank}    # vertex_id: [(dest_id, weight)]
+        self.downward = {vertex_id: [] for vertex_id in rank}  # vertex_id: [(source_id, weight)]
+        for (source_id, dest_id), (weight, _) in edges.items():
+            if rank[dest_id] > rank[source_id]:
+                self.upward[source_id].append((dest_id, weight))
+            else:
+                self.downward[dest_id].append((source_id, weight))
+
+    @classmethod
+    def build(cls, graph, witness_settle_limit=64):
+        builder = _ContractionBuilder(graph, witness_settle_limit)
+        rank, edges = builder.contract_all()
+        return cls(rank, edges, graph_signature(graph))
+
+    @classmethod
+    def load_or_build(cls, graph, map_filename):
+        """Load preprocessed hierarchy for a map file, building and saving it if needed"""
+        filename = cache_filename(map_filename)
+        if os.path.exists(filename):
+            contraction_hierarchy = cls.from_json(file_utils.load_json(filename))
+            if contraction_hierarchy and contraction_hierarchy.signature == graph_signature(graph):
+                return contraction_hierarchy
+
+        contraction_hierarchy = cls.build(graph)
+        file_utils.save_json(contraction_hierarchy.to_json(), filename)
+        return contraction_hierarchy
+
+    def to_json(self):
+        return {
+            "version": self.VERSION,
+            "signature": self.signature,
+            "rank": [[vertex_id, rank] for vertex_id, rank in self.rank.items()],
+            "edges": [
+                [source_id, dest_id, weight, middle]
+                for (source_id, dest_id), (weight, middle) in self.edges.items()
+            ],
+        }
+
+    @classmethod
+    def from_json(cls, json_data):
+        """Returns None if the data was written by an incompatible version"""
+        if json_data.get("version") != cls.VERSION:
+            return None
+        rank = {vertex_id: rank for vertex_id, rank in json_data["rank"]}
+        edges = {
+            (source_id, dest_id): (weight, middle)
+            for source_id, dest_id, weight, middle in json_data["edges"]
+        }
+        return cls(rank, edges, json_data["signature"])
+
+    def shortest_route(self, source_id, dest_id):
+        """Returns list of vertex ids with dest first, or None if no route exists"""
+        if source_id == dest_id:
+            return [dest_id]
+
+        forward = _UpwardSearch(self.upward, source_id)
+        backward = _UpwardSearch(self.downward, dest_id)
+        best_length = math.inf
+        meeting_vertex = None
+
+        while not (forward.is_done(best_length) and backward.is_done(best_length)):
+            for search, other in ((forward, backward), (backward, forward)):
+                if search.is_done(best_length):
+                    continue
+                vertex_id = search.settle_next()
+                length = search.path_lengths[vertex_id] + other.path_lengths.get(vertex_id, math.inf)
+                if length < best_length:
+                    best_length = length
+                    meeting_vertex = vertex_id
+
+        if meeting_vertex is None:
+            return None
+
+        path = forward.path_to(meeting_vertex)[::-1] + backward.path_to(meeting_vertex)[1:]
+        route = [path[0]]
+        for source, dest in zip(path, path[1:]):
+            route.extend(self.unpack_edge(source, dest))
+        return route[::-1]
+
+    def unpack_edge(self, source_id, dest_id):
+        """Expand an edge (possibly a shortcut) into the vertex ids after source_id"""
+        _, middle = self.edges[(source_id, dest_id)]
+        if middle is None:
+            return [dest_id]
+        return self.unpack_edge(source_id, middle) + self.unpack_edge(middle, dest_id)
+
+
+class _UpwardSearch:
+    """One direction of the bidirectional query, Dijkstra restricted to upward edges"""
+    def __init__(self, adjacency, source_id):
+        self.adjacency = adjacency
+        self.path_lengths = {source_id: 0.0}
+        self.parents = {source_id: None}
+        self.pq = [(0.0, source_id)]
+
+    def is_done(self, best_length):
+        while self.pq and self.pq[0][0] > self.path_lengths[self.pq[0][1]]:
+            heapq.heappop(self.pq)  # drop stale entries
+        return not self.pq or self.pq[0][0] >= best_length
+
+    def settle_next(self):
+        distance, vertex_id = heapq.heappop(self.pq)
+        for neighbour_id, weight in self.adjacency[vertex_id]:
+            length = distance + weight
+            if length < self.path_lengths.get(neighbour_id, math.inf):
+                self.path_lengths[neighbour_id] = length
+                self.parents[neighbour_id] = vertex_id
+                heapq.heappush(self.pq, (length, neighbour_id))
+        return vertex_id
+
+    def path_to(self, vertex_id):
+        """Vertex ids from vertex_id back to the search source"""
+        path = []
+        while vertex_id is not None:
+            path.append(vertex_id)
+            vertex_id = self.parents[vertex_id]
+        return path
+
+
+class _ContractionBuilder:
+    def __init__(self, graph, witness_settle_limit):
+        self.witness_settle_limit = witness_settle_limit
+        self.out_edges = {vertex_id: {} for vertex_id in graph.vertices}  # source: {dest: (weight, middle)}
+        self.in_edges = {vertex_id: {} for vertex_id in graph.vertices}   # dest: {source: (weight, middle)}
+        self.edges = {}
+        self.contracted_neighbours = {vertex_id: 0 for vertex_id in graph.vertices}
+
+        for vertex in graph.vertices.values():
+            for edge in vertex.get_edges():
+                if edge.source != edge.dest:
+                    self.add_edge(edge.source, edge.dest, edge.weight, None)
+
+    def add_edge(self, source_id, dest_id, weight, middle):
+        existing = self.out_edges[source_id].get(dest_id)
+        if existing is not None and existing[0] <= weight:
+            return
+        self.out_edges[source_id][dest_id] = (weight, middle)
+        self.in_edges[dest_id][source_id] = (weight, middle)
+        self.edges[(source_id, dest_id)] = (weight, middle)
+
+    def contract_all(self):
+        pq = [(self.priority(vertex_id), vertex_id) for vertex_id in self.out_edges]
+        heapq.heapify(pq)
+        rank = {}
+
+        while pq:
+            _, vertex_id = heapq.heappop(pq)
+            # lazy update: importance may have changed since the vertex was queued
+            priority = self.priority(vertex_id)
+            if pq and priority > pq[0][0]:
+                heapq.heappush(pq, (priority, vertex_id))
+                continue
+
+            rank[vertex_id] = len(rank)
+            self.contract(vertex_id)
+
+        return rank, self.edges
+
+    def priority(self, vertex_id):
+        """Edge difference plus number of contracted neighbours"""
+        shortcuts = self.shortcuts_needed(vertex_id)
+        removed_edges = len(self.in_edges[vertex_id]) + len(self.out_edges[vertex_id])
+        return len(shortcuts) - removed_edges + self.contracted_neighbours[vertex_id]
+
+    def shortcuts_needed(self, vertex_id):
+        shortcuts = []
+        out_edges = self.out_edges[vertex_id]
+        if not out_edges:
+            return shortcuts
+
+        for source_id, (in_weight, _) in self.in_edges[vertex_id].items():
+            max_length = in_weight + max(weight for weight, _ in out_edges.values())
+            witness_lengths = self.witness_search(source_id, vertex_id, max_length)
+            for dest_id, (out_weight, _) in out_edges.items():
+                if dest_id == source_id:
+                    continue
+                length = in_weight + out_weight
+                if witness_lengths.get(dest_id, math.inf) > length:
+                    shortcuts.append((source_id, dest_id, length))
+        return shortcuts
+
+    def witness_search(self, source_id, excluded_id, max_length):
+        """Bounded Dijkstra from source_id in the remaining graph that avoids excluded_id"""
+        path_lengths = {source_id: 0.0}
+        pq = [(0.0, source_id)]
+        settled = 0
+        while pq and settled < self.witness_settle_limit:
+            distance, vertex_id = heapq.heappop(pq)
+            if distance > path_lengths[vertex_id]:
+                continue
+            if distance > max_length:
+                break
+            settled += 1
+            for dest_id, (weight, _) in self.out_edges[vertex_id].items():
+                if dest_id == excluded_id:
+                    continue
+                length = distance + weight
+                if length < path_lengths.get(dest_id, math.inf):
+                    path_lengths[dest_id] = length
+                    heapq.heappush(pq, (length, dest_id))
+        return path_lengths
+
+    def contract(self, vertex_id):
+        for source_id, dest_id, length in self.shortcuts_needed(vertex_id):
+            self.add_edge(source_id, dest_id, length, vertex_id)
+
+        # edges to and from the contracted vertex stay in self.edges for queries
+        for dest_id in self.out_edges.pop(vertex_id):
+            self.in_edges[dest_id].pop(vertex_id)
+            self.contracted_neighbours[dest_id] += 1
+        for source_id in self.in_edges.pop(vertex_id):
+            self.out_edges[source_id].pop(vertex_id)
+            self.contracted_neighbours[source_id] += 1
+
+
+def graph_signature(graph):
+    """Cheap fingerprint to detect a hierarchy that no longer matches its graph"""
+    total_weight = sum(
+        edge.weight for vertex in graph.vertices.values() for edge in vertex.get_edges()
+    )
+    return [len(graph.vertices), graph.edge_cnt, round(total_weight, 3)]
+
+
+def cache_filename(map_filename):
+    return os.path.splitext(map_filename)[0] + ".ch.json"
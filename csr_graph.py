@@ -0,0 +1,212 @@
+from array import array
+from collections.abc import Mapping
+
+import math_utils
+from graphs import GraphBase
+
+
+class CSRGraph(GraphBase):
+    """Compact compressed sparse row (CSR) representation of a Graph
+
+    Vertices are remapped from OpenStreetMap ids to dense indices and all vertex and
+    edge attributes live in flat arrays. The outgoing edges of vertex i are the edge
+    indices offsets[i] to offsets[i + 1]. Road names and speed limits are interned in
+    a shared string table so each edge only stores an index into it.
+
+    VertexView and EdgeView objects are created on access and expose the same
+    attributes as Vertex and Edge, so RoadMap, GPS and Car work unchanged.
+    """
+    def __init__(self):
+        super().__init__()
+        self.vertex_ids = array('q')   # vertex index: OpenStreetMap id
+        self.index_of = {}             # OpenStreetMap id: vertex index
+        self.x = array('d')
+        self.y = array('d')
+        self.is_intersection = bytearray()
+
+        self.offsets = array('l', [0])  # vertex index: index of first outgoing edge
+        self.sources = array('l')       # edge index: source vertex index
+        self.targets = array('l')       # edge index: dest vertex index
+        self.weights = array('d')
+        self.lanes = array('H')
+        self.is_one_way = bytearray()
+        self.name_ids = array('l')         # edge index: index into strings
+        self.speed_limit_ids = array('l')  # edge index: index into strings
+        self.strings = []
+        self.string_ids = {}
+        self.edge_index = {}  # source index * vertex_cnt + dest index: edge index
+
+        self.vertices = VertexMap(self)
+
+    @classmethod
+    def from_graph(cls, graph):
+        csr_graph = cls()
+        for vertex_id, vertex in graph.vertices.items():
+            csr_graph.index_of[vertex_id] = len(csr_graph.vertex_ids)
+            csr_graph.vertex_ids.append(vertex_id)
+            csr_graph.x.append(vertex.x)
+            csr_graph.y.append(vertex.y)
+            csr_graph.is_intersection.append(vertex.is_intersection)
+
+        for vertex_index, vertex in enumerate(graph.vertices.values()):
+            for edge in vertex.get_edges():
+                csr_graph.sources.append(vertex_index)
+                csr_graph.targets.append(csr_graph.index_of[edge.dest])
+                csr_graph.weights.append(edge.weight)
+                csr_graph.lanes.append(edge.lanes)
+                csr_graph.is_one_way.append(edge.is_one_way)
+                csr_graph.name_ids.append(csr_graph.intern(edge.name))
+                csr_graph.speed_limit_ids.append(csr_graph.intern(edge.speed_limit))
+            csr_graph.offsets.append(len(csr_graph.targets))
+
+        vertex_cnt = csr_graph.vertex_cnt
+        for edge_index in range(csr_graph.edge_cnt - 1, -1, -1):  # first edge wins, like a scan would
+            key = csr_graph.sources[edge_index] * vertex_cnt + csr_graph.targets[edge_index]
+            csr_graph.edge_index[key] = edge_index
+        return csr_graph
+
+    def __repr__(self):
+        ret = "Number of vertices: " + str(self.vertex_cnt) + "\n"
+        ret += "Number of edges: " + str(self.edge_cnt) + "\n"
+        for vertex_id, vertex in self.vertices.items():
+            ret += str(vertex_id) + ": " + str(vertex.get_edges()) + "\n"
+        return ret
+
+    @property
+    def vertex_cnt(self):
+        return len(self.vertex_ids)
+
+    @property
+    def edge_cnt(self):
+        return len(self.targets)
+
+    def intern(self, string):
+        string_id = self.string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self.string_ids[string] = string_id
+        return string_id
+
+    def get_edge(self, source_id, dest_id):
+        """EdgeView from source_id to dest_id, None if there isn't one"""
+        edge_index = self.edge_index.get(self.index_of[source_id] * self.vertex_cnt + self.index_of[dest_id])
+        return None if edge_index is None else EdgeView(self, edge_index)
+
+    def update_edge_weight(self, edge, weight):
+        old_weight = self.weights[edge.id]
+        self.weights[edge.id] = weight
+        self.notify_observers(edge, old_weight)
+
+    def adj_edges(self, v):
+        return self.vertices[v.id].get_edges()
+
+    def distance_between_vertices(self, vertex_id_1, vertex_id_2):
+        i = self.index_of[vertex_id_1]
+        j = self.index_of[vertex_id_2]
+        return math_utils.pythag(self.x[j] - self.x[i], self.y[j] - self.y[i])
+
+
+class VertexMap(Mapping):
+    """Read only {vertex_id: VertexView} mapping over a CSRGraph"""
+    def __init__(self, csr_graph):
+        self.csr_graph = csr_graph
+
+    def __getitem__(self, vertex_id):
+        return VertexView(self.csr_graph, self.csr_graph.index_of[vertex_id])
+
+    def __contains__(self, vertex_id):
+        return vertex_id in self.csr_graph.index_of
+
+    def __iter__(self):
+        return iter(self.csr_graph.vertex_ids)
+
+    def __len__(self):
+        return len(self.csr_graph.vertex_ids)
+
+
+class VertexView:
+    __slots__ = ("csr_graph", "index")
+
+    def __init__(self, csr_graph, index):
+        self.csr_graph = csr_graph
+        self.index = index
+
+    def __eq__(self, that):
+        return self.id == that.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return str(self.id) + ":" + str(self.edges)
+
+    @property
+    def id(self):
+        return self.csr_graph.vertex_ids[self.index]
+
+    @property
+    def x(self):
+        return self.csr_graph.x[self.index]
+
+    @property
+    def y(self):
+        return self.csr_graph.y[self.index]
+
+    @property
+    def is_intersection(self):
+        return bool(self.csr_graph.is_intersection[self.index])
+
+    @property
+    def edges(self):
+        csr_graph = self.csr_graph
+        edge_range = range(csr_graph.offsets[self.index], csr_graph.offsets[self.index + 1])
+        return [EdgeView(csr_graph, edge_index) for edge_index in edge_range]
+
+    def get_edges(self):
+        return self.edges
+
+
+class EdgeView:
+    __slots__ = ("csr_graph", "id")
+
+    def __init__(self, csr_graph, edge_index):
+        self.csr_graph = csr_graph
+        self.id = edge_index
+
+    def __repr__(self):
+        return str(self.source) + "->" + str(self.dest) + " (" + str(self.weight) + ")"
+
+    def __eq__(self, other):
+        return self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    @property
+    def source(self):
+        return self.csr_graph.vertex_ids[self.csr_graph.sources[self.id]]
+
+    @property
+    def dest(self):
+        return self.csr_graph.vertex_ids[self.csr_graph.targets[self.id]]
+
+    @property
+    def weight(self):
+        return self.csr_graph.weights[self.id]
+
+    @property
+    def name(self):
+        return self.csr_graph.strings[self.csr_graph.name_ids[self.id]]
+
+    @property
+    def speed_limit(self):
+        return self.csr_graph.strings[self.csr_graph.speed_limit_ids[self.id]]
+
+    @property
+    def lanes(self):
+        return self.csr_graph.lanes[self.id]
+
+    @property
+    def is_one_way(self):
+        return bool(self.csr_graph.is_one_way[self.id])
@@ -0,0 +1,192 @@
+import math
+
+import numpy as np
+
+
+class ThrottleDriverModel:
+    """Original model: every car speeds up by 10% per tick, or slows down by 10% while the
+    collision system sees another car just ahead of it"""
+    def __init__(self, collision_system, vehicles=None):
+        self.collision_system = collision_system
+        self.vehicles = vehicles
+
+    def update(self, cars, dt):
+        if self.vehicles is not None:
+            self.vehicles.throttle(self.collision_system.find_collisions(cars))
+        else:
+            self.collision_system.process_collisions(cars)
+
+
+class IntelligentDriverModel:
+    """Intelligent Driver Model (Treiber, Hennecke and Helbing) car following
+
+    Each car accelerates towards the speed limit and brakes smoothly based on the gap to
+    its leader and how fast it is closing in:
+
+        acceleration = a * (1 - (v / v0)**delta - (s* / s)**2)
+        s* = s0 + v * T + v * (v - v_leader) / (2 * sqrt(a * b))
+
+    where s is the bumper to bumper gap. Leaders and centre to centre gaps come from a
+    LaneCollisionSystem, which Simulation insists on for this model, and the accelerations
+    of all cars are computed in one batch of NumPy operations. Distances are in pixels
+    and times in seconds.
+    """
+    def __init__(self, leader_index, vehicles=None, max_acceleration=10.0, comfortable_deceleration=15.0,
+                 min_gap=4.0, time_headway=1.0, delta=4):
+        self.leader_index = leader_index  # LaneCollisionSystem, leaders and gaps indexed by car index
+        self.vehicles = vehicles
+        self.max_acceleration = max_acceleration                # a
+        self.comfortable_deceleration = comfortable_deceleration  # b
+        self.min_gap = min_gap            # s0, gap kept to a stopped leader
+        self.time_headway = time_headway  # T
+        self.delta = delta
+
+    def accelerations(self, speed, speed_limit, leader_speed, gap):
+        """IDM acceleration for arrays of speeds and bumper to bumper gaps (inf for no leader)"""
+        a = self.max_acceleration
+        free_road = 1.0 - (speed / np.maximum(speed_limit, 1.0)) ** self.delta
+        desired_gap = self.min_gap + np.maximum(
+            0.0,
+            speed * self.time_headway
+            + speed * (speed - leader_speed) / (2.0 * np.sqrt(a * self.comfortable_deceleration)),
+        )
+        interaction = (desired_gap / np.maximum(gap, 0.01)) ** 2  # 0 when gap is inf
+        return a * (free_road - interaction)
+
+    def follower_accelerations(self, cars, speed, speed_limit, followers, leaders, gaps):
+        """Accelerations of cars[followers] behind cars[leaders] at centre to centre gaps,
+        a leader of -1 means an open road"""
+        lengths = np.fromiter((car.height for car in cars), float, len(cars))
+        gap = gaps - (lengths[followers] + lengths[leaders]) / 2
+        leader_speed = np.where(leaders >= 0, speed[leaders], speed[followers])
+        return self.accelerations(speed[followers], speed_limit[followers], leader_speed, gap)
+
+    def update(self, cars, dt):
+        """cars may be a subset of the cars in leader_index, leaders outside it count as open road"""
+        speed, speed_limit = car_speeds(cars, self.vehicles)
+        positions = {car.index: i for i, car in enumerate(cars)}
+        leaders = np.fromiter(
+            (positions.get(self.leader_index.leaders[car.index], -1) for car in cars), int, len(cars)
+        )
+        gaps = np.fromiter((self.leader_index.gaps[car.index] for car in cars), float, len(cars))
+        accelerations = self.follower_accelerations(cars, speed, speed_limit, np.arange(len(cars)), leaders, gaps)
+
+        new_speed = np.maximum(speed + accelerations * dt, 0.0)
+        if self.vehicles is not None:
+            self.vehicles.speed = new_speed
+        else:
+            for car, car_speed in zip(cars, new_speed.tolist()):
+                car.speed = car_speed
+
+
+class MobilLaneChangeModel:
+    """MOBIL (Kesting, Treiber and Helbing) lane changes on top of a car following model
+
+    A car on an edge with more than one lane in its direction moves to an adjacent lane
+    when its own gain outweighs what the change costs the cars behind it, and its new
+    follower won't have to brake too hard:
+
+        a'c - ac + politeness * (a'n - an + a'o - ao) > threshold
+        a'n > -max_safe_deceleration
+
+    where c is the car, n its new follower, o its old follower and a' are accelerations
+    after the change. Only the leader and follower in the car's own lane and in each
+    adjacent lane are looked at, all found by binary search in a LaneCollisionSystem, and
+    every candidate change is evaluated in one batch by the car following model.
+    """
+    def __init__(self, car_following, lane_index, vehicles=None, politeness=0.3, threshold=1.0,
+                 max_safe_deceleration=20.0, min_lane_time=2.0, min_remaining=30.0):
+        self.car_following = car_following  # IntelligentDriverModel
+        self.lane_index = lane_index        # LaneCollisionSystem
+        self.vehicles = vehicles
+        self.politeness = politeness
+        self.threshold = threshold
+        self.max_safe_deceleration = max_safe_deceleration
+        self.min_lane_time = min_lane_time  # seconds a car stays in a lane before changing again
+        self.min_remaining = min_remaining  # no changing lanes this close to either end of an edge
+        self.time = 0.0
+        self.last_change = {}  # car index: time of its last lane change
+        self.lane_changes = 0
+
+    def lanes(self, car):
+        """(lane the car is in, number of lanes in its direction)"""
+        geometry = car.gps.lane_geometry
+        edge_id = car.current_edge.id
+        return car.lane_slot - geometry.first_slots[edge_id], geometry.lane_cnts[edge_id]
+
+    def candidates(self, cars):
+        """Yields (car, lane) for each adjacent lane a car is allowed to move to this tick"""
+        remaining = self.lane_index.remaining
+        for car in cars:
+            if car.current_edge is None:
+                continue
+            if not self.min_remaining <= remaining[car.index] <= car.current_edge.weight - self.min_remaining:
+                continue
+            if self.time - self.last_change.get(car.index, -math.inf) < self.min_lane_time:
+                continue
+            lane, lane_cnt = self.lanes(car)
+            for new_lane in (lane - 1, lane + 1):
+                if 0 <= new_lane < lane_cnt:
+                    yield car, new_lane
+
+    def update(self, cars, dt):
+        self.time += dt
+        candidates = []
+        terms = []  # (follower, leader, gap) for a'c, ac, a'n, an, a'o, ao of every candidate
+        for car, new_lane in self.candidates(cars):
+            c = car.index
+            lane, _ = self.lanes(car)
+            leader, gap, follower, follower_gap = self.lane_index.lane_neighbours(car, car.lane_slot)
+            new_leader, new_gap, new_follower, new_follower_gap = self.lane_index.lane_neighbours(
+                car, car.lane_slot + new_lane - lane)
+            # a missing follower is replaced by c on an open road in both its terms, which cancel out
+            open_road = [(c, None, math.inf)] * 2
+            new_follower_terms = open_road if new_follower is None else [
+                (new_follower, c, new_follower_gap), (new_follower, new_leader, new_follower_gap + new_gap)]
+            old_follower_terms = open_road if follower is None else [
+                (follower, leader, follower_gap + gap), (follower, c, follower_gap)]
+            neighbours = {leader, follower, new_leader, new_follower} - {None}
+            candidates.append((car, new_lane, new_follower is not None, neighbours))
+            terms += [(c, new_leader, new_gap), (c, leader, gap)] + new_follower_terms + old_follower_terms
+        if not candidates:
+            return
+
+        speed, speed_limit = car_speeds(cars, self.vehicles)
+        followers = np.array([term[0] for term in terms])
+        leaders = np.array([-1 if term[1] is None else term[1] for term in terms])
+        gaps = np.array([term[2] for term in terms], dtype=float)
+        a = self.car_following.follower_accelerations(
+            cars, speed, speed_limit, followers, leaders, gaps).reshape(-1, 6)
+        incentive = a[:, 0] - a[:, 1] + self.politeness * (a[:, 2] - a[:, 3] + a[:, 4] - a[:, 5])
+        has_new_follower = np.array([candidate[2] for candidate in candidates])
+        safe = ~has_new_follower | (a[:, 2] > -self.max_safe_deceleration)
+        incentive = np.where(safe, incentive, -math.inf)
+
+        # best change first, then skip any car whose own or neighbours' surroundings already
+        # changed this tick, so a whole queue can't jump to the same empty lane at once
+        involved = set()
+        changes = 0
+        for gain, (car, new_lane, _, neighbours) in sorted(
+                zip(incentive.tolist(), candidates), key=lambda candidate: candidate[0], reverse=True):
+            if gain <= self.threshold:
+                break
+            if car.index in involved or not involved.isdisjoint(neighbours):
+                continue
+            involved.add(car.index)
+            involved.update(neighbours)
+            car.change_lane(new_lane)
+            self.last_change[car.index] = self.time
+            if self.vehicles is not None:
+                self.vehicles.update_target(car.index)
+            changes += 1
+        self.lane_changes += changes
+
+
+def car_speeds(cars, vehicles=None):
+    """(speed, speed_limit) arrays indexed by car index"""
+    if vehicles is not None:
+        return vehicles.speed, vehicles.speed_limit
+    return (
+        np.fromiter((car.speed for car in cars), float, len(cars)),
+        np.fromiter((car.speed_limit for car in cars), float, len(cars)),
+    )
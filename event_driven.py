@@ -0,0 +1,217 @@
+import heapq
+import math
+from collections import deque
+
+import numpy as np
+
+import math_utils
+from driver_models import IntelligentDriverModel
+
+
+class EventDrivenSimulation:
+    """Discrete event simulation of a set of cars, a drop in replacement for Simulation
+
+    A car that has its lane of the current edge to itself, with nobody in its lane of the
+    next edge on its route, and that is cruising at the speed limit is free: nothing can
+    change its speed until it reaches its next waypoint. Instead of being moved every tick
+    it schedules its arrival at that waypoint in a heap and its position is only worked
+    out from its start point and speed when something needs it.
+
+    Every other car is interacting and is integrated each tick with the Intelligent
+    Driver Model. Cars join and leave lanes in order and never overtake, so each lane is
+    a deque in entry order and a car's leader is the car that entered before it, which
+    is kept in ahead so finding it doesn't search the lane, or the rearmost car in its
+    lane of the next edge.
+
+    Events are invalidated lazily: a free car that has to start interacting (because
+    another car entered its next lane) bumps its version and its stale arrival event is
+    skipped when it comes off the heap.
+    """
+    cruising_fraction = 0.98  # share of the speed limit at which a car counts as cruising
+
+    def __init__(self, cars, driver_model=None):
+        self.cars = cars
+        self.driver_model = driver_model or IntelligentDriverModel(None)
+        self.ticks = 0
+        self.sim_time = 0.0
+        self.tick_end = 0.0
+        self.events = []              # heap of (arrival time, car index, version)
+        self.events_processed = 0
+        self.integrations = 0         # car ticks integrated, free cars cost nothing per tick
+        self.versions = [0] * len(cars)
+        self.lane_cars = {}           # lane slot: deque of car indices in the order they entered the lane
+        self.ahead = [None] * len(cars)  # car index: the car ahead of it in its lane, None at the front
+        self.waiting = {}             # lane slot: free cars whose next lane it is
+        self.free = {}                # car index: (start time, x, y, unit x, unit y, distance to waypoint)
+        self.interacting = set()
+        lanes = {}
+        for car in cars:
+            lanes.setdefault(car.lane_slot, []).append(car.index)
+            car.cell = car.lane_slot
+        # cars further along their edge entered it first
+        for slot, lane_cars in lanes.items():
+            lane_cars.sort(key=lambda index: self.remaining_distance(cars[index]))
+            for front, back in zip(lane_cars, lane_cars[1:]):
+                self.ahead[back] = front
+            self.lane_cars[slot] = deque(lane_cars)
+        for car in cars:
+            self.classify(car, self.sim_time)
+
+    @staticmethod
+    def next_slot(car):
+        """car's lane slot on the next edge of its route, None if it has no next edge yet"""
+        if not car.route:
+            return None
+        return car.gps.lane_geometry.slot(car.route[-1], car.lane_index)
+
+    def position(self, car, time):
+        """(x, y) of car at time, free cars move in a straight line towards their waypoint"""
+        free = self.free.get(car.index)
+        if free is None:
+            return car.x, car.y
+        start_time, x, y, unit_x, unit_y, distance = free
+        travelled = min(car.speed * (time - start_time), distance)
+        return x + unit_x * travelled, y + unit_y * travelled
+
+    def remaining_distance(self, car, time=None):
+        x, y = self.position(car, self.sim_time if time is None else time)
+        target_x, target_y = car.target()
+        return math_utils.pythag(target_x - x, target_y - y)
+
+    def leader(self, car, remaining):
+        """(leader car index or None, centre to centre gap), remaining caches
+        remaining_distance by car index for the current tick"""
+        def remaining_distance(index):
+            if index not in remaining:
+                remaining[index] = self.remaining_distance(self.cars[index])
+            return remaining[index]
+
+        leader = self.ahead[car.index]
+        if leader is not None:
+            return leader, remaining_distance(car.index) - remaining_distance(leader)
+        next_lane_cars = self.lane_cars.get(self.next_slot(car))
+        if next_lane_cars:
+            leader = next_lane_cars[-1]
+            return leader, remaining_distance(car.index) + car.route[-1].weight - remaining_distance(leader)
+        return None, math.inf
+
+    def is_free(self, car):
+        if self.lane_cars[car.cell][0] != car.index or self.lane_cars.get(self.next_slot(car)):
+            return False
+        return car.speed >= car.speed_limit * self.cruising_fraction
+
+    def classify(self, car, time):
+        """Make car free and schedule its arrival, or add it to the interacting cars"""
+        if not self.is_free(car):
+            self.interacting.add(car.index)
+            return
+
+        self.interacting.discard(car.index)
+        car.speed = car.speed_limit
+        target_x, target_y = car.target()
+        dx = target_x - car.x
+        dy = target_y - car.y
+        distance = math_utils.pythag(dx, dy)
+        unit_x, unit_y = (dx / distance, dy / distance) if distance > 0 else (0.0, 0.0)
+        self.free[car.index] = (time, car.x, car.y, unit_x, unit_y, distance)
+        heapq.heappush(self.events, (time + distance / car.speed, car.index, self.versions[car.index]))
+        next_slot = self.next_slot(car)
+        if next_slot is not None:
+            self.waiting.setdefault(next_slot, set()).add(car.index)
+
+    def unfree(self, car):
+        """Pin a free car down where it will be at the end of this tick so it can be integrated"""
+        car.x, car.y = self.position(car, self.tick_end)
+        del self.free[car.index]
+        self.versions[car.index] += 1  # its scheduled arrival is now stale
+        next_slot = self.next_slot(car)
+        if next_slot in self.waiting:
+            self.waiting[next_slot].discard(car.index)
+        self.interacting.add(car.index)
+
+    def change_lane_slot(self, car):
+        """Move car from the lane it was in to the back of the one for its current lane slot"""
+        old_lane_cars = self.lane_cars[car.cell]
+        if old_lane_cars[0] == car.index:
+            old_lane_cars.popleft()
+            if old_lane_cars:
+                self.ahead[old_lane_cars[0]] = None
+        else:
+            # only if a car got to the end of its lane before the one ahead of it
+            position = old_lane_cars.index(car.index)
+            del old_lane_cars[position]
+            if position < len(old_lane_cars):
+                self.ahead[old_lane_cars[position]] = self.ahead[car.index]
+        if not old_lane_cars:
+            del self.lane_cars[car.cell]
+        lane_cars = self.lane_cars.setdefault(car.lane_slot, deque())
+        self.ahead[car.index] = lane_cars[-1] if lane_cars else None
+        lane_cars.append(car.index)
+        car.cell = car.lane_slot
+
+        # free cars heading into this lane are no longer alone
+        for index in self.waiting.pop(car.lane_slot, ()):
+            if index != car.index:
+                self.unfree(self.cars[index])
+
+    def arrive(self, car, time):
+        """Free car reached its waypoint at time"""
+        car.x, car.y = car.target()
+        del self.free[car.index]
+        next_slot = self.next_slot(car)
+        if next_slot in self.waiting:
+            self.waiting[next_slot].discard(car.index)
+        car.arrive_at_next_dest()
+        self.change_lane_slot(car)
+        self.classify(car, time)
+
+    def integrate(self, dt):
+        """One tick of the Intelligent Driver Model for every interacting car"""
+        interacting = [self.cars[index] for index in sorted(self.interacting)]
+        if not interacting:
+            return
+        speed = np.array([car.speed for car in interacting])
+        speed_limit = np.array([car.speed_limit for car in interacting])
+        leader_speed = speed.copy()
+        gap = np.full(len(interacting), math.inf)
+        remaining = {}
+        for i, car in enumerate(interacting):
+            leader, centre_gap = self.leader(car, remaining)
+            if leader is not None:
+                leader_speed[i] = self.cars[leader].speed
+                gap[i] = centre_gap - (car.height + self.cars[leader].height) / 2
+        accelerations = self.driver_model.accelerations(speed, speed_limit, leader_speed, gap)
+        new_speed = np.maximum(speed + accelerations * dt, 0.0)
+
+        for car, car_speed in zip(interacting, new_speed.tolist()):
+            car.speed = car_speed
+            car.move_towards_dest(dt)
+            if car.lane_slot != car.cell:
+                self.change_lane_slot(car)
+        self.integrations += len(interacting)
+
+    def step(self, dt):
+        """Advance every car by one tick of dt seconds"""
+        end_time = self.tick_end = self.sim_time + dt
+        self.integrate(dt)
+
+        events = self.events
+        while events and events[0][0] <= end_time:
+            time, index, version = heapq.heappop(events)
+            if version != self.versions[index]:
+                continue  # stale, the car was pinned down after this was scheduled
+            self.events_processed += 1
+            self.arrive(self.cars[index], time)
+
+        for index in list(self.interacting):
+            if self.is_free(self.cars[index]):
+                self.classify(self.cars[index], end_time)
+
+        self.ticks += 1
+        self.sim_time = end_time
+
+    def sync_cars(self):
+        """Move free cars to where they are now, for rendering"""
+        for index in self.free:
+            car = self.cars[index]
+            car.x, car.y = self.position(car, self.sim_time)
@@ -1,52 +1,213 @@
-import functools
+import math
+import os
 
 import random
-from graphs import ShortestPaths, Edge
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from graphs import AStarPath, ShortestPaths, Edge
+from lane_geometry import LaneGeometry
+
+
+# below this many routes, starting worker processes costs more than it saves
+PARALLEL_ROUTE_THRESHOLD = 500
+
+_worker_gps = None  # GPS built once per route planning worker process
+
+
+def _init_route_worker(graph, contraction_hierarchy):
+    global _worker_gps
+    _worker_gps = GPS(graph, None, contraction_hierarchy)
+
+
+def _plan_route(pair):
+    # vertex ids are sent back rather than edges, the parent swaps in its own Edge objects
+    source_id, dest_id = pair
+    return GPS.route_vertex_ids(_worker_gps.shortest_route(source_id, dest_id), source_id)
 
 
 class GPS:
-    def __init__(self, graph, road_map):
+    def __init__(self, graph, road_map, contraction_hierarchy=None, tree_cache_size=0, lane_geometry=None):
         self.graph = graph
         self.road_map = road_map
+        if lane_geometry is not None:
+            self.lane_geometry = lane_geometry  # built by another process's GPS, see shared_sim
+        elif road_map is not None:
+            self.lane_geometry = road_map.lane_geometry
+        else:
+            self.lane_geometry = LaneGeometry(graph, center_line=True)  # no road map without graphics
+        self.contraction_hierarchy = contraction_hierarchy  # optional preprocessing for faster routes
+        self.tree_cache = ShortestPathTreeCache(tree_cache_size) if tree_cache_size > 0 else None
+        self.graph.add_observer(self.edge_changed)
 
     def get_coordinates(self, vertex_id):
         vertex = self.graph.vertices[vertex_id]
         return (vertex.x, vertex.y)
 
-    @functools.lru_cache(maxsize=256)
     def get_lane_adj_coords(self, vertex_id, edge, lane_index):
-        x, y = self.get_coordinates(vertex_id)
         if edge is None:
-            return (x, y)
-        road = self.road_map.roads[edge.id]
-        lane_adj_point = road.get_lane_adjusted_point(x, y, lane_index)
-        return (lane_adj_point.x, lane_adj_point.y)
+            return self.get_coordinates(vertex_id)
+        slot = self.lane_geometry.slot(edge, lane_index)
+        if vertex_id == edge.dest:
+            return self.lane_geometry.end(slot)
+        return self.lane_geometry.start(slot)
 
     def get_edge(self, source_vertex_id, dest_vertex_id):
-        possible_edges = self.graph.vertices[source_vertex_id].get_edges()
-        for edge in possible_edges:
-            if edge.dest == dest_vertex_id:
-                return edge
-        return None
+        return self.graph.get_edge(source_vertex_id, dest_vertex_id)
 
     def random_vertex(self):
         vertices = list(self.graph.vertices.keys())
         vertex_id = random.choice(vertices)
         return vertex_id
 
+    def random_reachable_vertex(self, source_id):
+        """Random vertex other than source_id that can be reached from it,
+        None if source_id is a dead end"""
+        reachable = self.graph.get_components().reachable_vertices(source_id)
+        if len(reachable) < 2:
+            return None
+        vertex_id = random.choice(reachable)
+        while vertex_id == source_id:
+            vertex_id = random.choice(reachable)
+        return vertex_id
+
     def shortest_route(self, source_id, dest_id):
-        route = []
+        """Shortest route between two vertices using the contraction hierarchy if one was
+        provided, then a cached shortest path tree if caching is enabled, otherwise A* search
+
+        Returns list of Edges with the last edge first (cars pop the next edge off the end),
+        or None if no route exists
+        """
+        if self.contraction_hierarchy is not None:
+            return self.edge_route(self.contraction_hierarchy.shortest_route(source_id, dest_id))
+        if self.tree_cache is not None:
+            shortest_paths = self.shortest_paths(source_id)
+            return self.get_route(shortest_paths.path_of_edges, source_id, dest_id)
+        source = self.graph.vertices[source_id]
+        dest = self.graph.vertices[dest_id]
+        a_star_path = AStarPath(self.graph, source, dest)
+        return self.get_route(a_star_path.path_of_edges, source_id, dest_id)
+
+    def plan_routes(self, pairs, max_workers=None):
+        """Shortest routes for a list of (source_id, dest_id) pairs, in the same order
+
+        Work is fanned out over a process pool. The graph is sent to each worker once
+        through the pool initializer rather than pickled with every task.
+        """
+        if max_workers == 1 or len(pairs) < PARALLEL_ROUTE_THRESHOLD:
+            return [self.shortest_route(source_id, dest_id) for source_id, dest_id in pairs]
+
+        max_workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(pairs) // (max_workers * 4))
+        initargs = (self.graph, self.contraction_hierarchy)
+        with ProcessPoolExecutor(max_workers, initializer=_init_route_worker, initargs=initargs) as executor:
+            return [self.edge_route(route) for route in executor.map(_plan_route, pairs, chunksize=chunksize)]
+
+    def shortest_paths(self, source_id):
+        """Full Dijkstra shortest path tree from a vertex to every other vertex"""
+        if self.tree_cache is not None:
+            shortest_paths = self.tree_cache.get(source_id)
+            if shortest_paths is not None:
+                return shortest_paths
+
         source = self.graph.vertices[source_id]
         shortest_paths = ShortestPaths(self.graph, source)
+        if self.tree_cache is not None:
+            self.tree_cache.put(source_id, shortest_paths)
+        return shortest_paths
+
+    def close(self):
+        """Stop observing the graph, for a GPS that is done with before its graph is"""
+        self.graph.remove_observer(self.edge_changed)
+
+    def edge_changed(self, edge, old_weight):
+        """Graph observer, drops routing data made stale by an added or reweighted edge
+
+        The cached trees are only dropped where the edge could change them, but the
+        contraction hierarchy is dropped on any edge event, a new edge included, and
+        routes use the cache or A* from then on.
+        """
+        self.contraction_hierarchy = None  # shortcuts can't be patched, fall back to A*
+        if self.tree_cache is not None:
+            self.tree_cache.invalidate(edge, old_weight)
+
+    def edge_route(self, vertex_route):
+        """Convert a list of vertex ids with dest first into a list of Edges with the last edge first"""
+        if vertex_route is None:
+            return None
+        return [self.graph.get_edge(source_id, dest_id) for dest_id, source_id in zip(vertex_route, vertex_route[1:])]
+
+    @staticmethod
+    def route_vertex_ids(route, source_id):
+        """Convert a list of Edges with the last edge first into a list of vertex ids with dest first"""
+        if route is None:
+            return None
+        return [edge.dest for edge in route] + [source_id]
+
+    @staticmethod
+    def get_route(path_of_edges, source_id, dest_id):
+        """Walk back from dest to source, returns list of Edges with the last edge first"""
+        route = []
         dest = dest_id
-        route.append(dest)
-        while (dest != source.id):
-            edge = shortest_paths.path_of_edges.get(dest)
+        while (dest != source_id):
+            edge = path_of_edges.get(dest)
             if edge is None:
                 return None  # no route exists
+            route.append(edge)
             dest = edge.source
-            route.append(dest)
         return route
 
-# TODO
-# add method to detect if route exists or ensure all vertices can be reached during creation
+
+class ShortestPathTreeCache:
+    """Least recently used cache of ShortestPaths trees keyed by source vertex id"""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.trees = OrderedDict()  # source vertex id: ShortestPaths
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.trees)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, source_id):
+        shortest_paths = self.trees.get(source_id)
+        if shortest_paths is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.trees.move_to_end(source_id)
+        return shortest_paths
+
+    def put(self, source_id, shortest_paths):
+        self.trees[source_id] = shortest_paths
+        self.trees.move_to_end(source_id)
+        while len(self.trees) > self.maxsize:
+            self.trees.popitem(last=False)
+
+    def invalidate(self, edge, old_weight):
+        """Drop every tree whose paths could change after edge went from old_weight to edge.weight
+
+        A cheaper edge only matters if it now shortens the path to its dest,
+        a more expensive edge only matters if a tree routes through it.
+        """
+        stale_sources = []
+        for source_id, shortest_paths in self.trees.items():
+            if edge.weight < old_weight:
+                source_length = shortest_paths.path_lengths.get(edge.source, math.inf)
+                dest_length = shortest_paths.path_lengths.get(edge.dest, math.inf)
+                if source_length + edge.weight < dest_length:
+                    stale_sources.append(source_id)
+            elif edge.weight > old_weight:
+                tree_edge = shortest_paths.path_of_edges.get(edge.dest)
+                if tree_edge is not None and tree_edge.id == edge.id:
+                    stale_sources.append(source_id)
+
+        for source_id in stale_sources:
+            del self.trees[source_id]
+
+    def clear(self):
+        self.trees.clear()
@@ -8,11 +8,42 @@ import file_utils
 import math_utils
 
 
-class Graph:
+class GraphBase:
+    """Edge observers, pickling and strongly connected components, shared by Graph and
+    CSRGraph so the two backends behave the same"""
     def __init__(self):
+        self.observers = []  # callbacks(edge, old_weight) run when an edge is added or reweighted
+        self.components = None  # StronglyConnectedComponents, computed on first use
+
+    def __getstate__(self):
+        # observers belong to this process (e.g. a GPS holding the road map), don't pickle them
+        state = self.__dict__.copy()
+        state["observers"] = []
+        return state
+
+    def get_components(self):
+        if self.components is None:
+            self.components = StronglyConnectedComponents(self)
+        return self.components
+
+    def add_observer(self, callback):
+        self.observers.append(callback)
+
+    def remove_observer(self, callback):
+        self.observers.remove(callback)
+
+    def notify_observers(self, edge, old_weight):
+        for callback in self.observers:
+            callback(edge, old_weight)
+
+
+class Graph(GraphBase):
+    def __init__(self):
+        super().__init__()
         self.vertices = {}  # vertex_id: Vertex
         self.vertex_cnt = 0
         self.edge_cnt = 0
+        self.edge_index = {}  # (source_id, dest_id): Edge
 
     def __repr__(self):
         ret = "Number of vertices: " + str(self.vertex_cnt) + "\n"
@@ -65,10 +96,23 @@ class Graph:
             self.add_edges(prev_node.id, mid_node.id, way.tags)
 
         self.remove_unused_vertices()
+        self.components = StronglyConnectedComponents(self)
 
     def add_edge(self, edge):
         self.vertices[edge.source].add_edge(edge)
+        self.edge_index.setdefault((edge.source, edge.dest), edge)  # first edge wins, like a scan would
         self.edge_cnt += 1
+        self.components = None
+        self.notify_observers(edge, math.inf)
+
+    def get_edge(self, source_id, dest_id):
+        """Edge from source_id to dest_id, None if there isn't one"""
+        return self.edge_index.get((source_id, dest_id))
+
+    def update_edge_weight(self, edge, weight):
+        old_weight = edge.weight
+        edge.weight = weight
+        self.notify_observers(edge, old_weight)
 
     def add_edges(self, v1, v2, tags):
         if v1 and v2 and v1 != v2:
@@ -171,8 +215,93 @@ class Vertex:
         return self.edges
 
 
+class StronglyConnectedComponents:
+    """Uses Tarjan's algorithm (iteratively, OSM ways can be long chains) to split the graph
+    into strongly connected components, then answers which vertices are reachable from a vertex
+    by walking the condensed graph of components"""
+    def __init__(self, graph):
+        self.component_of = {}  # vertex_id: component index
+        self.components = []    # component index: list of vertex ids
+        self.downstream = []    # component index: set of component indices it has edges into
+        self.reachable = {}     # component index: list of reachable vertex ids (filled on demand)
+
+        index_of = {}
+        low_link = {}
+        stack = []
+        on_stack = set()
+        for root_id in graph.vertices:
+            if root_id in index_of:
+                continue
+            work = [(root_id, iter(graph.vertices[root_id].get_edges()))]
+            index_of[root_id] = low_link[root_id] = len(index_of)
+            stack.append(root_id)
+            on_stack.add(root_id)
+            while work:
+                vertex_id, edges = work[-1]
+                for edge in edges:
+                    if edge.dest not in index_of:
+                        index_of[edge.dest] = low_link[edge.dest] = len(index_of)
+                        stack.append(edge.dest)
+                        on_stack.add(edge.dest)
+                        work.append((edge.dest, iter(graph.vertices[edge.dest].get_edges())))
+                        break
+                    elif edge.dest in on_stack:
+                        low_link[vertex_id] = min(low_link[vertex_id], index_of[edge.dest])
+                else:
+                    work.pop()
+                    if work:
+                        parent_id = work[-1][0]
+                        low_link[parent_id] = min(low_link[parent_id], low_link[vertex_id])
+                    if low_link[vertex_id] == index_of[vertex_id]:
+                        self.pop_component(vertex_id, stack, on_stack)
+
+        for component in self.components:
+            downstream = set()
+            for vertex_id in component:
+                for edge in graph.vertices[vertex_id].get_edges():
+                    downstream.add(self.component_of[edge.dest])
+            downstream.discard(self.component_of[component[0]])
+            self.downstream.append(downstream)
+
+    def pop_component(self, root_id, stack, on_stack):
+        component_index = len(self.components)
+        component = []
+        while True:
+            vertex_id = stack.pop()
+            on_stack.remove(vertex_id)
+            self.component_of[vertex_id] = component_index
+            component.append(vertex_id)
+            if vertex_id == root_id:
+                break
+        self.components.append(component)
+
+    @property
+    def largest_component(self):
+        return max(self.components, key=len)
+
+    def reachable_vertices(self, vertex_id):
+        """All vertex ids that can be reached from vertex_id (including itself)"""
+        component_index = self.component_of[vertex_id]
+        if component_index not in self.reachable:
+            visited = {component_index}
+            work = [component_index]
+            while work:
+                for downstream_index in self.downstream[work.pop()]:
+                    if downstream_index not in visited:
+                        visited.add(downstream_index)
+                        work.append(downstream_index)
+            self.reachable[component_index] = [
+                reachable_id for index in visited for reachable_id in self.components[index]
+            ]
+        return self.reachable[component_index]
+
+
 class ShortestPaths:
-    """Uses Dijkstra's algorithm to build a shortest path tree to each vertex"""
+    """Uses Dijkstra's algorithm to build a shortest path tree to each vertex
+
+    Decrease-key is done with lazy deletion: an improved distance is pushed as a new
+    heap entry and the stale entry is skipped when it is eventually popped
+    """
     def __init__(self, graph, source_vertex):
         self.path_of_edges = {}  # dest vertex id: connected edge along shortest path
         self.path_lengths = {}   # dest vertex id: sum of all edge weights along path
@@ -185,23 +314,59 @@ class ShortestPaths:
         heapq.heappush(self.pq, (0.0, source_vertex.id))
         while len(self.pq) != 0:
             distance, vertex_id = heapq.heappop(self.pq)
+            if distance > self.path_lengths[vertex_id]:
+                continue  # stale entry, vertex was already settled with a shorter distance
             vertex = graph.vertices[vertex_id]
-            self.relax_edges(graph, vertex)
+            self.relax_edges(graph, vertex, distance)
 
-    def relax_edges(self, graph, source_vertex):
+    def relax_edges(self, graph, source_vertex, source_length):
+        path_lengths = self.path_lengths
         for edge in graph.adj_edges(source_vertex):
-            dest_vertex = graph.vertices[edge.dest]
+            length = source_length + edge.weight
+            if path_lengths[edge.dest] > length:
+                path_lengths[edge.dest] = length
+                self.path_of_edges[edge.dest] = edge
+                heapq.heappush(self.pq, (length, edge.dest))
 
-            dest_length = self.path_lengths[dest_vertex.id]
-            source_length = self.path_lengths[source_vertex.id]
-            if dest_length > source_length + edge.weight:
-                self.path_lengths[dest_vertex.id] = source_length + edge.weight
-                self.path_of_edges[dest_vertex.id] = edge
 
-                if (dest_length, dest_vertex.id) in self.pq:
-                    index = self.pq.index((dest_length, dest_vertex.id))
-                    self.pq[index] = (self.path_lengths[dest_vertex.id], dest_vertex.id)
-                    heapq.heapify(self.pq)
+class AStarPath:
+    """Uses A* search to find the shortest path from a source vertex to a single target vertex
 
-                else:
-                    heapq.heappush(self.pq, (self.path_lengths[dest_vertex.id], dest_vertex.id))
+    The straight line distance to the target is used as the heuristic. It never overestimates
+    because every Edge.weight is the straight line distance between its two vertices,
+    so the search can stop as soon as the target is taken off the priority queue.
+    """
+    def __init__(self, graph, source_vertex, target_vertex):
+        self.path_of_edges = {}  # dest vertex id: connected edge along shortest path
+        self.path_lengths = {}   # dest vertex id: sum of all edge weights along path
+        self.pq = []             # list of tuples -> (estimated total distance, vertex_id)
+        self.target_vertex = target_vertex
+
+        self.path_lengths[source_vertex.id] = 0
+        heapq.heappush(self.pq, (self.heuristic(source_vertex), source_vertex.id))
+        while len(self.pq) != 0:
+            estimate, vertex_id = heapq.heappop(self.pq)
+            if vertex_id == target_vertex.id:
+                break
+            vertex = graph.vertices[vertex_id]
+            if estimate > self.path_lengths[vertex_id] + self.heuristic(vertex):
+                continue  # stale entry, vertex was already settled with a shorter distance
+            self.relax_edges(graph, vertex)
+
+    @property
+    def path_length(self):
+        return self.path_lengths.get(self.target_vertex.id, math.inf)
+
+    def heuristic(self, vertex):
+        return math_utils.pythag(self.target_vertex.x - vertex.x, self.target_vertex.y - vertex.y)
+
+    def relax_edges(self, graph, source_vertex):
+        path_lengths = self.path_lengths
+        source_length = path_lengths[source_vertex.id]
+        for edge in graph.adj_edges(source_vertex):
+            length = source_length + edge.weight
+            if path_lengths.get(edge.dest, math.inf) > length:
+                path_lengths[edge.dest] = length
+                self.path_of_edges[edge.dest] = edge
+                estimate = length + self.heuristic(graph.vertices[edge.dest])
+                heapq.heappush(self.pq, (estimate, edge.dest))
@@ -0,0 +1,178 @@
+"""Run the simulation without a display
+
+Loads a map, spawns cars and steps the simulation as fast as possible for a number
+of simulated seconds, then reports how many ticks per second were achieved.
+Nothing here (or in the modules it imports) may import tkinter or graphics.
+
+Run from the command line -> `python headless.py --cars 1000 --seconds 60`
+"""
+import argparse
+import os
+import random
+import time
+
+import file_utils
+from cars import create_cars, plan_initial_routes
+from contraction_hierarchy import ContractionHierarchy
+from csr_graph import CSRGraph
+from event_driven import EventDrivenSimulation
+from gps import GPS
+from graphs import Graph
+from hybrid import HybridSimulation
+from latlon import LatLonConverter
+from mesoscopic import LinkQueueModel
+from simulation import Simulation
+
+
+class HeadlessWindow:
+    """Stand-in for GraphWin that only supplies the dimensions and view the simulation reads"""
+    def __init__(self, width=1280, height=800):
+        self.width = width
+        self.height = height
+        self.scrollregion_x = self.width * 20
+        self.scrollregion_y = self.height * 20
+        self.screen_points = (0, 0, width, height)  # the whole map, like GraphWin before any zooming
+
+    def getScreenPoints(self):
+        return self.screen_points
+
+
+def map_coords(filename):
+    """Return (S, W, N, E) for a map file
+
+    Downloaded maps are named N_W_S_E.txt by the main menu, anything else
+    falls back to the coordinates in config_default.yml
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    parts = name.split("_")
+    if len(parts) == 4:
+        try:
+            N, W, S, E = [float(part) for part in parts]
+            return S, W, N, E
+        except ValueError:
+            pass
+
+    map_data = file_utils.load_yaml("config_default.yml")["map_data"]
+    return (
+        map_data["coords_south"], map_data["coords_west"],
+        map_data["coords_north"], map_data["coords_east"],
+    )
+
+
+def load_graph(filename, window=None):
+    window = window or HeadlessWindow()
+    S, W, N, E = map_coords(filename)
+    graph = Graph()
+    graph.load_open_street_map_data(filename, LatLonConverter(window, S, W, N, E))
+    return graph
+
+
+def run(simulation, seconds, ticks_per_second=30):
+    """Step simulation for seconds of simulated time, returns (ticks, wall time)"""
+    dt = 1.0 / ticks_per_second
+    num_ticks = int(round(seconds * ticks_per_second))
+    start = time.perf_counter()
+    for _ in range(num_ticks):
+        simulation.step(dt)
+    return num_ticks, time.perf_counter() - start
+
+
+def main():
+    config_data = file_utils.load_yaml("config_default.yml")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--map", default=config_data["map_data"]["filename"])
+    parser.add_argument("--cars", type=int, default=config_data["num_cars"])
+    parser.add_argument("--seconds", type=float, default=60.0, help="simulated seconds to run for")
+    parser.add_argument("--ticks-per-second", type=int, default=config_data.get("ticks_per_second", 30))
+    parser.add_argument("--collision-system", choices=["quadtree", "grid", "spatial_hash", "edge", "lane", "vectorized"],
+                        default=config_data.get("collision_system"),
+                        help="defaults to quadtree, or lane with --driver-model idm")
+    parser.add_argument("--driver-model", choices=["throttle", "idm"],
+                        default=config_data.get("driver_model", "throttle"),
+                        help="idm needs the lane collision system")
+    parser.add_argument("--lane-changes", action=argparse.BooleanOptionalAction,
+                        default=config_data.get("lane_changes", False),
+                        help="MOBIL lane changes, needs --driver-model idm")
+    parser.add_argument("--event-driven", action=argparse.BooleanOptionalAction,
+                        default=config_data.get("event_driven", False),
+                        help="discrete event engine with IDM car following, ignores the collision and driver options")
+    parser.add_argument("--mesoscopic", action="store_true",
+                        help="link queue model, every edge is a queue of vehicles with no geometry")
+    parser.add_argument("--hybrid", action=argparse.BooleanOptionalAction,
+                        default=config_data.get("hybrid", False),
+                        help="IDM cars inside --view, link queues everywhere else")
+    parser.add_argument("--view", type=float, nargs=4, metavar=("X0", "Y0", "X1", "Y1"),
+                        help="world coordinates on screen for --hybrid, defaults to the whole window")
+    parser.add_argument("--vehicle-arrays", action=argparse.BooleanOptionalAction,
+                        default=config_data.get("vehicle_arrays", False))
+    parser.add_argument("--contraction-hierarchy", action=argparse.BooleanOptionalAction,
+                        default=config_data.get("contraction_hierarchy", False))
+    parser.add_argument("--compact-graph", action=argparse.BooleanOptionalAction,
+                        default=config_data.get("compact_graph", False))
+    parser.add_argument("--route-cache-size", type=int, default=config_data.get("route_cache_size", 0))
+    parser.add_argument("--route-workers", type=int, default=config_data.get("route_workers"))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    window = HeadlessWindow()
+    start = time.perf_counter()
+    graph = load_graph(args.map, window)
+    if args.compact_graph:
+        graph = CSRGraph.from_graph(graph)
+
+    contraction_hierarchy = None
+    if args.contraction_hierarchy:
+        contraction_hierarchy = ContractionHierarchy.load_or_build(graph, args.map)
+
+    gps = GPS(graph, None, contraction_hierarchy, args.route_cache_size)
+    if args.mesoscopic:
+        simulation = LinkQueueModel(gps)
+        simulation.add_vehicles(plan_initial_routes(gps, args.cars, args.route_workers))
+    elif args.event_driven:
+        simulation = EventDrivenSimulation(create_cars(gps, args.cars, args.route_workers))
+    elif args.hybrid:
+        if args.view:
+            window.screen_points = tuple(args.view)
+        simulation = HybridSimulation(window, create_cars(gps, args.cars, args.route_workers),
+                                      config_data.get("hybrid_margin", 200.0))
+    else:
+        cars = create_cars(gps, args.cars, args.route_workers)
+        simulation = Simulation(window, cars, args.collision_system, args.vehicle_arrays, args.driver_model,
+                                args.lane_changes)
+    setup_time = time.perf_counter() - start
+
+    ticks, wall_time = run(simulation, args.seconds, args.ticks_per_second)
+    print("map: {0} ({1} vertices, {2} edges)".format(args.map, len(graph.vertices), graph.edge_cnt))
+    if args.mesoscopic:
+        print("vehicles: {0}, mesoscopic".format(len(simulation.vehicles)))
+    elif args.event_driven:
+        print("cars: {0}, event driven".format(len(simulation.cars)))
+    elif args.hybrid:
+        print("cars: {0}, hybrid, {1} microscopic at the end".format(len(simulation.cars), len(simulation.micro)))
+    else:
+        print("cars: {0}, collision system: {1}, vehicle arrays: {2}, driver model: {3}, lane changes: {4}".format(
+            len(simulation.cars), type(simulation.collision_system).__name__, args.vehicle_arrays, args.driver_model,
+            args.lane_changes))
+    print("setup: {0:.2f}s".format(setup_time))
+    print("ticks: {0} ({1:.1f} simulated seconds) in {2:.2f}s".format(ticks, simulation.sim_time, wall_time))
+    print("ticks/sec: {0:.1f}, {1:.1f}x real time".format(ticks / wall_time, simulation.sim_time / wall_time))
+    if args.event_driven:
+        print("events: {0} ({1:.1f}/sec), cars integrated per tick: {2:.1f}".format(
+            simulation.events_processed, simulation.events_processed / wall_time,
+            simulation.integrations / max(ticks, 1)))
+    if args.hybrid:
+        print("conversions: {0} to mesoscopic, {1} to microscopic".format(
+            simulation.to_meso_count, simulation.to_micro_count))
+    if args.mesoscopic:
+        edge_stats = simulation.edge_stats()
+        occupied = [density for _, density in edge_stats.values() if density > 0]
+        print("edges with traffic: {0}, flow: {1:.1f} vehicles/sec leaving edges".format(
+            len(edge_stats), sum(flow for flow, _ in edge_stats.values())))
+        if occupied:
+            print("density on occupied edges: mean {0:.4f}, max {1:.4f} vehicles per px of lane".format(
+                sum(occupied) / len(occupied), max(occupied)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import math_utils
+from collision import LaneCollisionSystem
+from driver_models import IntelligentDriverModel
+from mesoscopic import LinkQueueModel, QueuedVehicle
+
+
+class HybridSimulation:
+    """Microscopic simulation where the user is looking, mesoscopic everywhere else
+
+    Cars inside the window's view (getScreenPoints) plus a margin are moved every tick
+    by the Intelligent Driver Model with a LaneCollisionSystem, like Simulation with
+    driver_model="idm". Every other car is a QueuedVehicle in a LinkQueueModel that only
+    does work when a vehicle is due to leave an edge, and is stepped every meso_interval
+    seconds instead of every tick.
+
+    A car that drives out of the region joins its edge's queue with the exit time free
+    flow would give it from where it is. A queued vehicle on an edge that touches the
+    region is placed where LinkQueueModel.progress says it is, and becomes a car again
+    when that point is inside the region. Both directions keep the car on its edge, lane
+    and route, so converting never moves a car, and because the margin keeps conversions
+    off screen panning the view only ever reveals cars that are already microscopic.
+    Cars leave the region at the margin but only join it again half a margin in, so a
+    car near the edge of the region doesn't flip back and forth.
+    """
+    def __init__(self, window, cars, margin=200.0, meso_interval=0.5):
+        self.window = window
+        self.cars = cars
+        self.margin = margin
+        self.meso_interval = meso_interval
+        self.collision_system = LaneCollisionSystem(window, cars)
+        self.driver_model = IntelligentDriverModel(self.collision_system)
+        self.link_queues = LinkQueueModel(cars[0].gps if cars else None)
+        self.vehicles = [QueuedVehicle(car.index, car.route) for car in cars]
+        self.link_queues.vehicles = self.vehicles
+        self.micro = set(range(len(cars)))
+        self.meso = set()
+        self.view = None
+        self.region_edges = []    # edges whose bounding box touches the region
+        self.to_meso_count = 0
+        self.to_micro_count = 0
+        self.ticks = 0
+        self.sim_time = 0.0
+        self.update_region()
+        self.convert_to_meso()
+
+    def region(self, margin):
+        wx0, wy0, wx1, wy1 = self.view
+        return min(wx0, wx1) - margin, min(wy0, wy1) - margin, max(wx0, wx1) + margin, max(wy0, wy1) + margin
+
+    @staticmethod
+    def inside(region, x, y):
+        x0, y0, x1, y1 = region
+        return x0 <= x <= x1 and y0 <= y <= y1
+
+    def update_region(self):
+        """Find the edges near the view again if it has been panned or zoomed"""
+        view = tuple(self.window.getScreenPoints())
+        if view == self.view:
+            return
+        self.view = view
+        if not self.cars:
+            return
+        x0, y0, x1, y1 = self.region(self.margin)
+        graph = self.cars[0].gps.graph
+        self.region_edges = []
+        for vertex in graph.vertices.values():
+            for edge in vertex.get_edges():
+                dest = graph.vertices[edge.dest]
+                if (min(vertex.x, dest.x) <= x1 and max(vertex.x, dest.x) >= x0
+                        and min(vertex.y, dest.y) <= y1 and max(vertex.y, dest.y) >= y0):
+                    self.region_edges.append(edge)
+
+        # queued cars are left where they were converted, move the ones the new view
+        # would show there to where their vehicle is now
+        for index in self.meso:
+            car = self.cars[index]
+            vehicle = self.vehicles[index]
+            if vehicle.edge is not None and self.inside((x0, y0, x1, y1), car.x, car.y):
+                queue_position = self.link_queues.queues[vehicle.edge.id].index(vehicle)
+                car.x, car.y, _ = self.place(vehicle, queue_position)
+
+    def to_meso(self, car):
+        """Swap car for a queued vehicle on the same edge that is due to leave it when car would"""
+        self.collision_system.remove(car)
+        vehicle = self.vehicles[car.index]
+        vehicle.route = car.route
+        edge = car.current_edge
+        geometry = car.gps.lane_geometry
+        start_x, start_y = geometry.start(car.lane_slot)
+        end_x, end_y = car.target()
+        length = math_utils.pythag(end_x - start_x, end_y - start_y) or 1.0
+        remaining = min(math_utils.pythag(end_x - car.x, end_y - car.y) / length, 1.0)
+        link_queues = self.link_queues
+        link_queues.insert(vehicle, edge, self.sim_time + remaining * link_queues.travel_time(edge))
+        self.micro.discard(car.index)
+        self.meso.add(car.index)
+        self.to_meso_count += 1
+
+    def to_micro(self, vehicle, x, y, queued):
+        """Swap a queued vehicle for its car at (x, y) on the vehicle's edge"""
+        edge = vehicle.edge
+        self.link_queues.remove(vehicle)
+        car = self.cars[vehicle.index]
+        car.route = vehicle.route
+        car.current_edge = edge
+        car.next_dest_id = edge.dest
+        car.dest_id = car.route[0].dest if car.route else edge.dest
+        car.lane_slot = car.gps.lane_geometry.slot(edge, car.lane_index)
+        car.speed_limit = car.get_speed_limit()
+        car.speed = 0.0 if queued else car.speed_limit
+        car.x, car.y = x, y
+        car.cell = None
+        self.meso.discard(car.index)
+        self.micro.add(car.index)
+        self.to_micro_count += 1
+
+    def convert_to_meso(self):
+        region = self.region(self.margin)
+        for index in sorted(self.micro):
+            car = self.cars[index]
+            if car.current_edge is not None and not self.inside(region, car.x, car.y):
+                self.to_meso(car)
+
+    def place(self, vehicle, queue_position):
+        """(x, y, whether it is held up) of a queued vehicle in its car's lane"""
+        edge = vehicle.edge
+        distance, queued = self.link_queues.progress(vehicle, queue_position, self.sim_time)
+        geometry = self.cars[vehicle.index].gps.lane_geometry
+        slot = geometry.slot(edge, self.cars[vehicle.index].lane_index)
+        start_x, start_y = geometry.start(slot)
+        end_x, end_y = geometry.end(slot)
+        fraction = distance / edge.weight if edge.weight else 1.0
+        return start_x + (end_x - start_x) * fraction, start_y + (end_y - start_y) * fraction, queued
+
+    def convert_to_micro(self):
+        region = self.region(self.margin / 2)
+        queues = self.link_queues.queues
+        for edge in self.region_edges:
+            queue = queues.get(edge.id)
+            if not queue:
+                continue
+            converting = []
+            for queue_position, vehicle in enumerate(queue):
+                x, y, queued = self.place(vehicle, queue_position)
+                if self.inside(region, x, y):
+                    converting.append((vehicle, x, y, queued))
+            for vehicle, x, y, queued in converting:
+                self.to_micro(vehicle, x, y, queued)
+
+    def step(self, dt):
+        """Advance every car by one tick of dt seconds"""
+        self.update_region()
+        micro_cars = [self.cars[index] for index in sorted(self.micro)]
+        self.driver_model.update(micro_cars, dt)
+        for car in micro_cars:
+            car.move_towards_dest(dt)
+        self.ticks += 1
+        self.sim_time += dt
+        self.convert_to_meso()
+
+        # the link queues catch up with sim_time every meso_interval, exit times and
+        # positions are in sim_time so they don't depend on when that happened
+        if self.sim_time - self.link_queues.sim_time >= self.meso_interval:
+            self.link_queues.step(self.sim_time - self.link_queues.sim_time)
+        self.convert_to_micro()
+
+        self.collision_system.update_objects([self.cars[index] for index in sorted(self.micro)])
+
+    def sync_cars(self):
+        """Microscopic cars are always current after step, queued vehicles are off screen"""
@@ -5,10 +5,15 @@ from graphics import GraphApp, GraphWin, Text, Point, _root
 from menu import MainMenu
 from graphs import Graph, ShortestPaths
 from maps import RoadMap
-from cars import Car, CarShape, CarFactory
+from car_shapes import CarShape, CarFactory, render_in_view
+from contraction_hierarchy import ContractionHierarchy
+from csr_graph import CSRGraph
 from gps import GPS
 from info_window import InfoWindow, RoadInfoWindow
-from collision import GridCollisionSystem, QuadTreeCollisionSystem
+from simulation import Simulation
+from event_driven import EventDrivenSimulation
+from hybrid import HybridSimulation
+from shared_sim import SimulationProcess
 from latlon import LatLonConverter
 from openstreetmap import query_roads_by_lat_lon, save_raw_json_map_data
 
@@ -35,23 +40,46 @@ def main():
 
     graph = Graph()
     graph.load_open_street_map_data(map_data["filename"], llc)
+    if config_data.get("compact_graph", False):
+        graph = CSRGraph.from_graph(graph)
 
     road_map = RoadMap(graph, window)
     road_map.draw()
     road_map.draw_road_names()
 
-    gps = GPS(graph, road_map)
+    contraction_hierarchy = None
+    if config_data.get("contraction_hierarchy", False):
+        contraction_hierarchy = ContractionHierarchy.load_or_build(graph, map_data["filename"])
+
+    tree_cache_size = config_data.get("route_cache_size", 0)
+    gps = GPS(graph, road_map, contraction_hierarchy, tree_cache_size)
 
     cars = []
     car_shapes = []
     car_factory = CarFactory(window, gps, cars, car_shapes)
 
     num_cars = config_data["num_cars"]
-    for _ in range(num_cars):
-        car_factory.create()
-
-    # collision_system = GridCollisionSystem(window, cars)
-    collision_system = QuadTreeCollisionSystem(window, cars)
+    car_factory.create_many(num_cars, config_data.get("route_workers"))
+
+    TICKS_PER_SECOND = config_data.get("ticks_per_second", 30)
+    simulation_process = None
+    if config_data.get("simulation_process", False):
+        # the child process steps the cars, this one only renders what it publishes
+        simulation_process = SimulationProcess(
+            gps, cars, config_data, (window.width, window.height), TICKS_PER_SECOND)
+        simulation_process.start()
+    elif config_data.get("event_driven", False):
+        simulation = EventDrivenSimulation(cars)
+    elif config_data.get("hybrid", False):
+        simulation = HybridSimulation(window, cars, config_data.get("hybrid_margin", 200.0))
+    else:
+        simulation = Simulation(
+            window, cars,
+            collision_system=config_data.get("collision_system"),
+            vehicle_arrays=config_data.get("vehicle_arrays", False),
+            driver_model=config_data.get("driver_model", "throttle"),
+            lane_changes=config_data.get("lane_changes", False),
+        )
 
     info = InfoWindow(secondary_window)
     info.set_selected_car(cars[0])
@@ -66,11 +94,17 @@ def main():
     # initialize simulation variables
     simTime = 0.0
     limit = 10000
-    TICKS_PER_SECOND = 30
     TIME_PER_TICK = 1.0/TICKS_PER_SECOND
     nextLogicTick = TIME_PER_TICK
     lastFrameTime = time.time()
     lag = 0.0
+    frames = 0
+
+    def render_frame(car_frame):
+        # straight from the child's shared frame, only the selected car is kept up to date
+        # in this process, for the info window and the route drawing
+        render_in_view(car_shapes, window, frame=car_frame)
+        simulation_process.update_car(info.selected_car, car_frame)
 
     # Main Simulation Loop
     while simTime < limit:
@@ -137,21 +171,21 @@ def main():
                 continue
 
         # update simulation logic
+        if simulation_process is not None:
+            lag = 0.0
         while lag > TIME_PER_TICK:
-            collision_system.process_collisions(cars)
-            for car in cars:
-                car.move_towards_dest(TIME_PER_TICK)
-                car_shape = car_shapes[car.index]
-                car_shape.x = cars[car.index].x
-                car_shape.y = cars[car.index].y
-            collision_system.update_objects(cars)
+            simulation.step(TIME_PER_TICK)
 
             nextLogicTick += TIME_PER_TICK
             lag -= TIME_PER_TICK
 
         # render updates to window
-        for car_shape in car_shapes:
-            car_shape.render()
+        if simulation_process is not None:
+            simulation_process.render_latest(render_frame)
+        else:
+            simulation.sync_cars()  # once per frame, not per tick
+            render_in_view(car_shapes, window, cars)
+        frames += 1
 
         info.update_table()
         if info.follow_car:
@@ -162,6 +196,13 @@ def main():
 
         _root.update_idletasks()
 
+    print("car shapes: {0:.1f} Tk calls per frame".format(CarShape.tk_calls / max(frames, 1)))
+    if simulation_process is not None:
+        ticks, tick_rate = simulation_process.tick_rate()
+        print("simulation process: {0} ticks, {1:.1f} ticks/sec achievable".format(ticks, tick_rate))
+        print("render process: {0} frames, {1:.1f} frames/sec, {2} rendered again".format(
+            simulation_process.frames, simulation_process.frames / simTime, simulation_process.rerenders))
+        simulation_process.stop()
     cleanup()
 
 
@@ -215,8 +256,7 @@ if __name__ == '__main__':
     main()
 
 # TODO
-# AI so cars can change lanes without crashing and adjust route based on existing traffic conditions
-    # add ability for cars to change lanes
+# AI so cars adjust route based on existing traffic conditions
 # create gui menu so that settings can be changed in the simulation (# of cars, lane closures, etc)
 # increase # of cars that can be drawn on the screen at once to: 500 | 1000
 # dynamically load additional map data when zooming out or moving camera
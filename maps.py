@@ -1,5 +1,6 @@
 from collision import Grid
 import graphs
+from lane_geometry import LaneGeometry
 from graphics import Circle, Line, Point, color_rgb, Text
 import math_utils
 
@@ -11,6 +12,7 @@ class RoadMap:
         self.intersections = {}  # vertex_id: Intersection
         self.roads = {}  # edge_id: Road
         self.route = {}  # vertex_id: Line (used for drawing route)
+        self.lane_geometry = LaneGeometry(graph)  # lane adjusted coordinates cars drive along
 
         # store map objects in a container for quick lookups by location
         num_rows = 128
@@ -90,7 +92,7 @@ class RoadMap:
         line_width = 3
         line_color = color_rgb(20, 200, 20)
         p0 = Point(car.x, car.y)
-        route = car.route[:]
+        route = [edge.dest for edge in car.route]
         route.append(car.next_dest_id)
         for vertex_id in route[::-1]:
             intersection = self.intersections[vertex_id]
@@ -131,8 +133,8 @@ class Road:
 
         self.lines = []
         self.width = 2
-        self.way_gap = 0  # size of gap between each road direction
-        self.lane_gap = 4  # size of gap between lines
+        self.way_gap = LaneGeometry.ONE_WAY_GAP  # size of gap between each road direction
+        self.lane_gap = LaneGeometry.ONE_WAY_LANE_GAP  # size of gap between lines
         self.click_threshold = self.width * self.lanes
 
         for i in range(lanes):
@@ -216,8 +218,8 @@ class Road2W(Road):
         super().__init__(edge_id, p0, p1, name, lanes)
         self.lanes = lanes
         self.lines = []
-        self.way_gap = 5
-        self.lane_gap /= 2
+        self.way_gap = LaneGeometry.TWO_WAY_GAP
+        self.lane_gap = LaneGeometry.TWO_WAY_LANE_GAP
 
         for i in range(0, self.lanes, 2):
             u0 = self.get_lane_adjusted_point(p0.x, p0.y, i)
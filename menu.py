@@ -178,7 +178,7 @@ class MainMenu:
 
     def set_config_data(self):
         filename = "config.yml"
-        self.config_data = {
+        self.config_data.update({
             "num_cars": int(self.input_num_cars.input_text),
             "map_data": {
                 "filename": self.map_filename,
@@ -187,7 +187,7 @@ class MainMenu:
                 "coords_north": self.input_n.input_text,
                 "coords_east": self.input_e.input_text,
             }
-        }
+        })  # update rather than replace so settings without a menu input are kept
         save_yaml(filename, self.config_data)
 
     def valid_inputs(self):
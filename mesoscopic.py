@@ -0,0 +1,223 @@
+import heapq
+import math
+from collections import deque
+
+from lane_geometry import LaneGeometry
+
+
+class QueuedVehicle:
+    """A vehicle in the link queue model, only knows its route and when it may leave its edge"""
+    __slots__ = ("index", "route", "edge", "exit_time")
+
+    def __init__(self, index, route):
+        self.index = index
+        self.route = route  # list of Edges with the last edge first, like Car.route
+        self.edge = None
+        self.exit_time = 0.0
+
+
+class LinkQueueModel:
+    """Mesoscopic traffic model where every edge is a first in first out queue of vehicles
+
+    A vehicle that enters an edge can't leave it before the free flow travel time
+    (weight / speed limit) has passed. The front vehicle of a queue moves onto the next
+    edge of its route when that edge has room, and vehicles leave an edge no closer
+    together than a headway set by how many vehicles per second its lanes can discharge.
+    An edge holds weight * lanes / jam_spacing vehicles, so a full edge holds back the
+    edges feeding it and queues spill back through the network.
+
+    There is no geometry and no collision system, a step only does work for the edges
+    whose front vehicle is ready to leave. Those edges come off a heap of (time, edge
+    id). Whenever an edge's front vehicle or headway changes it gets a new entry, and
+    the old one is skipped when it comes off the heap, like the stale arrivals in
+    EventDrivenSimulation. An edge whose front vehicle is held up by a full next edge
+    has no entry until a vehicle leaves that next edge. Vehicles pick new random
+    destinations when they finish their route, using the same GPS routes as Car.
+    """
+    jam_spacing = 20.0          # px of lane taken by a stopped vehicle (car length plus gap)
+    lane_flow = 0.5             # vehicles per second a lane can discharge
+    default_speed_limit = 25.0  # for edges without a usable maxspeed tag
+
+    def __init__(self, gps):
+        self.gps = gps
+        self.ticks = 0
+        self.sim_time = 0.0
+        self.vehicles = []
+        self.queues = {}       # edge id: deque of vehicles in the order they entered
+        self.edges = {}        # edge id: edge, for every edge that has had a vehicle
+        self.capacities = {}   # edge id: capacity(edge)
+        self.next_departures = {}  # edge id: earliest time the next vehicle may leave the edge
+        self.exits = {}        # edge id: vehicles that have left the edge
+        self.departures = []   # heap of (time the front vehicle may leave, edge id)
+        self.scheduled = {}    # edge id: time of its live entry in departures
+        self.blocked = {}      # edge id: ids of the edges whose front vehicle waits for room on it
+        self.entering = deque()  # vehicles waiting to join the first edge of their route
+
+    def capacity(self, edge):
+        """Number of vehicles that fit on edge"""
+        return max(1, int(edge.weight * LaneGeometry.lanes_in_direction(edge) / self.jam_spacing))
+
+    def headway(self, edge):
+        """Seconds between vehicles leaving edge"""
+        return 1.0 / (self.lane_flow * LaneGeometry.lanes_in_direction(edge))
+
+    def travel_time(self, edge):
+        """Free flow travel time along edge in seconds"""
+        try:
+            speed_limit = float(edge.speed_limit)
+        except (TypeError, ValueError):
+            speed_limit = self.default_speed_limit
+        return edge.weight / (speed_limit or self.default_speed_limit)
+
+    def has_room(self, edge):
+        queue = self.queues.get(edge.id)
+        return queue is None or len(queue) < self.capacities[edge.id]
+
+    def add_vehicles(self, initial_routes):
+        """Add a vehicle for each (source_id, route) from cars.plan_initial_routes"""
+        for source_id, route in initial_routes:
+            vehicle = QueuedVehicle(len(self.vehicles), route or self.new_route(source_id))
+            self.vehicles.append(vehicle)
+            self.entering.append(vehicle)
+        self.admit_entering()
+
+    def new_route(self, source_id):
+        """Route from source_id to a random destination, from a random vertex if source_id is a dead end"""
+        dest_id = self.gps.random_reachable_vertex(source_id)
+        while dest_id is None:
+            source_id = self.gps.random_vertex()
+            dest_id = self.gps.random_reachable_vertex(source_id)
+        return self.gps.shortest_route(source_id, dest_id)
+
+    def enter(self, vehicle, edge, entry_time=None):
+        """Put vehicle at the back of edge's queue, having joined it at entry_time (default now)"""
+        if edge.id not in self.queues:
+            self.queues[edge.id] = deque()
+            self.edges[edge.id] = edge
+            self.capacities[edge.id] = self.capacity(edge)
+            self.next_departures[edge.id] = 0.0
+            self.exits[edge.id] = 0
+        self.queues[edge.id].append(vehicle)
+        vehicle.edge = edge
+        vehicle.exit_time = (self.sim_time if entry_time is None else entry_time) + self.travel_time(edge)
+        self.schedule(edge.id)
+
+    def leave(self, vehicle):
+        """Take the front vehicle off its edge"""
+        edge_id = vehicle.edge.id
+        self.queues[edge_id].popleft()
+        self.exits[edge_id] += 1
+        vehicle.edge = None
+        self.unblock(edge_id)
+
+    def insert(self, vehicle, edge, exit_time):
+        """Put a vehicle that is already part way along edge into its queue, ahead of the
+        vehicles due to leave after it. Capacity isn't checked, the vehicle is already there."""
+        if edge.id not in self.queues:
+            self.enter(vehicle, edge)
+        else:
+            queue = self.queues[edge.id]
+            position = len(queue)
+            while position > 0 and queue[position - 1].exit_time > exit_time:
+                position -= 1
+            queue.insert(position, vehicle)
+            vehicle.edge = edge
+        vehicle.exit_time = exit_time
+        self.schedule(edge.id)
+
+    def remove(self, vehicle):
+        """Take vehicle out of its queue wherever it is"""
+        edge_id = vehicle.edge.id
+        self.queues[edge_id].remove(vehicle)
+        vehicle.edge = None
+        self.schedule(edge_id)
+        self.unblock(edge_id)
+
+    def schedule(self, edge_id):
+        """Push the time edge_id's front vehicle may leave onto departures, unless that
+        is already the time of its live entry"""
+        queue = self.queues[edge_id]
+        if not queue:
+            self.scheduled.pop(edge_id, None)
+            return
+        time = max(queue[0].exit_time, self.next_departures[edge_id])
+        if self.scheduled.get(edge_id) != time:
+            self.scheduled[edge_id] = time
+            heapq.heappush(self.departures, (time, edge_id))
+
+    def unblock(self, edge_id):
+        """edge_id has room again, schedule the edges held up by it"""
+        for waiting_id in self.blocked.pop(edge_id, ()):
+            self.schedule(waiting_id)
+
+    def progress(self, vehicle, queue_position, time=None):
+        """(distance along its edge, whether it is held up) at time (default now) for the
+        vehicle queue_position places from the front of its queue. A vehicle is as far
+        along as free flow would have taken it, but no further than the back of the
+        vehicles in front of it."""
+        edge = vehicle.edge
+        time = self.sim_time if time is None else time
+        free_flow = edge.weight * (1.0 - (vehicle.exit_time - time) / (self.travel_time(edge) or 1.0))
+        queued = edge.weight - queue_position * self.jam_spacing / LaneGeometry.lanes_in_direction(edge)
+        return max(0.0, min(free_flow, queued, edge.weight)), queued < free_flow
+
+    def admit_entering(self):
+        for _ in range(len(self.entering)):
+            vehicle = self.entering.popleft()
+            edge = vehicle.route[-1]
+            if self.has_room(edge):
+                vehicle.route.pop()
+                self.enter(vehicle, edge)
+            else:
+                self.entering.append(vehicle)
+
+    def next_edge(self, vehicle):
+        """Next edge of vehicle's route, planning a new route at the end of this one"""
+        if not vehicle.route:
+            vehicle.route = self.new_route(vehicle.edge.dest)
+        return vehicle.route[-1]
+
+    def step(self, dt):
+        """Advance every vehicle by one tick of dt seconds"""
+        tick_start = self.sim_time
+        self.sim_time += dt
+        departures = self.departures
+        while departures and departures[0][0] <= self.sim_time:
+            time, edge_id = heapq.heappop(departures)
+            if self.scheduled.get(edge_id) != time:
+                continue  # stale, the edge was scheduled again since
+            del self.scheduled[edge_id]
+            queue = self.queues[edge_id]
+            edge = self.edges[edge_id]
+            while queue and queue[0].exit_time <= self.sim_time and self.next_departures[edge_id] <= self.sim_time:
+                vehicle = queue[0]
+                departure = max(self.next_departures[edge_id], vehicle.exit_time, tick_start)
+                next_edge = self.next_edge(vehicle)
+                if next_edge.source != edge.dest:
+                    # new route starts somewhere else (dead end), the vehicle rejoins from there
+                    self.leave(vehicle)
+                    self.entering.append(vehicle)
+                elif self.has_room(next_edge):
+                    self.leave(vehicle)
+                    vehicle.route.pop()
+                    self.enter(vehicle, next_edge, departure)
+                else:
+                    # spill back, the next edge is full, wait until a vehicle leaves it
+                    self.blocked.setdefault(next_edge.id, set()).add(edge_id)
+                    break
+                self.next_departures[edge_id] = departure + self.headway(edge)
+            else:
+                self.schedule(edge_id)
+        self.admit_entering()
+        self.ticks += 1
+
+    def edge_stats(self):
+        """{edge id: (flow in vehicles/sec, density in vehicles per px of lane)} for every
+        edge that has had traffic, flow is averaged since the start of the run"""
+        stats = {}
+        for edge_id, edge in self.edges.items():
+            lane_length = edge.weight * LaneGeometry.lanes_in_direction(edge)
+            flow = self.exits[edge_id] / self.sim_time if self.sim_time > 0 else 0.0
+            density = len(self.queues[edge_id]) / lane_length if lane_length > 0 else math.inf
+            stats[edge_id] = (flow, density)
+        return stats
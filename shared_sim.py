@@ -0,0 +1,221 @@
+"""Run the simulation in a child process and share car positions through shared memory
+
+The child steps the simulation and publishes a row per car (see FIELDS) into one of
+two buffers in a multiprocessing.shared_memory block each tick. The Tk process renders
+straight from the most recently completed buffer, so a slow frame never holds up the
+simulation and the simulation never waits for a frame.
+Nothing here (or in the modules it imports) may import tkinter or graphics.
+"""
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cars import Car
+from event_driven import EventDrivenSimulation
+from gps import GPS
+from headless import HeadlessWindow
+from simulation import Simulation
+
+# per car: x, y, lane heading, speed, then the vertex ids its edge goes from and to and
+# the vertex id its route ends at, what the info window and the route drawing need
+FIELDS = 7
+X, Y, HEADING, SPEED, EDGE_SOURCE, EDGE_DEST, DEST = range(FIELDS)
+
+
+class SharedCarBuffer:
+    """Double buffered car positions in a shared memory block, guarded by a seqlock
+
+    The header holds a sequence number, which of the two buffers is the front one, the
+    tick count, the simulated time and the seconds the writer has spent working. The
+    writer only ever fills the back buffer: it makes the sequence number odd, fills the
+    back buffer, makes it the front one and makes the sequence number even again.
+
+    A reader takes the front buffer without copying it. The writer can't touch that
+    buffer until it starts its second publish after the read began, which is exactly
+    when the sequence number moves past read_seq + 1 (if the read began during a
+    publish) or read_seq + 2, so still_valid tells the reader if what it read is whole.
+    """
+    header_ints = 3    # sequence, front buffer, ticks
+    header_floats = 2  # sim_time, busy seconds
+    header_size = 64   # bytes, keeps the buffers aligned
+
+    def __init__(self, num_cars, name=None):
+        size = self.header_size + 2 * num_cars * FIELDS * 8
+        self.num_cars = num_cars
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        buf = self.memory.buf
+        self.ints = np.ndarray((self.header_ints,), np.int64, buf, 0)
+        self.floats = np.ndarray((self.header_floats,), np.float64, buf, self.header_ints * 8)
+        self.buffers = np.ndarray((2, num_cars, FIELDS), np.float64, buf, self.header_size)
+        if self.owner:
+            self.ints[:] = 0
+            self.floats[:] = 0.0
+            self.buffers[:] = 0.0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def publish(self, columns, ticks, sim_time, busy):
+        """Write a complete frame to the back buffer and flip it to the front, columns has
+        num_cars values for each of FIELDS in order"""
+        ints = self.ints
+        back = 1 - int(ints[1])
+        ints[0] += 1  # odd, publishing
+        frame = self.buffers[back]
+        for field, column in enumerate(columns):
+            frame[:, field] = column
+        ints[1] = back
+        ints[2] = ticks
+        self.floats[0] = sim_time
+        self.floats[1] = busy
+        ints[0] += 1  # even, done
+
+    def acquire(self):
+        """(front buffer as a num_cars x FIELDS view, ticks, sim_time, busy seconds, sequence number)"""
+        ints = self.ints
+        while True:
+            seq = int(ints[0])
+            front, ticks = int(ints[1]), int(ints[2])
+            sim_time, busy = float(self.floats[0]), float(self.floats[1])
+            if int(ints[0]) == seq:
+                return self.buffers[front], ticks, sim_time, busy, seq
+
+    def still_valid(self, seq):
+        """Whether the buffer acquired at seq hasn't started being overwritten"""
+        return int(self.ints[0]) <= seq + (1 if seq % 2 else 2)
+
+    def close(self):
+        # the numpy views must go before the block can be closed
+        del self.ints, self.floats, self.buffers
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def car_columns(cars):
+    """The FIELDS of every car, one array per field"""
+    num_cars = len(cars)
+    return [
+        np.fromiter((car.x for car in cars), float, num_cars),
+        np.fromiter((car.y for car in cars), float, num_cars),
+        np.fromiter((car.heading() for car in cars), float, num_cars),
+        np.fromiter((car.speed for car in cars), float, num_cars),
+        np.fromiter((car.current_edge.source for car in cars), float, num_cars),
+        np.fromiter((car.next_dest_id for car in cars), float, num_cars),
+        np.fromiter((car.dest_id for car in cars), float, num_cars),
+    ]
+
+
+def run_simulation(buffer_name, graph, lane_geometry, contraction_hierarchy, car_routes, config_data, window_size,
+                   ticks_per_second, stop, realtime=True):
+    """Child process: rebuild the cars from car_routes and step them until stop is set,
+    publishing every tick. With realtime the simulation is paced to the wall clock."""
+    window = HeadlessWindow(*window_size)
+    gps = GPS(graph, None, contraction_hierarchy, config_data.get("route_cache_size", 0), lane_geometry)
+    cars = [
+        Car(index, gps, source_id, gps.edge_route(vertex_route))
+        for index, (source_id, vertex_route) in enumerate(car_routes)
+    ]
+    if config_data.get("event_driven", False):
+        simulation = EventDrivenSimulation(cars)
+    else:
+        simulation = Simulation(
+            window, cars,
+            collision_system=config_data.get("collision_system"),
+            vehicle_arrays=config_data.get("vehicle_arrays", False),
+            driver_model=config_data.get("driver_model", "throttle"),
+            lane_changes=config_data.get("lane_changes", False),
+        )
+
+    buffer = SharedCarBuffer(len(cars), buffer_name)
+    dt = 1.0 / ticks_per_second
+    busy = 0.0
+    next_tick = time.perf_counter()
+    while not stop.is_set():
+        if realtime:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_tick += dt
+        start = time.perf_counter()
+        simulation.step(dt)
+        simulation.sync_cars()
+        buffer.publish(car_columns(cars), simulation.ticks, simulation.sim_time, busy)
+        busy += time.perf_counter() - start
+    buffer.close()
+
+
+class SimulationProcess:
+    """Owns the shared buffer and the child process stepping the simulation
+
+    cars are the Tk process's cars at the start of their routes, the child builds its
+    own copies from their routes and gps's graph, lane geometry and contraction hierarchy.
+    """
+    def __init__(self, gps, cars, config_data, window_size, ticks_per_second=30, realtime=True):
+        self.gps = gps
+        self.buffer = SharedCarBuffer(len(cars))
+        self.stop_event = multiprocessing.Event()
+        car_routes = [
+            (car.current_edge.source, GPS.route_vertex_ids(car.route + [car.current_edge], car.current_edge.source))
+            for car in cars
+        ]
+        self.process = multiprocessing.Process(
+            target=run_simulation,
+            args=(self.buffer.name, gps.graph, gps.lane_geometry, gps.contraction_hierarchy, car_routes, config_data,
+                  window_size, ticks_per_second, self.stop_event, realtime),
+            daemon=True,
+        )
+        self.frames = 0
+        self.rerenders = 0
+
+    def start(self):
+        self.process.start()
+
+    def render_latest(self, render, retries=1):
+        """Call render with the latest complete frame, a num_cars x FIELDS view of the shared
+        buffer that is read in place rather than copied
+
+        If the child started overwriting that buffer before render returned, render is
+        called again with the newer frame, at most retries more times. A frame that is
+        still torn after that only has cars a tick or two apart, and the next frame
+        draws them right.
+        """
+        for attempt in range(retries + 1):
+            frame, _, _, _, seq = self.buffer.acquire()
+            render(frame)
+            if self.buffer.still_valid(seq):
+                break
+        self.frames += 1
+        self.rerenders += attempt
+
+    def update_car(self, car, frame):
+        """Bring car, one of the Tk process's cars, up to date with its row of frame
+
+        The position, speed and edge come straight from the row. The route is planned
+        again from the edge to the published destination whenever either of them
+        changes, which is the route the child's car takes unless there is a tie.
+        """
+        row = frame[car.index]
+        car.x, car.y, car.speed = row.item(X), row.item(Y), row.item(SPEED)
+        source_id, next_dest_id, dest_id = int(row.item(EDGE_SOURCE)), int(row.item(EDGE_DEST)), int(row.item(DEST))
+        edge = car.current_edge
+        if edge is None or (edge.source, edge.dest, car.dest_id) != (source_id, next_dest_id, dest_id):
+            car.current_edge = self.gps.get_edge(source_id, next_dest_id)
+            car.next_dest_id = next_dest_id
+            car.dest_id = dest_id
+            car.route = self.gps.shortest_route(next_dest_id, dest_id) or []
+            car.speed_limit = car.get_speed_limit()
+
+    def tick_rate(self):
+        """(ticks, achievable ticks/sec) of the child, from the time it spent stepping"""
+        _, ticks, _, busy, _ = self.buffer.acquire()
+        return ticks, ticks / busy if busy > 0 else 0.0
+
+    def stop(self):
+        self.stop_event.set()
+        self.process.join()
+        self.buffer.close()
@@ -0,0 +1,71 @@
+from collision import (
+    EdgeCollisionSystem, GridCollisionSystem, LaneCollisionSystem, QuadTreeCollisionSystem, SpatialHashCollisionSystem,
+    VectorizedCollisionSystem,
+)
+from driver_models import IntelligentDriverModel, MobilLaneChangeModel, ThrottleDriverModel
+from vehicle_arrays import VehicleArrays
+
+
+class Simulation:
+    """Simulation logic for a set of cars, shared by the Tk window (main.py) and the
+    headless runner (headless.py). Knows nothing about drawing."""
+    def __init__(self, window, cars, collision_system=None, vehicle_arrays=False, driver_model="throttle",
+                 lane_changes=False):
+        self.cars = cars
+        self.vehicles = VehicleArrays(cars) if vehicle_arrays else None
+        if collision_system is None:
+            collision_system = "lane" if driver_model == "idm" else "quadtree"
+        elif driver_model == "idm" and collision_system != "lane":
+            raise ValueError("the idm driver model needs leaders and gaps along each lane, collision_system must be "
+                             "lane or left unset, not {0}".format(collision_system))
+        self.collision_system = self.create_collision_system(collision_system, window)
+        self.driver_model = self.create_driver_model(driver_model)
+        self.lane_change_model = None
+        if lane_changes and driver_model == "idm":
+            self.lane_change_model = MobilLaneChangeModel(self.driver_model, self.collision_system, self.vehicles)
+        self.ticks = 0
+        self.sim_time = 0.0
+
+    def create_collision_system(self, name, window):
+        """window only needs scrollregion_x and scrollregion_y"""
+        if name == "vectorized":
+            return VectorizedCollisionSystem(window, self.cars, self.vehicles)
+        elif name == "spatial_hash":
+            return SpatialHashCollisionSystem(window, self.cars)
+        elif name == "edge":
+            return EdgeCollisionSystem(window, self.cars)
+        elif name == "lane":
+            return LaneCollisionSystem(window, self.cars)
+        elif name == "grid":
+            return GridCollisionSystem(window, self.cars)
+        return QuadTreeCollisionSystem(window, self.cars)
+
+    def create_driver_model(self, name):
+        if name == "idm":
+            return IntelligentDriverModel(self.collision_system, self.vehicles)
+        return ThrottleDriverModel(self.collision_system, self.vehicles)
+
+    def step(self, dt):
+        """Advance every car by one tick of dt seconds"""
+        self.driver_model.update(self.cars, dt)
+        if self.lane_change_model is not None:
+            self.lane_change_model.update(self.cars, dt)
+        if self.vehicles is not None:
+            # cars arriving at a waypoint are synced as they pick their next edge, the rest
+            # only when the collision system reads positions off the Car objects
+            self.vehicles.move_towards_dest(dt)
+            if self.collision_system.reads_car_positions:
+                self.vehicles.sync_positions()
+        else:
+            for car in self.cars:
+                car.move_towards_dest(dt)
+        self.collision_system.update_objects(self.cars)
+
+        self.ticks += 1
+        self.sim_time += dt
+
+    def sync_cars(self):
+        """Bring every Car up to date with the vehicle arrays, once per rendered frame
+        rather than every tick"""
+        if self.vehicles is not None:
+            self.vehicles.sync_cars()
@@ -0,0 +1,65 @@
+"""Graphs, cars and a window stand in shared by the test modules"""
+import random
+
+import graphs
+from cars import Car
+from gps import GPS
+
+
+class StandInWindow:
+    """Just the scroll region the collision systems size themselves to"""
+    def __init__(self, width=1024, height=768):
+        self.scrollregion_x = width * 20
+        self.scrollregion_y = height * 20
+
+
+def build_graph(vertex_coords, connections):
+    """Build a Graph from {vertex_id: (x, y)} and one way (source, dest) connections"""
+    graph = graphs.Graph()
+    for vertex_id, (x, y) in vertex_coords.items():
+        graph.vertices[vertex_id] = graphs.Vertex(vertex_id, x, y, {})
+        graph.vertex_cnt += 1
+    for source, dest in connections:
+        weight = graph.distance_between_vertices(source, dest)
+        graph.add_edge(graphs.Edge(source, dest, weight, {"oneway": "yes"}))
+    return graph
+
+
+def build_gps():
+    """GPS for a 4x4 grid of two way roads 40 apart"""
+    graph = graphs.Graph()
+    size = 4
+    for row in range(size):
+        for col in range(size):
+            vertex_id = row * size + col + 1
+            graph.vertices[vertex_id] = graphs.Vertex(vertex_id, col * 40.0, row * 40.0, {})
+    for row in range(size):
+        for col in range(size):
+            vertex_id = row * size + col + 1
+            if col + 1 < size:
+                graph.add_edges(vertex_id, vertex_id + 1, {"maxspeed": "25"})
+            if row + 1 < size:
+                graph.add_edges(vertex_id, vertex_id + size, {"maxspeed": "35"})
+    return GPS(graph, None)
+
+
+def create_cars(gps, num_cars, seed):
+    random.seed(seed)
+    return [Car(index, gps, gps.random_vertex()) for index in range(num_cars)]
+
+
+def build_road(lanes):
+    """GPS for a one way road 1 -> 2 -> 3 along the x axis with lanes lanes"""
+    graph = build_graph({1: (0, 0), 2: (1000, 0), 3: (2000, 0)}, [(1, 2), (2, 3)])
+    for vertex_id in [1, 2]:
+        graph.vertices[vertex_id].edges[0].lanes = lanes
+    return GPS(graph, None)
+
+
+def queued_cars(gps, xs):
+    """Stopped cars at xs along the road from build_road, all heading for vertex 3"""
+    cars = [Car(index, gps, 1, gps.shortest_route(1, 3)) for index in range(len(xs))]
+    for car, x in zip(cars, xs):
+        car.x = x
+        car.speed = 0.0
+    return cars
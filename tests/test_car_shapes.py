@@ -0,0 +1,82 @@
+import unittest
+
+import graphics
+from car_shapes import CarShape, GlyphCache, render_in_view
+from helpers import build_road, queued_cars
+
+
+class TestRenderInView(unittest.TestCase):
+    def setUp(self):
+        self.window = graphics.GraphWin('Test', 1000, 1000)
+        self.cars = queued_cars(build_road(1), [100, 1900])
+        self.car_shapes = [CarShape(car.index, self.window, car) for car in self.cars]
+        for car_shape in self.car_shapes:
+            car_shape.draw()
+
+    def tearDown(self):
+        self.window.close()
+
+    def view(self, x0, y0, x1, y1):
+        self.window.getScreenPoints = lambda: (x0, y0, x1, y1)
+
+    def test_only_shapes_in_view_are_rendered(self):
+        self.view(0, -500, 1000, 500)
+        for car_shape in self.car_shapes:
+            car_shape.x += 10
+        self.assertEqual(render_in_view(self.car_shapes, self.window), 1)
+        self.assertEqual(self.car_shapes[0].shape.center.x, 110)
+        self.assertEqual(self.car_shapes[1].shape.center.x, 1900)
+        self.assertTrue(self.car_shapes[1].stale)
+
+    def test_one_coords_call_once_moved_a_pixel(self):
+        self.view(0, -500, 1000, 500)
+        car_shape = self.car_shapes[0]
+        car_shape.x += 5
+        self.assertEqual(render_in_view(self.car_shapes, self.window), 1)  # moves and turns in one call
+        car_shape.x += 0.4
+        self.assertEqual(render_in_view(self.car_shapes, self.window), 0)
+        car_shape.x += 0.4
+        self.assertEqual(render_in_view(self.car_shapes, self.window), 0)
+        car_shape.x += 0.4
+        self.assertEqual(render_in_view(self.car_shapes, self.window), 1)
+        self.assertAlmostEqual(car_shape.shape.center.x, 106.2)
+        self.assertAlmostEqual(car_shape.direction, 90.0)
+
+    def test_outline_matches_heading(self):
+        self.view(0, -500, 1000, 500)
+        car_shape = self.car_shapes[0]
+        car_shape.render(direction=92.0)
+        self.assertEqual(car_shape.direction, 90.0)  # nearest of the 72 buckets
+        xs = [x for x, _ in car_shape.shape.points]
+        ys = [y for _, y in car_shape.shape.points]
+        # facing along the x axis the car is long in x and narrow in y
+        self.assertAlmostEqual(max(xs) - min(xs), car_shape.height)
+        self.assertAlmostEqual(max(ys) - min(ys), car_shape.width)
+
+    def test_glyphs_are_rotated_from_upright_corners(self):
+        glyphs = GlyphCache(buckets=4)
+        upright = glyphs.world(4, 10)[0]
+        self.assertEqual(upright, (-2, -5, 2, -5, 2, 5, -2, 5))
+        turned = glyphs.world(4, 10)[3]  # 270 degrees
+        for offset, expected in zip(turned, (5, -2, 5, 2, -5, 2, -5, -2)):
+            self.assertAlmostEqual(offset, expected)
+        self.assertEqual(glyphs.bucket(359.0), 0)
+        self.assertIs(glyphs.world(4, 10), glyphs.world(4, 10))
+
+    def test_stale_shape_catches_up_when_panned_into_view(self):
+        self.view(0, -500, 1000, 500)
+        car, car_shape = self.cars[1], self.car_shapes[1]
+        for _ in range(5):
+            car.x -= 100
+            render_in_view(self.car_shapes, self.window, self.cars)
+        self.assertEqual(car_shape.shape.center.x, 1900)
+
+        self.view(1000, -500, 2000, 500)
+        render_in_view(self.car_shapes, self.window, self.cars)
+        self.assertEqual(car_shape.shape.center.x, 1400)
+        self.assertFalse(car_shape.stale)
+        self.assertAlmostEqual(car_shape.direction, 90.0)  # facing along its lane, not the way it jumped
+
+
+if __name__ == '__main__':
+    unittest.main()
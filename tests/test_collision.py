@@ -1,5 +1,8 @@
+import math
 import unittest
+import random
 import collision
+from helpers import StandInWindow, build_gps, build_graph, create_cars
 
 
 class TestGrid(unittest.TestCase):
@@ -28,6 +31,40 @@ class TestGrid(unittest.TestCase):
         expected = (self.grid.num_cols * self.grid.num_rows/2) + self.grid.num_cols/2
         self.assertEqual(actual, expected)
 
+    def test_cells_are_independent(self):
+        self.grid.insert_into_cell(0, "A")
+        self.assertEqual(self.grid.cells[0].contents, {"A"})
+        self.assertEqual(self.grid.cells[1].contents, set())
+
+
+class TestSpatialHash(unittest.TestCase):
+    def setUp(self):
+        self.spatial_hash = collision.SpatialHash(32, -1024, -768)
+        self.spatial_hash.insert(0, 10, 10)
+        self.spatial_hash.insert(1, 15, 10)
+        self.spatial_hash.insert(2, 20, 20)
+        self.spatial_hash.insert(3, 40, 10)
+
+    def test_cell_contents(self):
+        self.assertEqual(set(self.spatial_hash.get_cell_contents(5, 5)), {0, 1, 2})
+        self.assertEqual(self.spatial_hash.get_cell_contents(-500, -350), [])
+
+    def test_nearby_objects_include_adjacent_cells(self):
+        self.assertEqual(set(self.spatial_hash.get_nearby_objects(30, 10)), {0, 1, 2, 3})
+        self.assertEqual(set(self.spatial_hash.get_nearby_objects(80, 10)), {3})
+
+    def test_move_between_cells(self):
+        self.assertTrue(self.spatial_hash.move(1, 45, 10))
+        self.assertFalse(self.spatial_hash.move(1, 50, 12))
+        self.assertEqual(set(self.spatial_hash.get_cell_contents(10, 10)), {0, 2})
+        self.assertEqual(set(self.spatial_hash.get_cell_contents(40, 10)), {1, 3})
+
+    def test_remove_empties_cell(self):
+        self.spatial_hash.remove(3)
+        self.spatial_hash.remove(3)
+        self.assertEqual(self.spatial_hash.get_cell_contents(40, 10), [])
+        self.assertEqual(len(self.spatial_hash.heads), 1)
+
 
 class TestQuad(unittest.TestCase):
     def setUp(self):
@@ -54,3 +91,139 @@ class TestQuad(unittest.TestCase):
         actual = self.quad.get_cell_contents(-500, -350)
         expected = None
         self.assertEqual(actual, expected)
+
+
+def packed_cars(num_cars, seed):
+    rng = random.Random(seed)
+    cars = create_cars(build_gps(), num_cars, seed=seed)
+    for car in cars:
+        # pack cars into a small area so plenty of them are about to collide
+        car.x = rng.uniform(0, 120)
+        car.y = rng.uniform(0, 120)
+    return cars
+
+
+def pairwise_collisions(cars):
+    return [any(car.check_collision(other) for other in cars if other != car) for car in cars]
+
+
+class TestGridCollisionSystem(unittest.TestCase):
+    def test_update_objects_moves_car_between_cells(self):
+        cars = packed_cars(5, seed=2)
+        collision_system = collision.GridCollisionSystem(StandInWindow(), cars)
+        old_cell = cars[0].cell
+        cars[0].x += 500
+        collision_system.update_objects(cars)
+        self.assertNotIn(0, collision_system.grid.cells[old_cell].contents)
+        self.assertIn(0, collision_system.get_nearby_objects(cars[0]))
+
+
+class TestSpatialHashCollisionSystem(unittest.TestCase):
+    def setUp(self):
+        self.cars = packed_cars(60, seed=5)
+        self.collision_system = collision.SpatialHashCollisionSystem(StandInWindow(), self.cars)
+
+    def test_matches_pairwise_check_collision(self):
+        expected = pairwise_collisions(self.cars)
+        self.assertEqual(self.collision_system.find_collisions(self.cars), expected)
+        self.assertTrue(any(expected) and not all(expected))
+
+    def test_update_objects(self):
+        for car in self.cars:
+            car.x += 300
+        self.collision_system.update_objects(self.cars)
+        self.assertEqual(self.collision_system.find_collisions(self.cars), pairwise_collisions(self.cars))
+        self.assertEqual(self.collision_system.get_nearby_objects_xy(60, 60), [])
+
+
+class TestEdgeCollisionSystem(unittest.TestCase):
+    def setUp(self):
+        # one way road 1 -> 2 -> 3 along the x axis
+        from cars import Car
+        from gps import GPS
+        graph = build_graph({1: (0, 0), 2: (100, 0), 3: (200, 0)}, [(1, 2), (2, 3)])
+        gps = GPS(graph, None)
+        self.cars = [Car(index, gps, 1, gps.shortest_route(1, 3)) for index in range(3)]
+        self.cars.append(Car(3, gps, 2, gps.shortest_route(2, 3)))
+        for car, x in zip(self.cars, [10, 30, 90, 110]):
+            car.x = x
+        self.collision_system = collision.EdgeCollisionSystem(StandInWindow(), self.cars)
+
+    def test_leaders(self):
+        # last car on edge 1 -> 2 follows the first car on edge 2 -> 3
+        self.assertEqual(self.collision_system.leaders, [1, 2, 3, None])
+        self.assertEqual(self.collision_system.gaps[:3], [20.0, 60.0, 20.0])
+
+    def test_find_collisions(self):
+        self.assertEqual(self.collision_system.find_collisions(self.cars), [True, False, True, False])
+
+    def test_car_moves_to_next_edge(self):
+        car = self.cars[2]
+        car.move_towards_dest(1.0)  # arrives at vertex 2
+        car.x = 150
+        self.collision_system.update_objects(self.cars)
+        self.assertEqual(self.collision_system.leaders, [1, 3, None, 2])
+        self.assertEqual(self.collision_system.get_nearby_objects(self.cars[1]), [3])
+
+
+class TestLaneCollisionSystem(unittest.TestCase):
+    def setUp(self):
+        # two lane one way road 1 -> 2 along the x axis, lane 1 has a single car at x = 50
+        from cars import Car
+        from gps import GPS
+        graph = build_graph({1: (0, 0), 2: (100, 0)}, [(1, 2)])
+        graph.vertices[1].edges[0].lanes = 2
+        gps = GPS(graph, None)
+        self.cars = [Car(index, gps, 1, gps.shortest_route(1, 2)) for index in range(4)]
+        for car, x in zip(self.cars, [10, 30, 50, 70]):
+            car.x = x
+        self.cars[2].change_lane(1)
+        self.collision_system = collision.LaneCollisionSystem(StandInWindow(), self.cars)
+
+    def test_leaders_in_same_lane(self):
+        self.assertEqual(self.collision_system.leaders, [1, 3, None, None])
+        self.assertEqual(self.collision_system.followers, [None, 0, None, 1])
+
+    def test_lane_neighbours(self):
+        lane_1 = self.cars[2].lane_slot
+        self.assertEqual(self.collision_system.lane_neighbours(self.cars[1], lane_1), (2, 20.0, None, math.inf))
+        self.assertEqual(self.collision_system.lane_neighbours(self.cars[3], lane_1), (None, math.inf, 2, 20.0))
+        lane_0 = self.cars[0].lane_slot
+        self.assertEqual(self.collision_system.lane_neighbours(self.cars[2], lane_0), (3, 20.0, 1, 20.0))
+        self.assertEqual(self.collision_system.lane_neighbours(self.cars[1], lane_0), (3, 40.0, 0, 20.0))
+
+    def test_lane_change_moves_car_between_lists(self):
+        self.cars[1].change_lane(1)
+        self.collision_system.update_objects(self.cars)
+        self.assertEqual(self.collision_system.leaders, [3, 2, None, None])
+
+
+class TestVectorizedCollisionSystem(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        self.cars = create_cars(build_gps(), 60, seed=5)
+        for car in self.cars:
+            # pack cars into a small area so plenty of them are about to collide
+            car.x = rng.uniform(0, 120)
+            car.y = rng.uniform(0, 120)
+        self.collision_system = collision.VectorizedCollisionSystem(StandInWindow(), self.cars)
+
+    def test_matches_pairwise_check_collision(self):
+        expected = [
+            any(car.check_collision(other) for other in self.cars if other != car)
+            for car in self.cars
+        ]
+        actual = self.collision_system.find_collisions(self.cars).tolist()
+        self.assertEqual(actual, expected)
+        self.assertTrue(any(expected) and not all(expected))
+
+    def test_process_collisions_masks(self):
+        throttle_up, throttle_down = self.collision_system.process_collisions(self.cars)
+        self.assertEqual(throttle_up.tolist(), (~throttle_down).tolist())
+
+    def test_nearby_objects_include_adjacent_cells(self):
+        car = self.cars[0]
+        nearby = set(self.collision_system.get_nearby_objects(car))
+        for other in self.cars:
+            if abs(other.x - car.x) < 32 and abs(other.y - car.y) < 32:
+                self.assertIn(other.index, nearby)
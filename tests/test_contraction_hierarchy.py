@@ -0,0 +1,59 @@
+import unittest
+import random
+import graphs
+from contraction_hierarchy import ContractionHierarchy
+
+
+def route_length(graph, route):
+    route = route[::-1]
+    length = 0.0
+    for source_id, dest_id in zip(route, route[1:]):
+        length += min(edge.weight for edge in graph.vertices[source_id].get_edges() if edge.dest == dest_id)
+    return length
+
+
+class TestContractionHierarchy(unittest.TestCase):
+    def setUp(self):
+        # street grid with a mix of one way and two way roads
+        rng = random.Random(7)
+        size = 8
+        self.graph = graphs.Graph()
+        for row in range(size):
+            for col in range(size):
+                vertex_id = row * size + col + 1
+                x = col * 50.0 + rng.uniform(-10, 10)
+                y = row * 50.0 + rng.uniform(-10, 10)
+                self.graph.vertices[vertex_id] = graphs.Vertex(vertex_id, x, y, {})
+        for row in range(size):
+            for col in range(size):
+                vertex_id = row * size + col + 1
+                tags = {"oneway": "yes"} if rng.random() < 0.3 else {}
+                if col + 1 < size:
+                    self.graph.add_edges(vertex_id, vertex_id + 1, tags)
+                if row + 1 < size:
+                    self.graph.add_edges(vertex_id + size, vertex_id, tags)
+        self.contraction_hierarchy = ContractionHierarchy.build(self.graph)
+
+    def test_routes_match_dijkstra(self):
+        for source in list(self.graph.vertices.values())[::7]:
+            shortest_paths = graphs.ShortestPaths(self.graph, source)
+            for dest_id, expected in shortest_paths.path_lengths.items():
+                route = self.contraction_hierarchy.shortest_route(source.id, dest_id)
+                if expected == float("inf"):
+                    self.assertIsNone(route)
+                    continue
+                self.assertEqual(route[-1], source.id)
+                self.assertEqual(route[0], dest_id)
+                self.assertAlmostEqual(route_length(self.graph, route), expected, places=6)
+
+    def test_same_source_and_dest(self):
+        self.assertEqual(self.contraction_hierarchy.shortest_route(1, 1), [1])
+
+    def test_json_round_trip(self):
+        loaded = ContractionHierarchy.from_json(self.contraction_hierarchy.to_json())
+        self.assertEqual(loaded.signature, self.contraction_hierarchy.signature)
+        for dest_id in self.graph.vertices:
+            self.assertEqual(
+                loaded.shortest_route(1, dest_id),
+                self.contraction_hierarchy.shortest_route(1, dest_id)
+            )
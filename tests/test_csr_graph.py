@@ -0,0 +1,63 @@
+import pickle
+import unittest
+import graphs
+from csr_graph import CSRGraph
+from gps import GPS
+
+
+class TestCSRGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = graphs.Graph()
+        vertex_coords = {101: (0, 0), 102: (10, 0), 103: (0, 30), 104: (20, 0)}
+        for vertex_id, (x, y) in vertex_coords.items():
+            self.graph.vertices[vertex_id] = graphs.Vertex(vertex_id, x, y, {})
+        self.graph.add_edges(101, 102, {"name": "Main St", "maxspeed": "35 mph", "lanes": "2"})
+        self.graph.add_edges(102, 104, {"name": "Main St", "oneway": "yes"})
+        self.graph.add_edges(101, 103, {"name": "1st Ave", "oneway": "yes"})
+        self.graph.add_edges(103, 104, {})
+        self.csr_graph = CSRGraph.from_graph(self.graph)
+
+    def test_counts(self):
+        self.assertEqual(self.csr_graph.vertex_cnt, 4)
+        self.assertEqual(self.csr_graph.edge_cnt, self.graph.edge_cnt)
+
+    def test_vertex_view(self):
+        vertex = self.csr_graph.vertices[103]
+        self.assertEqual((vertex.id, vertex.x, vertex.y), (103, 0, 30))
+        self.assertIn(104, self.csr_graph.vertices)
+        self.assertEqual(list(self.csr_graph.vertices), [101, 102, 103, 104])
+
+    def test_edge_views_match_edges(self):
+        for vertex_id, vertex in self.graph.vertices.items():
+            expected = [
+                (edge.source, edge.dest, edge.weight, edge.name, edge.speed_limit, edge.lanes, edge.is_one_way)
+                for edge in vertex.get_edges()
+            ]
+            actual = [
+                (edge.source, edge.dest, edge.weight, edge.name, edge.speed_limit, edge.lanes, edge.is_one_way)
+                for edge in self.csr_graph.vertices[vertex_id].get_edges()
+            ]
+            self.assertEqual(actual, expected)
+
+    def test_pickling_drops_observers(self):
+        for graph in [self.graph, self.csr_graph]:
+            GPS(graph, None)
+            self.assertEqual(len(graph.observers), 1)
+            copy = pickle.loads(pickle.dumps(graph))
+            self.assertEqual(copy.observers, [])
+            self.assertEqual(copy.edge_cnt, graph.edge_cnt)
+
+    def test_get_edge(self):
+        edge = self.csr_graph.get_edge(102, 104)
+        self.assertEqual((edge.source, edge.dest, edge.name), (102, 104, "Main St"))
+        self.assertIsNone(self.csr_graph.get_edge(104, 102))
+
+    def test_shortest_route_matches_graph(self):
+        csr_gps = GPS(self.csr_graph, None)
+        graph_gps = GPS(self.graph, None)
+        for source_id in self.graph.vertices:
+            for dest_id in self.graph.vertices:
+                self.assertEqual(
+                    GPS.route_vertex_ids(csr_gps.shortest_route(source_id, dest_id), source_id),
+                    GPS.route_vertex_ids(graph_gps.shortest_route(source_id, dest_id), source_id)
+                )
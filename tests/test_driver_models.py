@@ -0,0 +1,124 @@
+import math
+import unittest
+
+import numpy as np
+
+from driver_models import IntelligentDriverModel
+from simulation import Simulation
+from helpers import StandInWindow, build_gps, build_graph, build_road, create_cars, queued_cars
+
+
+class TestIntelligentDriverModel(unittest.TestCase):
+    def setUp(self):
+        self.driver_model = IntelligentDriverModel(None)
+
+    def accelerations(self, speed, speed_limit, leader_speed, gap):
+        return self.driver_model.accelerations(
+            np.array(speed), np.array(speed_limit), np.array(leader_speed), np.array(gap)
+        )
+
+    def test_free_road(self):
+        accelerations = self.accelerations([0.0, 25.0], [25.0, 25.0], [0.0, 25.0], [math.inf, math.inf])
+        self.assertAlmostEqual(accelerations[0], self.driver_model.max_acceleration)
+        self.assertAlmostEqual(accelerations[1], 0.0)
+
+    def test_brakes_harder_when_closing_in(self):
+        same_speed, closing_in = self.accelerations([20.0, 20.0], [25.0, 25.0], [20.0, 0.0], [30.0, 30.0])
+        self.assertLess(closing_in, same_speed)
+        self.assertLess(closing_in, 0.0)
+
+
+class TestCarFollowing(unittest.TestCase):
+    def simulate(self, ticks_per_second, seconds=20.0):
+        # one way road 1 -> 2 -> 3 along the x axis, the leader at x = 300 barely moves
+        from cars import Car
+        from gps import GPS
+        graph = build_graph({1: (0, 0), 2: (1000, 0), 3: (2000, 0)}, [(1, 2), (2, 3)])
+        gps = GPS(graph, None)
+        cars = [Car(index, gps, 1, gps.shortest_route(1, 3)) for index in range(4)]
+        for car, x in zip(cars, [0, 40, 80, 300]):
+            car.x = x
+            car.speed = 25.0
+        leader = cars[-1]
+        leader.speed = 0.0
+        leader.speed_limit = 0.0
+
+        simulation = Simulation(StandInWindow(), cars, driver_model="idm")
+        overlaps = 0
+        for _ in range(int(seconds * ticks_per_second)):
+            simulation.step(1.0 / ticks_per_second)
+            overlaps += simulation.collision_system.count_overlaps(cars)
+        return cars, overlaps
+
+    def test_queue_behind_stopped_leader(self):
+        for ticks_per_second in [30, 5]:
+            with self.subTest(ticks_per_second=ticks_per_second):
+                cars, overlaps = self.simulate(ticks_per_second)
+                self.assertEqual(overlaps, 0)
+                for follower, leader in zip(cars, cars[1:]):
+                    self.assertLess(follower.speed, 1.5)
+                    self.assertGreater(leader.x - follower.x, follower.height)
+                    self.assertLess(leader.x - follower.x, 2 * follower.height + 10)
+
+    def test_idm_needs_lane_collision_system(self):
+        cars = queued_cars(build_road(1), [0, 100])
+        self.assertEqual(type(Simulation(StandInWindow(), cars, driver_model="idm").collision_system).__name__,
+                         "LaneCollisionSystem")
+        with self.assertRaises(ValueError):
+            Simulation(StandInWindow(), cars, "quadtree", driver_model="idm")
+
+    def test_vehicle_arrays_match_car_objects(self):
+        gps = build_gps()
+        simulations = []
+        for vehicle_arrays in [False, True]:
+            # create_cars seeds random, so both runs pick the same new routes
+            simulation = Simulation(
+                StandInWindow(), create_cars(gps, 20, seed=4), vehicle_arrays=vehicle_arrays, driver_model="idm"
+            )
+            for _ in range(150):
+                simulation.step(0.1)
+            simulation.sync_cars()
+            simulations.append(simulation)
+        objects, arrays = simulations
+        for expected, actual in zip(objects.cars, arrays.cars):
+            self.assertAlmostEqual(expected.x, actual.x, places=6)
+            self.assertAlmostEqual(expected.speed, actual.speed, places=6)
+
+
+class TestMobilLaneChangeModel(unittest.TestCase):
+    def test_overtakes_stopped_car(self):
+        cars = queued_cars(build_road(2), [40, 120])
+        cars[0].speed = 20.0
+        cars[1].speed_limit = 0.0
+        simulation = Simulation(StandInWindow(), cars, driver_model="idm", lane_changes=True)
+        for _ in range(50):
+            simulation.step(0.1)
+        self.assertEqual(cars[0].lane_index, 1)
+        self.assertGreater(cars[0].x, cars[1].x)
+
+    def test_no_cutting_in_front_of_close_follower(self):
+        cars = queued_cars(build_road(2), [50, 70, 20])
+        cars[1].speed_limit = 0.0
+        cars[2].change_lane(1)
+        cars[2].speed = 25.0
+        simulation = Simulation(StandInWindow(), cars, driver_model="idm", lane_changes=True)
+        simulation.lane_change_model.politeness = 0.0  # only the safety check holds car 0 back
+        simulation.step(0.1)
+        self.assertEqual(cars[0].lane_index, 0)
+
+    def test_more_lanes_carry_more_cars(self):
+        passed = []
+        for lanes in [1, 2]:
+            cars = queued_cars(build_road(lanes), [x * 20.0 for x in range(40)])
+            simulation = Simulation(StandInWindow(), cars, driver_model="idm", lane_changes=True)
+            overlaps = 0
+            for _ in range(300):
+                simulation.step(0.1)
+                overlaps += simulation.collision_system.count_overlaps(cars)
+            self.assertEqual(overlaps, 0)
+            passed.append(sum(car.current_edge.source == 2 for car in cars))
+        self.assertGreater(passed[1], passed[0] * 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from event_driven import EventDrivenSimulation
+from helpers import build_graph, build_road, queued_cars
+
+
+class TestEventDrivenSimulation(unittest.TestCase):
+    def test_lone_car_moves_by_events_only(self):
+        cars = queued_cars(build_road(1), [0])
+        cars[0].speed = cars[0].speed_limit
+        simulation = EventDrivenSimulation(cars)
+        for _ in range(300):
+            simulation.step(0.1)
+        simulation.sync_cars()
+
+        # 25 px/s, vertex 2 is reached after 40s
+        self.assertEqual(simulation.integrations, 0)
+        self.assertEqual(simulation.events_processed, 0)
+        self.assertAlmostEqual(cars[0].x, 750.0)
+        for _ in range(200):
+            simulation.step(0.1)
+        simulation.sync_cars()
+        self.assertEqual(simulation.events_processed, 1)
+        self.assertAlmostEqual(cars[0].x, 1250.0)
+
+    def test_follower_is_integrated_behind_free_leader(self):
+        cars = queued_cars(build_road(1), [0, 100])
+        for car in cars:
+            car.speed = car.speed_limit
+        cars[1].speed_limit = 10.0
+        cars[1].speed = 10.0
+        simulation = EventDrivenSimulation(cars)
+        self.assertEqual(simulation.interacting, {0})
+        for _ in range(200):
+            simulation.step(0.1)
+            simulation.sync_cars()
+            self.assertGreater(cars[1].x - cars[0].x, cars[0].height)
+        self.assertAlmostEqual(cars[0].speed, 10.0, delta=0.5)
+
+    def test_leaders_follow_lane_order(self):
+        cars = queued_cars(build_road(1), [0, 50, 100, 150])
+        for car in cars:
+            car.speed = car.speed_limit
+        simulation = EventDrivenSimulation(cars)
+        for _ in range(600):
+            simulation.step(0.1)
+            for lane_cars in simulation.lane_cars.values():
+                self.assertEqual([simulation.ahead[index] for index in lane_cars], [None] + list(lane_cars)[:-1])
+        # every car has turned onto 2 -> 3, in the order they started in
+        self.assertEqual([list(lane_cars) for lane_cars in simulation.lane_cars.values()], [[3, 2, 1, 0]])
+
+    def test_car_entering_next_lane_wakes_free_car(self):
+        from cars import Car
+        from gps import GPS
+        # 1 -> 2 -> 3 along the x axis and a side road 4 -> 2 that joins it
+        graph = build_graph({1: (0, 0), 2: (1000, 0), 3: (2000, 0), 4: (1000, 1000)}, [(1, 2), (2, 3), (4, 2)])
+        gps = GPS(graph, None)
+        main_road = Car(0, gps, 1, gps.shortest_route(1, 3))
+        side_road = Car(1, gps, 4, gps.shortest_route(4, 3))
+        main_road.x, side_road.y = 500, 10
+        for car in [main_road, side_road]:
+            car.speed = car.speed_limit
+        simulation = EventDrivenSimulation([main_road, side_road])
+        self.assertEqual(len(simulation.free), 2)
+
+        simulation.step(1.0)  # side road car reaches vertex 2 and turns onto 2 -> 3
+        self.assertEqual(simulation.events_processed, 1)
+        self.assertIn(0, simulation.interacting)
+        self.assertEqual(simulation.leader(main_road, {})[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
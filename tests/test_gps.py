@@ -0,0 +1,147 @@
+import unittest
+import graphs
+from cars import plan_initial_routes
+from csr_graph import CSRGraph
+import gps
+from gps import GPS
+
+
+def build_graph():
+    graph = graphs.Graph()
+    vertex_coords = {1: (0, 0), 2: (10, 0), 3: (0, 30), 4: (20, 0)}
+    for vertex_id, (x, y) in vertex_coords.items():
+        graph.vertices[vertex_id] = graphs.Vertex(vertex_id, x, y, {})
+    for source, dest in [(1, 2), (2, 4), (1, 3), (3, 4), (4, 1)]:
+        graph.add_edges(source, dest, {"oneway": "yes"})
+    return graph
+
+
+class TestShortestPathTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_graph()
+        self.gps = GPS(self.graph, None, tree_cache_size=2)
+
+    def edge(self, source_id, dest_id):
+        return self.gps.get_edge(source_id, dest_id)
+
+    def vertex_route(self, source_id, dest_id):
+        return GPS.route_vertex_ids(self.gps.shortest_route(source_id, dest_id), source_id)
+
+    def test_hits_and_misses(self):
+        self.assertEqual(self.vertex_route(1, 4), [4, 2, 1])
+        self.assertEqual(self.vertex_route(1, 3), [3, 1])
+        self.assertEqual((self.gps.tree_cache.hits, self.gps.tree_cache.misses), (1, 1))
+
+    def test_least_recently_used_eviction(self):
+        self.gps.shortest_paths(1)
+        self.gps.shortest_paths(2)
+        self.gps.shortest_paths(1)
+        self.gps.shortest_paths(3)
+        self.assertEqual(list(self.gps.tree_cache.trees), [1, 3])
+
+    def test_heavier_tree_edge_invalidates(self):
+        self.gps.shortest_paths(1)
+        self.gps.shortest_paths(3)
+        self.graph.update_edge_weight(self.edge(2, 4), 100.0)
+        self.assertNotIn(1, self.gps.tree_cache.trees)
+        self.assertIn(3, self.gps.tree_cache.trees)
+        self.assertEqual(self.vertex_route(1, 4), [4, 3, 1])
+
+    def test_lighter_edge_invalidates(self):
+        self.gps.shortest_paths(1)
+        self.gps.shortest_paths(3)
+        self.graph.update_edge_weight(self.edge(1, 3), 1.0)
+        self.assertNotIn(1, self.gps.tree_cache.trees)
+        self.assertIn(3, self.gps.tree_cache.trees)  # cheaper 1 -> 3 can't shorten paths from 3
+        self.assertEqual(self.gps.shortest_paths(1).path_lengths[3], 1.0)
+
+    def test_new_edge_invalidates(self):
+        self.gps.shortest_paths(1)
+        self.graph.add_edge(graphs.Edge(1, 4, 5.0, {"oneway": "yes"}))
+        self.assertNotIn(1, self.gps.tree_cache.trees)
+        self.assertEqual(self.vertex_route(1, 4), [4, 1])
+
+    def test_closed_gps_stops_observing(self):
+        self.gps.shortest_paths(1)
+        self.gps.close()
+        self.assertEqual(self.graph.observers, [])
+        self.graph.update_edge_weight(self.edge(2, 4), 100.0)
+        self.assertIn(1, self.gps.tree_cache.trees)
+
+    def test_csr_graph_invalidates(self):
+        csr_graph = CSRGraph.from_graph(self.graph)
+        gps = GPS(csr_graph, None, tree_cache_size=2)
+        gps.shortest_paths(1)
+        csr_graph.update_edge_weight(gps.get_edge(2, 4), 100.0)
+        self.assertNotIn(1, gps.tree_cache.trees)
+
+
+class TestEdgeRoutes(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_graph()
+        self.gps = GPS(self.graph, None)
+
+    def test_route_is_edges_with_last_edge_first(self):
+        route = self.gps.shortest_route(1, 4)
+        self.assertEqual([(edge.source, edge.dest) for edge in route], [(2, 4), (1, 2)])
+        self.assertEqual(self.gps.shortest_route(1, 1), [])
+
+    def test_contraction_hierarchy_route_is_edges(self):
+        from contraction_hierarchy import ContractionHierarchy
+        gps = GPS(self.graph, None, ContractionHierarchy.build(self.graph))
+        self.assertEqual(gps.shortest_route(3, 2), self.gps.shortest_route(3, 2))
+
+    def test_vertex_ids_round_trip(self):
+        route = self.gps.shortest_route(3, 2)
+        vertex_route = GPS.route_vertex_ids(route, 3)
+        self.assertEqual(vertex_route, [2, 1, 4, 3])
+        self.assertEqual(self.gps.edge_route(vertex_route), route)
+
+
+class TestRandomReachableVertex(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_graph()
+        self.graph.vertices[5] = graphs.Vertex(5, 40, 0, {})
+        self.graph.add_edges(4, 5, {"oneway": "yes"})  # dead end
+        self.gps = GPS(self.graph, None)
+
+    def test_only_reachable_destinations(self):
+        for _ in range(50):
+            dest_id = self.gps.random_reachable_vertex(1)
+            self.assertIn(dest_id, [2, 3, 4, 5])
+            self.assertIsNotNone(self.gps.shortest_route(1, dest_id))
+
+    def test_dead_end(self):
+        self.assertIsNone(self.gps.random_reachable_vertex(5))
+
+    def test_initial_routes_need_a_reachable_vertex(self):
+        graph = graphs.Graph()
+        for vertex_id in [1, 2]:
+            graph.vertices[vertex_id] = graphs.Vertex(vertex_id, vertex_id * 10, 0, {})
+        with self.assertRaises(ValueError):
+            plan_initial_routes(GPS(graph, None), 3)
+        for source_id, route in plan_initial_routes(self.gps, 20):
+            self.assertNotEqual(source_id, 5)
+            self.assertTrue(route)
+
+
+class TestPlanRoutes(unittest.TestCase):
+    def setUp(self):
+        self.graph = build_graph()
+        self.gps = GPS(self.graph, None, tree_cache_size=2)  # observer must not be pickled
+        vertex_ids = list(self.graph.vertices)
+        self.pairs = [(source_id, dest_id) for source_id in vertex_ids for dest_id in vertex_ids]
+
+    def test_process_pool_matches_serial(self):
+        pairs = self.pairs * (gps.PARALLEL_ROUTE_THRESHOLD // len(self.pairs) + 1)
+        expected = [self.gps.shortest_route(source_id, dest_id) for source_id, dest_id in pairs]
+        actual = self.gps.plan_routes(pairs, max_workers=2)
+        self.assertEqual(actual, expected)
+        # routes are made of this process's edges, not copies unpickled from a worker
+        for route in actual:
+            for edge in route:
+                self.assertIs(edge, self.gps.get_edge(edge.source, edge.dest))
+
+    def test_serial(self):
+        expected = [self.gps.shortest_route(source_id, dest_id) for source_id, dest_id in self.pairs]
+        self.assertEqual(self.gps.plan_routes(self.pairs, max_workers=1), expected)
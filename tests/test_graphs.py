@@ -0,0 +1,89 @@
+import unittest
+import graphs
+from helpers import build_graph
+
+
+class TestShortestPaths(unittest.TestCase):
+    def setUp(self):
+        # 1 -> 2 -> 4 is shorter than the detour 1 -> 3 -> 4
+        vertex_coords = {1: (0, 0), 2: (10, 0), 3: (0, 30), 4: (20, 0), 5: (100, 100)}
+        connections = [(1, 2), (2, 4), (1, 3), (3, 4), (4, 1)]
+        self.graph = build_graph(vertex_coords, connections)
+        self.shortest_paths = graphs.ShortestPaths(self.graph, self.graph.vertices[1])
+
+    def test_path_lengths(self):
+        self.assertEqual(self.shortest_paths.path_lengths[4], 20.0)
+        self.assertEqual(self.shortest_paths.path_lengths[3], 30.0)
+
+    def test_path_of_edges(self):
+        self.assertEqual(self.shortest_paths.path_of_edges[4].source, 2)
+
+    def test_unreachable_vertex(self):
+        self.assertNotIn(5, self.shortest_paths.path_of_edges)
+
+    def test_get_edge(self):
+        self.assertEqual(self.graph.get_edge(1, 3).weight, 30.0)
+        self.assertIsNone(self.graph.get_edge(3, 1))
+
+    def test_decreased_distance_replaces_stale_entry(self):
+        # 3 is first reached directly (30.0) and then improved through 2 (10.0 + 10.0)
+        vertex_coords = {1: (0, 0), 2: (10, 0), 3: (10, 10)}
+        graph = build_graph(vertex_coords, [(1, 3), (1, 2), (2, 3)])
+        graph.vertices[1].edges[0].weight = 30.0
+        shortest_paths = graphs.ShortestPaths(graph, graph.vertices[1])
+        self.assertEqual(shortest_paths.path_lengths[3], 20.0)
+        self.assertEqual(shortest_paths.path_of_edges[3].source, 2)
+
+
+class TestAStarPath(unittest.TestCase):
+    def setUp(self):
+        vertex_coords = {1: (0, 0), 2: (10, 0), 3: (0, 30), 4: (20, 0), 5: (100, 100)}
+        connections = [(1, 2), (2, 4), (1, 3), (3, 4), (4, 1)]
+        self.graph = build_graph(vertex_coords, connections)
+
+    def test_matches_dijkstra_path_lengths(self):
+        source = self.graph.vertices[1]
+        shortest_paths = graphs.ShortestPaths(self.graph, source)
+        for vertex_id in [2, 3, 4]:
+            a_star_path = graphs.AStarPath(self.graph, source, self.graph.vertices[vertex_id])
+            self.assertEqual(a_star_path.path_length, shortest_paths.path_lengths[vertex_id])
+
+    def test_stops_at_target(self):
+        a_star_path = graphs.AStarPath(self.graph, self.graph.vertices[1], self.graph.vertices[2])
+        self.assertNotIn(4, a_star_path.path_of_edges)
+
+    def test_unreachable_target(self):
+        a_star_path = graphs.AStarPath(self.graph, self.graph.vertices[1], self.graph.vertices[5])
+        self.assertEqual(a_star_path.path_length, float("inf"))
+
+
+class TestStronglyConnectedComponents(unittest.TestCase):
+    def setUp(self):
+        # cycle 1 -> 2 -> 4 -> 1 (with 3 on a one way detour 1 -> 3 -> 4), one way exit 4 -> 6,
+        # 6 <-> 7 and a dead end 8 only reachable from 7
+        vertex_coords = {
+            1: (0, 0), 2: (10, 0), 3: (0, 30), 4: (20, 0), 5: (100, 100),
+            6: (40, 0), 7: (60, 0), 8: (80, 0),
+        }
+        connections = [(1, 2), (2, 4), (1, 3), (3, 4), (4, 1), (4, 6), (6, 7), (7, 6), (7, 8)]
+        self.graph = build_graph(vertex_coords, connections)
+        self.components = graphs.StronglyConnectedComponents(self.graph)
+
+    def component(self, vertex_id):
+        return set(self.components.components[self.components.component_of[vertex_id]])
+
+    def test_components(self):
+        self.assertEqual(self.component(1), {1, 2, 3, 4})
+        self.assertEqual(self.component(6), {6, 7})
+        self.assertEqual(self.component(8), {8})
+        self.assertEqual(self.component(5), {5})
+
+    def test_reachable_vertices(self):
+        self.assertEqual(set(self.components.reachable_vertices(2)), {1, 2, 3, 4, 6, 7, 8})
+        self.assertEqual(set(self.components.reachable_vertices(6)), {6, 7, 8})
+        self.assertEqual(set(self.components.reachable_vertices(8)), {8})
+
+    def test_graph_recomputes_after_new_edge(self):
+        self.assertEqual(self.graph.get_components().reachable_vertices(8), [8])
+        self.graph.add_edge(graphs.Edge(8, 1, 80.0, {}))
+        self.assertEqual(len(self.graph.get_components().reachable_vertices(8)), 7)
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import unittest
+import headless
+from cars import create_cars
+from simulation import Simulation
+from helpers import build_gps
+
+
+class TestHeadless(unittest.TestCase):
+    def test_does_not_import_tkinter(self):
+        code = "import sys, headless; sys.exit('tkinter' in sys.modules or 'graphics' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(headless.__file__) or None)
+        self.assertEqual(result.returncode, 0)
+
+    def test_event_driven_for_no_time(self):
+        result = subprocess.run(
+            [sys.executable, "headless.py", "--event-driven", "--no-hybrid", "--cars", "5", "--seconds", "0"],
+            cwd=os.path.dirname(headless.__file__) or None, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("cars integrated per tick: 0.0", result.stdout)
+
+    def test_run(self):
+        gps = build_gps()
+        cars = create_cars(gps, 10)
+        for collision_system, vehicle_arrays in [("quadtree", False), ("vectorized", True)]:
+            simulation = Simulation(headless.HeadlessWindow(), cars, collision_system, vehicle_arrays)
+            ticks, _ = headless.run(simulation, seconds=2, ticks_per_second=30)
+            self.assertEqual(ticks, 60)
+            self.assertEqual(simulation.ticks, 60)
+            self.assertAlmostEqual(simulation.sim_time, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from hybrid import HybridSimulation
+from helpers import StandInWindow, build_road, queued_cars
+
+
+class StandInView(StandInWindow):
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+
+    def getScreenPoints(self):
+        return self.view
+
+
+class TestHybridSimulation(unittest.TestCase):
+    def setUp(self):
+        # 1 -> 2 -> 3 along the x axis at 25 px/s
+        self.gps = build_road(1)
+        for vertex_id in [1, 2]:
+            self.gps.graph.vertices[vertex_id].edges[0].speed_limit = 25
+
+    def test_cars_outside_view_are_queued(self):
+        cars = queued_cars(self.gps, [0, 100, 900])
+        simulation = HybridSimulation(StandInView((800, -100, 1200, 100)), cars, margin=100)
+        self.assertEqual(simulation.micro, {2})
+        self.assertEqual(simulation.meso, {0, 1})
+        self.assertEqual(len(simulation.link_queues.queues[cars[0].current_edge.id]), 2)
+
+    def test_no_teleport_driving_through_view(self):
+        cars = queued_cars(self.gps, [0])
+        car = cars[0]
+        car.speed = 25.0
+        simulation = HybridSimulation(StandInView((800, -100, 1200, 100)), cars, margin=100)
+        positions = []
+        for _ in range(600):
+            simulation.step(0.1)
+            if 0 in simulation.micro:
+                positions.append(car.x)
+        self.assertEqual(simulation.to_micro_count, 1)
+        self.assertEqual(simulation.to_meso_count, 2)
+        # micro from half a margin before the view to a margin past it, where free flow puts it
+        self.assertAlmostEqual(positions[0], 750.0, delta=25.0 * 0.1)
+        self.assertAlmostEqual(positions[-1], 1300.0, delta=25.0 * 0.1)
+        for x, next_x in zip(positions, positions[1:]):
+            self.assertGreaterEqual(next_x - x, 0.0)
+            self.assertLessEqual(next_x - x, 25.0 * 0.1 + 1e-6)
+
+    def test_panning_reveals_cars_where_they_are(self):
+        cars = queued_cars(self.gps, [0, 20])
+        for car in cars:
+            car.speed = 25.0
+        view = StandInView((1500, -100, 1900, 100))
+        simulation = HybridSimulation(view, cars, margin=100)
+        for _ in range(100):
+            simulation.step(0.1)
+        self.assertEqual(simulation.micro, set())
+
+        view.view = (0, -100, 800, 100)
+        simulation.step(0.1)
+        self.assertEqual(simulation.micro, {0, 1})
+        # the front car is at free flow, the one behind it no closer than a queued vehicle
+        self.assertAlmostEqual(cars[1].x, 20 + 25.0 * simulation.sim_time, delta=1.0)
+        self.assertGreaterEqual(cars[1].x - cars[0].x, simulation.link_queues.jam_spacing - 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
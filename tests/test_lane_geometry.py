@@ -0,0 +1,52 @@
+import unittest
+import graphs
+from lane_geometry import LaneGeometry
+
+
+class TestLaneGeometry(unittest.TestCase):
+    def setUp(self):
+        # one way 1 -> 2 with 2 lanes heading east, two way 1 <-> 3 with 4 lanes heading south
+        self.graph = graphs.Graph()
+        for vertex_id, x, y in [(1, 0.0, 0.0), (2, 100.0, 0.0), (3, 0.0, 100.0)]:
+            self.graph.vertices[vertex_id] = graphs.Vertex(vertex_id, x, y, {})
+        self.graph.add_edges(1, 2, {"oneway": "yes", "lanes": "2"})
+        self.graph.add_edges(1, 3, {"lanes": "4"})
+        self.lane_geometry = LaneGeometry(self.graph)
+
+    def edge(self, source_id, dest_id):
+        return next(edge for edge in self.graph.vertices[source_id].edges if edge.dest == dest_id)
+
+    def test_one_way_lanes(self):
+        edge = self.edge(1, 2)
+        # lanes are offset to the right of the direction of travel, 4 apart
+        self.assertEqual(self.lane_geometry.start(self.lane_geometry.slot(edge, 0)), (0.0, 0.0))
+        self.assertEqual(self.lane_geometry.end(self.lane_geometry.slot(edge, 1)), (100.0, 4.0))
+
+    def test_two_way_lanes(self):
+        south = self.lane_geometry.slot(self.edge(1, 3), 1)
+        north = self.lane_geometry.slot(self.edge(3, 1), 0)
+        self.assertEqual(self.lane_geometry.end(south), (-9.0, 100.0))  # way gap 5 + lane line 2 * 2
+        self.assertEqual(self.lane_geometry.end(north), (5.0, 0.0))
+
+    def test_headings(self):
+        self.assertEqual(self.lane_geometry.heading(self.lane_geometry.slot(self.edge(1, 2), 1)), 90.0)
+        self.assertEqual(self.lane_geometry.heading(self.lane_geometry.slot(self.edge(1, 3), 1)), 0.0)
+        self.assertEqual(self.lane_geometry.heading(self.lane_geometry.slot(self.edge(3, 1), 0)), 180.0)
+
+    def test_slot_clamps_lane_index(self):
+        edge = self.edge(1, 2)
+        self.assertEqual(self.lane_geometry.slot(edge, 5), self.lane_geometry.slot(edge, 1))
+        self.assertEqual(self.lane_geometry.slot(None, 0), -1)
+
+    def test_center_line(self):
+        lane_geometry = LaneGeometry(self.graph, center_line=True)
+        self.assertEqual(lane_geometry.end(lane_geometry.slot(self.edge(1, 3), 1)), (0.0, 100.0))
+
+    def test_edge_added_later(self):
+        self.graph.add_edges(2, 3, {"oneway": "yes"})
+        slot = self.lane_geometry.slot(self.edge(2, 3), 0)
+        self.assertEqual(self.lane_geometry.end(slot), (0.0, 100.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
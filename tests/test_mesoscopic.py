@@ -0,0 +1,84 @@
+import unittest
+
+from mesoscopic import LinkQueueModel, QueuedVehicle
+from helpers import build_graph
+
+
+class TestLinkQueueModel(unittest.TestCase):
+    def setUp(self):
+        # 1 -> 2 -> 3 along the x axis, then a short edge 3 -> 4 that holds a single vehicle
+        from gps import GPS
+        graph = build_graph({1: (0, 0), 2: (1000, 0), 3: (2000, 0), 4: (2030, 0)}, [(1, 2), (2, 3), (3, 4)])
+        self.gps = GPS(graph, None)
+        self.model = LinkQueueModel(self.gps)
+        self.edges = [graph.get_edge(1, 2), graph.get_edge(2, 3), graph.get_edge(3, 4)]
+
+    def add_vehicles(self, num_vehicles, source_id=1, dest_id=4):
+        self.model.add_vehicles([
+            (source_id, self.gps.shortest_route(source_id, dest_id)) for _ in range(num_vehicles)
+        ])
+
+    def run_for(self, seconds, dt=0.1):
+        for _ in range(int(round(seconds / dt))):
+            self.model.step(dt)
+
+    def test_capacity_and_travel_time(self):
+        self.assertEqual(self.model.capacity(self.edges[0]), 50)
+        self.assertEqual(self.model.capacity(self.edges[2]), 1)
+        self.assertAlmostEqual(self.model.travel_time(self.edges[0]), 40.0)
+
+    def test_free_flow_travel_time(self):
+        self.add_vehicles(1)
+        vehicle = self.model.vehicles[0]
+        self.run_for(39.5)
+        self.assertIs(vehicle.edge, self.edges[0])
+        self.run_for(1.0)
+        self.assertIs(vehicle.edge, self.edges[1])
+
+    def test_long_step_enters_next_edge_at_departure(self):
+        self.add_vehicles(1)
+        vehicle = self.model.vehicles[0]
+        self.model.step(30.0)
+        self.model.step(30.0)  # due to leave 10s into this step
+        self.assertIs(vehicle.edge, self.edges[1])
+        self.assertAlmostEqual(vehicle.exit_time, 40.0 + self.model.travel_time(self.edges[1]))
+
+    def test_discharge_limited_by_lane_flow(self):
+        self.add_vehicles(10)
+        self.run_for(43.0)
+        # the first vehicle is ready after 40s, then one lane lets one through every 2s
+        self.assertEqual(self.model.exits[self.edges[0].id], 2)
+        self.assertEqual(len(self.model.queues[self.edges[0].id]), 8)
+
+    def test_full_edge_spills_back(self):
+        # plan a route that stops on 3 -> 4 forever by parking a vehicle there
+        parked = QueuedVehicle(99, [self.edges[2]])
+        self.model.vehicles.append(parked)
+        self.model.enter(parked, self.edges[2])
+        parked.exit_time = float("inf")
+        self.add_vehicles(1, source_id=2)
+        vehicle = self.model.vehicles[-1]
+        self.run_for(60.0)
+        self.assertIs(vehicle.edge, self.edges[1])
+        self.assertNotIn(self.edges[1].id, self.model.scheduled)  # waits for 3 -> 4 without polling it
+
+        self.model.remove(parked)
+        self.model.step(0.1)
+        self.assertIs(vehicle.edge, self.edges[2])
+
+    def test_only_occupied_edges_are_scheduled(self):
+        self.add_vehicles(3)
+        self.run_for(41.0)
+        self.assertEqual(set(self.model.scheduled), {self.edges[0].id, self.edges[1].id})
+        self.assertEqual(self.model.scheduled[self.edges[0].id], 42.0)  # one headway after the first left
+
+    def test_edge_stats(self):
+        self.add_vehicles(10)
+        self.run_for(50.0)
+        flow, density = self.model.edge_stats()[self.edges[0].id]
+        self.assertAlmostEqual(flow, self.model.exits[self.edges[0].id] / 50.0)
+        self.assertAlmostEqual(density, len(self.model.queues[self.edges[0].id]) / 1000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import time
+import unittest
+
+import numpy as np
+
+from shared_sim import FIELDS, SharedCarBuffer, SimulationProcess
+from helpers import build_road, queued_cars
+
+
+class TestSharedCarBuffer(unittest.TestCase):
+    def setUp(self):
+        self.writer = SharedCarBuffer(2)
+        self.reader = SharedCarBuffer(2, self.writer.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def publish(self, x, ticks):
+        columns = [[x, x + 1]] + [[float(field)] * 2 for field in range(1, FIELDS)]
+        self.writer.publish(columns, ticks, ticks / 10.0, 0.0)
+
+    def test_reads_latest_frame(self):
+        self.publish(1.0, 1)
+        self.publish(2.0, 2)
+        frame, ticks, sim_time, _, _ = self.reader.acquire()
+        self.assertEqual(frame.tolist(), [[2.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0], [3.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0]])
+        self.assertEqual(ticks, 2)
+        self.assertAlmostEqual(sim_time, 0.2)
+
+    def test_front_buffer_valid_until_second_publish(self):
+        self.publish(1.0, 1)
+        frame, _, _, _, seq = self.reader.acquire()
+        self.publish(2.0, 2)
+        self.assertTrue(self.reader.still_valid(seq))
+        self.assertEqual(frame[0, 0], 1.0)  # the first publish went to the other buffer
+        self.publish(3.0, 3)
+        self.assertFalse(self.reader.still_valid(seq))
+        self.assertEqual(frame[0, 0], 3.0)
+
+
+class TestSimulationProcess(unittest.TestCase):
+    def setUp(self):
+        self.gps = build_road(1)
+        self.cars = queued_cars(self.gps, [0, 0])
+
+    def simulation_process(self):
+        return SimulationProcess(self.gps, self.cars, {"driver_model": "idm"}, (1280, 800), ticks_per_second=10,
+                                 realtime=False)
+
+    def test_child_moves_cars(self):
+        simulation_process = self.simulation_process()
+        simulation_process.start()
+        try:
+            deadline = time.monotonic() + 30
+            while simulation_process.tick_rate()[0] < 50 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            frames = []
+            simulation_process.render_latest(lambda frame: frames.append(frame.copy()))
+            ticks, _ = simulation_process.tick_rate()
+        finally:
+            simulation_process.stop()
+        self.assertGreaterEqual(ticks, 50)
+        # the child starts its cars at vertex 1 like Car does, heading along the x axis
+        x, y, heading = frames[-1][0, :3]
+        self.assertGreater(x, 0.0)
+        self.assertEqual(y, 0.0)
+        self.assertAlmostEqual(heading, 90.0)
+
+    def test_render_again_if_frame_overwritten(self):
+        simulation_process = self.simulation_process()
+        buffer = simulation_process.buffer
+        columns = [np.zeros(2)] * FIELDS
+        rendered = []
+
+        def render(frame):
+            rendered.append(frame[0, 0])
+            buffer.publish(columns, 0, 0.0, 0.0)
+            buffer.publish(columns, 0, 0.0, 0.0)
+
+        buffer.publish(columns, 0, 0.0, 0.0)
+        simulation_process.render_latest(render, retries=2)
+        buffer.close()
+        self.assertEqual(len(rendered), 3)
+        self.assertEqual(simulation_process.frames, 1)
+        self.assertEqual(simulation_process.rerenders, 2)
+
+    def test_update_car_from_frame(self):
+        simulation_process = self.simulation_process()
+        car = self.cars[0]
+        frame = np.zeros((2, FIELDS))
+        frame[0] = [1500.0, 0.0, 90.0, 12.5, 2, 3, 3]  # on 2 -> 3, its last edge
+        simulation_process.update_car(car, frame)
+        simulation_process.buffer.close()
+        self.assertEqual((car.x, car.speed), (1500.0, 12.5))
+        self.assertEqual((car.current_edge.source, car.current_edge.dest), (2, 3))
+        self.assertEqual(car.next_dest_id, 3)
+        self.assertEqual(car.route, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from simulation import Simulation
+from vehicle_arrays import VehicleArrays
+from helpers import StandInWindow, build_gps, create_cars
+
+
+class TestVehicleArrays(unittest.TestCase):
+    def setUp(self):
+        self.gps = build_gps()
+        self.dt = 1.0 / 30
+
+    def test_matches_car_objects(self):
+        expected_cars = create_cars(self.gps, 20, seed=3)
+        for _ in range(300):
+            for car in expected_cars:
+                car.throttle_up()
+                car.move_towards_dest(self.dt)
+
+        cars = create_cars(self.gps, 20, seed=3)
+        vehicles = VehicleArrays(cars)
+        for _ in range(300):
+            vehicles.throttle([False] * len(vehicles))
+            vehicles.move_towards_dest(self.dt)
+        vehicles.sync_cars()
+
+        for car, expected in zip(cars, expected_cars):
+            self.assertAlmostEqual(car.x, expected.x, places=6)
+            self.assertAlmostEqual(car.y, expected.y, places=6)
+            self.assertEqual(car.next_dest_id, expected.next_dest_id)
+
+    def test_throttle(self):
+        cars = create_cars(self.gps, 2, seed=1)
+        vehicles = VehicleArrays(cars)
+        vehicles.speed[:] = [20.0, 20.0]
+        vehicles.speed_limit[:] = [21.0, 21.0]
+        vehicles.throttle([True, False])
+        self.assertAlmostEqual(vehicles.speed[0], 18.0)
+        self.assertAlmostEqual(vehicles.speed[1], 21.0)
+
+    def test_cars_synced_once_per_frame(self):
+        cars = create_cars(self.gps, 20, seed=3)
+        simulation = Simulation(StandInWindow(), cars, "vectorized", vehicle_arrays=True)
+        before = [(car.x, car.y) for car in cars]
+        simulation.step(self.dt)
+        moved = [index for index, car in enumerate(cars) if (car.x, car.y) != before[index]]
+        self.assertEqual(moved, [])  # nothing reads the Car objects during the tick
+        simulation.sync_cars()
+        self.assertEqual([car.x for car in cars], simulation.vehicles.x.tolist())
+        self.assertEqual([car.speed for car in cars], simulation.vehicles.speed.tolist())
@@ -0,0 +1,75 @@
+import numpy as np
+
+from cars import Car
+
+
+class VehicleArrays:
+    """Structure of arrays store of vehicle state for moving every car with vectorized
+    NumPy operations instead of calling Car.move_towards_dest per car
+
+    Car objects still own their routes. Only cars that reach their next waypoint during
+    a tick fall back to Python to pick the next waypoint and refresh their target.
+    """
+    def __init__(self, cars):
+        self.cars = cars
+        num_cars = len(cars)
+        self.x = np.array([car.x for car in cars], dtype=float)
+        self.y = np.array([car.y for car in cars], dtype=float)
+        self.speed = np.array([car.speed for car in cars], dtype=float)
+        self.speed_limit = np.empty(num_cars)
+        self.target_x = np.empty(num_cars)
+        self.target_y = np.empty(num_cars)
+        for car in cars:
+            self.update_target(car.index)
+
+    def __len__(self):
+        return len(self.cars)
+
+    def update_target(self, index):
+        car = self.cars[index]
+        self.target_x[index], self.target_y[index] = car.target()
+        self.speed_limit[index] = car.speed_limit
+
+    def move_towards_dest(self, dt):
+        """Vectorized Car.move_towards_dest, returns indices of cars that reached a waypoint"""
+        movement = dt * self.speed
+        dx = self.target_x - self.x
+        dy = self.target_y - self.y
+        dist = np.hypot(dx, dy)
+
+        # like Car.move_towards_dest, a car that arrives this tick doesn't move until the next
+        arrived = dist <= movement
+        scale = np.divide(movement, dist, out=np.zeros_like(dist), where=~arrived)
+        self.x += dx * scale
+        self.y += dy * scale
+
+        arrived_indices = np.flatnonzero(arrived)
+        for index in arrived_indices.tolist():
+            car = self.cars[index]
+            car.x, car.y = self.x[index], self.y[index]
+            car.arrive_at_next_dest()
+            self.x[index], self.y[index] = car.x, car.y  # car may have been reset to a new location
+            self.update_target(index)
+        return arrived_indices
+
+    def throttle(self, collisions):
+        """Vectorized Car.throttle_down for cars about to collide and Car.throttle_up for the rest"""
+        collisions = np.asarray(collisions, dtype=bool)
+        self.speed = np.where(
+            collisions,
+            np.maximum(self.speed * 0.9, Car.min_speed),
+            np.minimum(self.speed * 1.1, self.speed_limit),
+        )
+
+    def sync_positions(self):
+        """Copy positions back onto the Car objects, for collision systems that read them"""
+        for car, x, y in zip(self.cars, self.x.tolist(), self.y.tolist()):
+            car.x = x
+            car.y = y
+
+    def sync_cars(self):
+        """Copy array state back onto the Car objects for rendering and the info window"""
+        for car, x, y, speed in zip(self.cars, self.x.tolist(), self.y.tolist(), self.speed.tolist()):
+            car.x = x
+            car.y = y
+            car.speed = speed